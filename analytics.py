@@ -0,0 +1,547 @@
+"""
+Núcleo analítico de las reseñas, sin dependencias de interfaz.
+
+Carga, derivación de columnas, filtros, KPIs y agregaciones que usan los
+dashboards, los scripts por lotes y los workers. No importa Streamlit: los
+errores se señalan con `DataLoadError` y la caché de datasets es propia del
+proceso (`DatasetCache`, respaldada por el dataset que comparten todos los
+procesos, ver `shared_dataset.py`), de modo que un job puede cargar el CSV con
+el mismo código que `app.py` sin inicializar la interfaz. `utils.py` adapta este módulo
+a Streamlit (mensajes con `st.error`, tarjetas HTML).
+
+Uso:
+    python analytics.py "ryanair_reviews (1).csv"
+"""
+import argparse
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    DATA_PATHS, RATING_THRESHOLDS, RATING_CATEGORIES, SENTIMENT_CATEGORIES,
+    VERIFICATION_MAPPING, SERVICE_ASPECTS, ANALYTICS_CACHE_ENTRIES, SHARED_DATASET_DIR
+)
+from near_duplicates import DUPLICATE_COLUMN
+from shared_dataset import SharedDatasetStore
+from text_sentiment import LABEL_COLUMN as TEXT_SENTIMENT_COLUMN
+
+# Las copias superficiales de DatasetCache y las columnas mapeadas de solo
+# lectura de SharedDatasetStore requieren Copy-on-Write: siempre activo desde
+# pandas 3.0, opcional en pandas 2.x
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+REQUIRED_COLUMNS = ['Date Published', 'Overall Rating']
+
+# Filtros del sidebar; None (o vacío) en un campo significa "sin filtrar"
+ReviewFilters = namedtuple(
+    'ReviewFilters',
+    ['date_range', 'verification', 'traveller_types', 'text_sentiments', 'countries',
+     'rating_range', 'collapse_duplicates', 'text_matches'],
+    defaults=(None, None, None, None, None, None, False, None)
+)
+
+
+class DataLoadError(ValueError):
+    """El CSV de reseñas existe pero no se puede leer o le faltan columnas."""
+
+
+def resolve_data_path(path=None):
+    """
+    Resolver la ruta del CSV: `path` si existe o la primera de `DATA_PATHS`.
+
+    Args:
+        path: Ruta preferida (opcional).
+
+    Returns:
+        str o None: Primera ruta existente entre `path` y `DATA_PATHS`.
+    """
+    for candidate in [path] + DATA_PATHS:
+        if candidate and os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def _resolve_source(path=None):
+    """Objeto file-like o ruta existente a leer (None si no hay ninguno)."""
+    if path is not None and hasattr(path, 'read'):
+        return path
+    try:
+        return resolve_data_path(path)
+    except (OSError, TypeError):
+        return resolve_data_path()
+
+
+def classify_rating(rating):
+    """
+    Clasificar una calificación en categorías (Positivo, Neutral, Negativo).
+
+    Args:
+        rating: Calificación numérica (1-10).
+
+    Returns:
+        str: Categoría de la calificación.
+    """
+    if pd.isna(rating):
+        return RATING_CATEGORIES['unrated']
+
+    try:
+        r = float(rating)
+    except (ValueError, TypeError):
+        return RATING_CATEGORIES['unrated']
+
+    if r <= RATING_THRESHOLDS['negative_max']:
+        return RATING_CATEGORIES['negative']
+    elif r <= RATING_THRESHOLDS['neutral_max']:
+        return RATING_CATEGORIES['neutral']
+    else:
+        return RATING_CATEGORIES['positive']
+
+
+def sentiment_from_rating(rating):
+    """
+    Obtener sentimiento desde una calificación.
+
+    Args:
+        rating: Calificación numérica (1-10).
+
+    Returns:
+        str: Sentimiento (Positivo, Neutral, Negativo, Desconocido).
+    """
+    if pd.isna(rating):
+        return SENTIMENT_CATEGORIES['unknown']
+
+    try:
+        r = float(rating)
+    except (ValueError, TypeError):
+        return SENTIMENT_CATEGORIES['unknown']
+
+    if r <= RATING_THRESHOLDS['negative_max']:
+        return SENTIMENT_CATEGORIES['negative']
+    elif r <= RATING_THRESHOLDS['neutral_max']:
+        return SENTIMENT_CATEGORIES['neutral']
+    else:
+        return SENTIMENT_CATEGORIES['positive']
+
+
+def derive_columns(df):
+    """
+    Añadir las columnas derivadas que usan los dashboards y los modelos.
+
+    Args:
+        df: Reseñas tal como vienen del CSV (se modifica en el sitio).
+
+    Returns:
+        DataFrame: El mismo `df` con fechas, año/mes, recomendación 1/0,
+        categoría de calificación, verificación normalizada, sentimiento y ruta.
+    """
+    # Convertir fechas
+    df['Date Published'] = pd.to_datetime(df.get('Date Published', pd.NaT), errors='coerce')
+    df['Date Flown'] = pd.to_datetime(df.get('Date Flown', pd.NaT), errors='coerce')
+
+    # Crear variables temporales
+    df['Year_Published'] = df['Date Published'].dt.year
+    df['Month_Published'] = df['Date Published'].dt.to_period('M').astype(str)
+    df['Year_Flown'] = df['Date Flown'].dt.year
+
+    # Procesar recomendaciones: normalizar a minúsculas y mapear a 1/0
+    df['Recommended'] = df.get('Recommended', pd.Series()).fillna('').astype(str).str.strip().str.lower()
+    df['Recommended_bool'] = df['Recommended'].map({'yes': 1, 'no': 0})
+
+    # Clasificar por rating
+    df['Rating_Category'] = df['Overall Rating'].apply(classify_rating)
+
+    # Limpiar verificación
+    df['Trip_verified_clean'] = df.get('Trip_verified', pd.Series()).fillna('Unknown')
+    df['Trip_verified_clean'] = df['Trip_verified_clean'].replace(VERIFICATION_MAPPING)
+
+    # Crear columna 'Sentiment'
+    df['Sentiment'] = df['Overall Rating'].apply(sentiment_from_rating)
+
+    # Crear columna 'Route' (Origin → Destination)
+    if 'Origin' in df.columns and 'Destination' in df.columns:
+        df['Route'] = df['Origin'].fillna('Unknown') + ' → ' + df['Destination'].fillna('Unknown')
+
+    return df
+
+
+def load_reviews(path=None):
+    """
+    Leer y procesar el CSV de reseñas desde `path` o desde `DATA_PATHS`, sin caché.
+
+    Args:
+        path: Ruta del archivo CSV o objeto file-like. Si es None, busca en rutas predefinidas.
+
+    Returns:
+        DataFrame procesado o None si no se encuentra ningún archivo.
+
+    Raises:
+        DataLoadError: Si el CSV está vacío, no se puede leer o le faltan columnas requeridas.
+    """
+    source = _resolve_source(path)
+    if source is None:
+        return None
+
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    try:
+        df = pd.read_csv(source)
+    except pd.errors.EmptyDataError:
+        raise DataLoadError("El archivo CSV está vacío.")
+    except Exception as e:
+        raise DataLoadError(f"Error al leer el archivo CSV: {str(e)}")
+
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise DataLoadError(f"Faltan columnas requeridas: {', '.join(missing_columns)}")
+
+    return derive_columns(df)
+
+
+class DatasetCache:
+    """
+    Caché LRU de datasets procesados del proceso, segura para varios hilos.
+
+    La clave de un archivo es su ruta absoluta, tamaño y fecha de modificación
+    (editar el CSV invalida la entrada sin borrar nada); la de un objeto
+    file-like, el hash de su contenido. Cada llamada devuelve una copia
+    superficial: con Copy-on-Write de pandas, añadir o reemplazar columnas en
+    la copia no altera el dataset en caché ni el de otras sesiones.
+
+    Con un `SharedDatasetStore`, los archivos se cargan desde la versión
+    publicada y mapeada en memoria que comparten todos los procesos, y la
+    clave incluye su contador de versiones: si otro proceso invalida el
+    dataset, la entrada de este deja de coincidir.
+    """
+
+    def __init__(self, max_entries=ANALYTICS_CACHE_ENTRIES, loader=load_reviews, store=None):
+        self.max_entries = max_entries
+        self.loader = loader
+        self.store = store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, source):
+        """Clave de caché de una ruta existente o un objeto file-like."""
+        if hasattr(source, 'read'):
+            if hasattr(source, 'getvalue'):
+                content = source.getvalue()
+            else:
+                content = source.read()
+                source.seek(0)
+            if isinstance(content, str):
+                content = content.encode('utf-8')
+            return ('content', hashlib.sha1(content).hexdigest())
+        stat = os.stat(source)
+        key = ('path', os.path.abspath(source), stat.st_size, stat.st_mtime_ns)
+        if self.store is not None:
+            key += (self.store.version(source),)
+        return key
+
+    def get(self, path=None):
+        """
+        Dataset procesado de `path` (o de `DATA_PATHS`), cargándolo si no está en caché.
+
+        Args:
+            path: Ruta del CSV u objeto file-like.
+
+        Returns:
+            DataFrame o None si no se encuentra ningún archivo.
+
+        Raises:
+            DataLoadError: Propagado desde el cargador.
+        """
+        source = _resolve_source(path)
+        if source is None:
+            return None
+        key = self.key(source)
+        with self._lock:
+            df = self._entries.get(key)
+            if df is not None:
+                self._entries.move_to_end(key)
+        if df is None:
+            shared = self.store is not None and not hasattr(source, 'read')
+            df = self.store.load(source) if shared else self.loader(source)
+            if df is None:
+                return None
+            with self._lock:
+                self._entries[key] = df
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return df.copy(deep=False)
+
+    def clear(self):
+        """Descartar todos los datasets en caché (y las versiones compartidas, en todos los procesos)."""
+        with self._lock:
+            self._entries.clear()
+        if self.store is not None:
+            self.store.invalidate()
+
+
+# Caché compartida por todas las sesiones y llamadas del proceso, respaldada por
+# el dataset publicado para todos los procesos worker
+dataset_cache = DatasetCache(
+    store=SharedDatasetStore(SHARED_DATASET_DIR, load_reviews) if SHARED_DATASET_DIR else None
+)
+
+
+def get_reviews(path=None):
+    """Dataset procesado desde la caché del proceso (ver `DatasetCache.get`)."""
+    return dataset_cache.get(path)
+
+
+def apply_filters(df, date_range, verification_filter):
+    """
+    Aplicar filtros al DataFrame.
+
+    Args:
+        df: DataFrame original.
+        date_range: Tupla con rango de fechas.
+        verification_filter: Lista con valores de verificación a incluir.
+
+    Returns:
+        DataFrame filtrado.
+    """
+    if len(date_range) == 2:
+        mask = (
+            (df['Date Published'] >= pd.to_datetime(date_range[0])) &
+            (df['Date Published'] <= pd.to_datetime(date_range[1])) &
+            (df['Trip_verified_clean'].isin(verification_filter))
+        )
+        return df[mask]
+    else:
+        return df[df['Trip_verified_clean'].isin(verification_filter)]
+
+
+def filter_mask(df, filters):
+    """
+    Máscara booleana de las reseñas que cumplen todos los filtros.
+
+    Args:
+        df: Reseñas procesadas.
+        filters: ReviewFilters. `text_matches` son posiciones de fila de `df`
+            (p. ej. resultado de `TextIndex.search`).
+
+    Returns:
+        np.ndarray: Máscara alineada con las filas de `df`.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if filters.verification is not None:
+        mask &= df['Trip_verified_clean'].isin(filters.verification).to_numpy()
+    if filters.date_range is not None and len(filters.date_range) == 2:
+        published = df['Date Published']
+        mask &= ((published >= pd.to_datetime(filters.date_range[0]))
+                 & (published <= pd.to_datetime(filters.date_range[1]))).to_numpy()
+    if filters.collapse_duplicates and DUPLICATE_COLUMN in df.columns:
+        mask &= (df[DUPLICATE_COLUMN] < 0).to_numpy()
+    if filters.traveller_types:
+        mask &= df['Type Of Traveller'].isin(filters.traveller_types).to_numpy()
+    if filters.text_sentiments:
+        mask &= df[TEXT_SENTIMENT_COLUMN].isin(filters.text_sentiments).to_numpy()
+    if filters.countries:
+        mask &= df['Passenger Country'].isin(filters.countries).to_numpy()
+    if filters.rating_range is not None:
+        rating = df['Overall Rating']
+        mask &= ((rating >= filters.rating_range[0]) & (rating <= filters.rating_range[1])).to_numpy()
+    if filters.text_matches is not None:
+        matched = np.zeros(len(df), dtype=bool)
+        matched[np.asarray(filters.text_matches, dtype=np.int64)] = True
+        mask &= matched
+    return mask
+
+
+def filter_reviews(df, filters):
+    """
+    Aplicar todos los filtros del dashboard en una sola pasada.
+
+    Args:
+        df: Reseñas procesadas.
+        filters: ReviewFilters.
+
+    Returns:
+        DataFrame: Filas de `df` que cumplen los filtros, en su orden original.
+    """
+    return df[filter_mask(df, filters)]
+
+
+def calculate_recommendation_rate(df):
+    """
+    Calcular tasa de recomendación.
+
+    Args:
+        df: DataFrame con columna 'Recommended_bool'.
+
+    Returns:
+        float: Tasa de recomendación en porcentaje.
+    """
+    if 'Recommended_bool' not in df.columns:
+        return 0.0
+
+    valid_count = df['Recommended_bool'].notna().sum()
+    if valid_count == 0:
+        return 0.0
+
+    return (df['Recommended_bool'].sum() / valid_count) * 100
+
+
+def calculate_nps(df):
+    """
+    Calcular Net Promoter Score (NPS) aproximado.
+
+    Args:
+        df: DataFrame con columna 'Sentiment'.
+
+    Returns:
+        float: NPS aproximado.
+    """
+    if 'Sentiment' not in df.columns or len(df) == 0:
+        return 0.0
+
+    n_positive = (df['Sentiment'] == SENTIMENT_CATEGORIES['positive']).sum()
+    n_negative = (df['Sentiment'] == SENTIMENT_CATEGORIES['negative']).sum()
+
+    return ((n_positive - n_negative) / len(df)) * 100
+
+
+def _share(mask, total):
+    """Porcentaje de `mask` sobre `total` filas (0 si no hay filas)."""
+    return mask.sum() / total * 100 if total > 0 else 0
+
+
+def kpi_summary(df):
+    """
+    KPIs principales de una selección de reseñas.
+
+    Args:
+        df: Reseñas procesadas.
+
+    Returns:
+        dict: 'total_reviews', 'avg_rating', 'recommendation_rate', 'nps',
+        'verified_pct', 'positive_rate' y 'negative_rate' (porcentajes 0-100).
+    """
+    total = len(df)
+    return {
+        'total_reviews': total,
+        'avg_rating': df['Overall Rating'].mean(),
+        'recommendation_rate': calculate_recommendation_rate(df),
+        'nps': calculate_nps(df),
+        'verified_pct': _share(df['Trip_verified_clean'] == 'Verified', total),
+        'positive_rate': _share(df['Sentiment'] == SENTIMENT_CATEGORIES['positive'], total),
+        'negative_rate': _share(df['Sentiment'] == SENTIMENT_CATEGORIES['negative'], total),
+    }
+
+
+def aspect_means(df, aspects=SERVICE_ASPECTS):
+    """Calificación media de cada aspecto del servicio, de menor a mayor."""
+    return df[aspects].mean().sort_values(ascending=True)
+
+
+def _recommendation_rate_by(df, key):
+    """Tasa de recomendación (%) por grupo; 0 en los grupos sin respuestas."""
+    return df.groupby(key)['Recommended_bool'].mean().mul(100).fillna(0)
+
+
+def monthly_summary(df):
+    """
+    Volumen, calificación media y tasa de recomendación por mes de publicación.
+
+    Args:
+        df: Reseñas procesadas.
+
+    Returns:
+        pd.DataFrame: Índice 'YYYY-MM' (texto) con 'reviews', 'Overall Rating'
+        y 'Recommended_bool' (tasa en %).
+    """
+    grouped = df.groupby('Month_Published')
+    summary = pd.DataFrame({
+        'reviews': grouped.size(),
+        'Overall Rating': grouped['Overall Rating'].mean(),
+        'Recommended_bool': _recommendation_rate_by(df, 'Month_Published'),
+    })
+    summary.index = summary.index.astype(str)
+    return summary
+
+
+def yearly_summary(df):
+    """
+    Calificación media y tasa de recomendación por año de publicación.
+
+    Returns:
+        pd.DataFrame: Índice año con 'Overall Rating' y 'Recommended_bool' (tasa en %).
+    """
+    return pd.DataFrame({
+        'Overall Rating': df.groupby('Year_Published')['Overall Rating'].mean(),
+        'Recommended_bool': _recommendation_rate_by(df, 'Year_Published'),
+    })
+
+
+def country_ratings(df, top_n):
+    """
+    Calificación media de los `top_n` países con más reseñas.
+
+    Returns:
+        pd.DataFrame: Índice país con 'Overall Rating' y 'Count', de menor a
+        mayor calificación.
+    """
+    ratings = df.groupby('Passenger Country').agg({
+        'Overall Rating': 'mean',
+        'Passenger Country': 'count'
+    }).rename(columns={'Passenger Country': 'Count'}).sort_values('Count', ascending=False).head(top_n)
+    return ratings.sort_values('Overall Rating', ascending=True)
+
+
+def route_ratings(df, min_reviews, top_n):
+    """
+    Las `top_n` rutas peor calificadas con al menos `min_reviews` reseñas.
+
+    Returns:
+        pd.DataFrame: Índice ruta con 'Overall Rating' y 'Count', de menor a
+        mayor calificación.
+    """
+    ratings = df.groupby('Route').agg({
+        'Overall Rating': 'mean',
+        'Route': 'count'
+    }).rename(columns={'Route': 'Count'})
+    return ratings[ratings['Count'] >= min_reviews].sort_values('Overall Rating', ascending=True).head(top_n)
+
+
+def format_large_number(num):
+    """
+    Formatear números grandes con separadores de miles.
+
+    Args:
+        num: Número a formatear.
+
+    Returns:
+        str: Número formateado.
+    """
+    try:
+        return f"{int(num):,}"
+    except (ValueError, TypeError):
+        return str(num)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='KPIs de las reseñas sin interfaz')
+    parser.add_argument('data', nargs='?', default=None, help='CSV de reseñas (por defecto, DATA_PATHS)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        df = get_reviews(args.data)
+    except DataLoadError as e:
+        raise SystemExit(f"❌ {e}")
+    if df is None:
+        raise SystemExit("❌ No se encontró el CSV de reseñas")
+    print(f"✅ {len(df):,} reseñas cargadas ({time.perf_counter() - start:.2f}s)")
+    for name, value in kpi_summary(df).items():
+        print(f"   {name:<20} {value:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
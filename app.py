@@ -1,79 +1,136 @@
-import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+import streamlit as st
+
 # Importar configuración y utilidades
 from config import (
     PAGE_CONFIG, CSS_STYLES, SERVICE_ASPECTS, COLORS,
     NAVIGATION_OPTIONS, FIGURE_SIZES,
-    TOP_N_COUNTRIES, TOP_N_ROUTES, MIN_REVIEWS_FOR_ROUTE_ANALYSIS
-)
-from utils import (
-    load_data, calculate_recommendation_rate, calculate_nps,
-    create_metric_card, display_story, apply_filters
+    TOP_N_COUNTRIES, TOP_N_ROUTES, MIN_REVIEWS_FOR_ROUTE_ANALYSIS, COMPLAINT_CATEGORIES,
+    SENTIMENT_CATEGORIES, PROFILING_SAMPLE_RATE, PROFILING_MAX_TRACES, PROFILING_TOP_N,
+    PROFILING_TRACES_PATH
 )
 
-# Configuración de la página
+# Configuración de la página y CSS antes de importar pandas y los módulos de
+# análisis: el navegador pinta el layout mientras se cargan. matplotlib se
+# importa dentro de cada página, solo cuando se dibuja un gráfico.
 st.set_page_config(**PAGE_CONFIG)
-
-# Estilo CSS personalizado
 st.markdown(CSS_STYLES, unsafe_allow_html=True)
 
+import pandas as pd  # noqa: E402
+import numpy as np  # noqa: E402
+
+from analytics import (  # noqa: E402
+    ReviewFilters, filter_reviews, calculate_recommendation_rate, calculate_nps, kpi_summary,
+    aspect_means as compute_aspect_means, monthly_summary, yearly_summary, country_ratings as compute_country_ratings,
+    route_ratings as compute_route_ratings, resolve_data_path
+)
+from utils import load_data, create_metric_card, display_story  # noqa: E402
+from text_index import documents_from, corpus_version, load_or_build  # noqa: E402
+from complaint_tags import TAGS_COLUMN, load_or_tag, category_summary, monthly_share  # noqa: E402
+from term_trends import build as build_term_matrix, load_or_update as load_term_matrix  # noqa: E402
+from near_duplicates import DUPLICATE_COLUMN, find_duplicates, load_or_update as load_duplicate_index  # noqa: E402
+from text_sentiment import SCORE_COLUMN, LABEL_COLUMN, load_or_score, label as sentiment_label  # noqa: E402
+from instrumentation import SectionProfiler, profile_section, profiled  # noqa: E402
+
 # Funciones load_data, create_metric_card y display_story ahora están en utils.py
 
 
-def show_executive_summary(df):
-    """Resumen Ejecutivo para CEO"""
-    st.title("Resumen Ejecutivo: Análisis de Satisfacción del Cliente Ryanair")
-    st.markdown("### Informe para la Dirección Ejecutiva")
-    display_story('Resumen Ejecutivo')
-    st.markdown("---")
-    
-    # KPIs principales
+@st.cache_resource
+def get_profiler():
+    """Perfilado por secciones del proceso, compartido por todas las sesiones."""
+    return SectionProfiler('app', PROFILING_SAMPLE_RATE, PROFILING_MAX_TRACES)
+
+
+@st.cache_resource(show_spinner='Indexando comentarios...')
+def get_text_index(_documents, version):
+    """Índice invertido de los comentarios, uno por versión del corpus (`version` es la clave de caché)."""
+    return load_or_build(_documents)
+
+
+@st.cache_resource(show_spinner=False)
+def get_documents(df):
+    """Textos indexables ('Comment title' + 'Comment') de cada reseña y versión del corpus."""
+    documents = documents_from(df)
+    return documents, corpus_version(documents)
+
+
+@st.cache_resource(show_spinner='Contando términos por mes...')
+def get_term_matrix(_df, version, data_path):
+    """Matriz términos × mes: incremental sobre el CSV si hay ruta, en memoria si el archivo se subió."""
+    if data_path is not None:
+        return load_term_matrix(data_path)[0]
+    return build_term_matrix(_df)
+
+
+@st.cache_resource(show_spinner='Buscando reseñas duplicadas...')
+def get_duplicates(_df, version, data_path):
+    """Primera reseña del grupo de casi duplicados de cada fila (-1 si es original)."""
+    if data_path is not None:
+        duplicate_of = load_duplicate_index(data_path)[0].duplicate_of
+        if len(duplicate_of) == len(_df):
+            return duplicate_of
+    return find_duplicates(_df)
+
+
+@st.cache_resource(show_spinner='Puntuando el sentimiento de los comentarios...')
+def get_text_sentiment(_df, version):
+    """Puntuación de sentimiento del texto de cada reseña (solo se puntúan textos nuevos)."""
+    return load_or_score(_df['Comment'] if 'Comment' in _df.columns else [''] * len(_df))[0]
+
+
+@st.cache_resource(show_spinner='Etiquetando categorías de queja...')
+def get_complaint_tags(_documents, version):
+    """Máscara de categorías de queja por reseña, una por versión del corpus."""
+    return load_or_tag(_documents, version)
+
+
+@profiled('Indicadores Clave de Rendimiento')
+def _summary_kpis(df):
+    """KPIs principales del resumen ejecutivo; devuelve el resultado de kpi_summary."""
     st.markdown("## Indicadores Clave de Rendimiento")
-    
+
+    kpis = kpi_summary(df)
+    avg_rating, rec_rate = kpis['avg_rating'], kpis['recommendation_rate']
+    total_reviews, verified_pct = kpis['total_reviews'], kpis['verified_pct']
     col1, col2, col3, col4 = st.columns(4)
-    
+
     with col1:
-        avg_rating = df['Overall Rating'].mean()
         st.markdown(create_metric_card(
             "Calificación Promedio",
             f"{avg_rating:.1f}/10"
         ), unsafe_allow_html=True)
-    
+
     with col2:
-        rec_rate = calculate_recommendation_rate(df)
         st.markdown(create_metric_card(
             "Tasa de Recomendación",
             f"{rec_rate:.1f}%"
         ), unsafe_allow_html=True)
-    
+
     with col3:
-        total_reviews = len(df)
         st.markdown(create_metric_card(
             "Total de Reseñas",
             f"{total_reviews:,}"
         ), unsafe_allow_html=True)
-    
+
     with col4:
-        verified_pct = (df['Trip_verified_clean'] == 'Verified').sum() / len(df) * 100
         st.markdown(create_metric_card(
             "Reseñas Verificadas",
             f"{verified_pct:.1f}%"
         ), unsafe_allow_html=True)
-    
-    st.markdown("---")
-    
-    # Análisis de sentimiento general
+    return kpis
+
+
+@profiled('Distribución de Satisfacción')
+def _summary_satisfaction(df):
+    """Distribución de las reseñas por categoría de calificación."""
+    import matplotlib.pyplot as plt
+
     st.markdown("## Distribución de Satisfacción")
-    
+
     col1, col2 = st.columns([2, 1])
-    
+
     with col1:
         # Gráfico de distribución
         fig, ax = plt.subplots(figsize=(10, 5))
@@ -88,7 +145,7 @@ def show_executive_summary(df):
         plt.tight_layout()
         st.pyplot(fig)
         plt.close()
-    
+
     with col2:
         st.markdown("### Distribución Porcentual")
         for category in ['Positivo (8-10)', 'Neutral (4-7)', 'Negativo (1-3)']:
@@ -98,15 +155,17 @@ def show_executive_summary(df):
             st.progress(pct / 100)
             st.markdown(f"{pct:.1f}% ({count:,} reseñas)")
             st.markdown("")
-    
-    st.markdown("---")
-    
-    # Aspectos del servicio
+
+
+@profiled('Evaluación por Aspectos del Servicio')
+def _summary_aspects(df):
+    """Calificación promedio por aspecto del servicio; devuelve las medias."""
+    import matplotlib.pyplot as plt
+
     st.markdown("## Evaluación por Aspectos del Servicio")
-    
-    service_aspects = SERVICE_ASPECTS
-    aspect_means = df[service_aspects].mean().sort_values(ascending=True)
-    
+
+    aspect_means = compute_aspect_means(df)
+
     fig, ax = plt.subplots(figsize=(12, 6))
     colors = plt.cm.RdYlGn(aspect_means.values / 5)
     bars = ax.barh(aspect_means.index, aspect_means.values, color=colors)
@@ -118,24 +177,29 @@ def show_executive_summary(df):
     ax.axvline(x=3, color='gray', linestyle='--', alpha=0.5, label='Punto Medio (3.0)')
     ax.grid(axis='x', alpha=0.3)
     ax.legend()
-    
+
     # Agregar valores en las barras
     for i, bar in enumerate(bars):
         width = bar.get_width()
         ax.text(width + 0.05, bar.get_y() + bar.get_height()/2, 
                 f'{width:.2f}', ha='left', va='center', fontsize=10, color='black')
-    
+
     plt.tight_layout()
     st.pyplot(fig)
     plt.close()
-    
-    st.markdown("---")
-    
-    # Hallazgos clave
+    return aspect_means
+
+
+@profiled('Hallazgos Clave')
+def _summary_findings(df, kpis, aspect_means):
+    """Puntos fuertes y áreas de mejora; devuelve el aspecto peor valorado."""
+    avg_rating, rec_rate = kpis['avg_rating'], kpis['recommendation_rate']
+    verified_pct = kpis['verified_pct']
+
     st.markdown("## Hallazgos Clave")
-    
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
         st.markdown('<div class="success-box">', unsafe_allow_html=True)
         st.markdown("### Puntos Fuertes")
@@ -148,7 +212,7 @@ def show_executive_summary(df):
         - La calificación promedio general es {avg_rating:.1f}/10
         """)
         st.markdown('</div>', unsafe_allow_html=True)
-    
+
     with col2:
         st.markdown('<div class="warning-box">', unsafe_allow_html=True)
         st.markdown("### Áreas de Mejora")
@@ -162,42 +226,73 @@ def show_executive_summary(df):
         - Oportunidad significativa de mejora en experiencia del cliente
         """)
         st.markdown('</div>', unsafe_allow_html=True)
-    
-    st.markdown("---")
-    
-    # Conclusión ejecutiva
+    return worst_aspect
+
+
+@profiled('Conclusión Ejecutiva')
+def _summary_conclusion(df, kpis, aspect_means, worst_aspect):
+    """Conclusión del resumen ejecutivo."""
+    avg_rating, rec_rate = kpis['avg_rating'], kpis['recommendation_rate']
+
     st.markdown("## Conclusión Ejecutiva")
     st.markdown('<div class="insight-box">', unsafe_allow_html=True)
     st.markdown(f"""
     El análisis de {len(df):,} reseñas de clientes revela un **panorama mixto** en la satisfacción del cliente de Ryanair:
-    
+
     **Situación Actual:**
     - La calificación promedio de **{avg_rating:.1f}/10** sugiere una experiencia de cliente por debajo de lo óptimo
     - Con una tasa de recomendación del **{rec_rate:.1f}%**, existe una oportunidad significativa de mejora
     - El aspecto mejor valorado es **{aspect_means.idxmax()}** ({aspect_means.max():.2f}/5.0)
     - El aspecto que requiere atención urgente es **{aspect_means.idxmin()}** ({aspect_means.min():.2f}/5.0)
-    
+
     **Implicaciones Estratégicas:**
     - Existe potencial para convertir clientes neutrales/negativos en promotores
     - La mejora en aspectos críticos del servicio puede incrementar significativamente la lealtad
     - Se recomienda priorizar inversiones en las áreas de menor puntuación
-    
+
     **Recomendación Principal:**
     Implementar un plan de acción integral centrado en mejorar {worst_aspect.lower()} y la experiencia general del cliente, 
     con el objetivo de aumentar la tasa de recomendación al 50% en los próximos 12 meses.
     """)
     st.markdown('</div>', unsafe_allow_html=True)
 
-def show_eda(df):
-    """Análisis Exploratorio de Datos"""
-    st.title("Análisis Exploratorio de Datos (EDA)")
-    st.markdown("### Exploración Detallada del Dataset")
-    display_story('Análisis Exploratorio')
+
+@profiled('Resumen Ejecutivo')
+def show_executive_summary(df):
+    """Resumen Ejecutivo para CEO"""
+    st.title("Resumen Ejecutivo: Análisis de Satisfacción del Cliente Ryanair")
+    st.markdown("### Informe para la Dirección Ejecutiva")
+    display_story('Resumen Ejecutivo')
     st.markdown("---")
     
-    # Información general
-    st.markdown("## Información General del Dataset")
+    # KPIs principales
+    kpis = _summary_kpis(df)
+    
+    st.markdown("---")
+    
+    # Análisis de sentimiento general
+    _summary_satisfaction(df)
     
+    st.markdown("---")
+    
+    # Aspectos del servicio
+    aspect_means = _summary_aspects(df)
+    
+    st.markdown("---")
+    
+    # Hallazgos clave
+    worst_aspect = _summary_findings(df, kpis, aspect_means)
+    
+    st.markdown("---")
+    
+    # Conclusión ejecutiva
+    _summary_conclusion(df, kpis, aspect_means, worst_aspect)
+
+@profiled('Información General del Dataset')
+def _eda_overview(df):
+    """Tamaño y período del dataset."""
+    st.markdown("## Información General del Dataset")
+
     col1, col2, col3 = st.columns(3)
     with col1:
         st.metric("Total de Registros", f"{len(df):,}")
@@ -205,14 +300,17 @@ def show_eda(df):
         st.metric("Columnas", f"{df.shape[1]}")
     with col3:
         st.metric("Período", f"{df['Date Published'].min().strftime('%Y-%m')} a {df['Date Published'].max().strftime('%Y-%m')}")
-    
-    st.markdown("---")
-    
-    # Distribución de calificaciones
+
+
+@profiled('Distribución de Calificaciones Generales')
+def _eda_rating_distribution(df):
+    """Histograma y estadísticos de la calificación general."""
+    import matplotlib.pyplot as plt
+
     st.markdown("## Distribución de Calificaciones Generales")
-    
+
     col1, col2 = st.columns([2, 1])
-    
+
     with col1:
         fig, ax = plt.subplots(figsize=(12, 6))
         rating_counts = df['Overall Rating'].value_counts().sort_index()
@@ -223,18 +321,18 @@ def show_eda(df):
         ax.set_ylabel('Número de Reseñas', fontsize=11, color='black')
         ax.tick_params(colors='black')
         ax.grid(axis='y', alpha=0.3)
-        
+
         # Agregar valores en las barras
         for bar in bars:
             height = bar.get_height()
             ax.text(bar.get_x() + bar.get_width()/2., height,
                    f'{int(height)}',
                    ha='center', va='bottom', fontsize=9, color='black')
-        
+
         plt.tight_layout()
         st.pyplot(fig)
         plt.close()
-    
+
     with col2:
         st.markdown("### Estadísticas")
         st.markdown(f"**Media:** {df['Overall Rating'].mean():.2f}")
@@ -243,7 +341,7 @@ def show_eda(df):
         st.markdown(f"**Desv. Estándar:** {df['Overall Rating'].std():.2f}")
         st.markdown(f"**Mínimo:** {df['Overall Rating'].min():.0f}")
         st.markdown(f"**Máximo:** {df['Overall Rating'].max():.0f}")
-        
+
         st.markdown("### Percentiles")
         st.markdown(f"**25%:** {df['Overall Rating'].quantile(0.25):.1f}")
         st.markdown(f"**50%:** {df['Overall Rating'].quantile(0.50):.1f}")
@@ -256,14 +354,17 @@ def show_eda(df):
     st.markdown(f'- **Calificación promedio (Overall Rating):** {avg_overall:.2f} / 10')
     st.markdown(f'- **Tasa de recomendación (approx.):** {rec_rate_approx:.1f}%')
     st.markdown('**Interpretación concreta:** La calificación media y la tasa de recomendación indican si una parte significativa de clientes recomendaría la aerolínea. Si la calificación y la recomendación están por debajo de niveles aceptables, prioriza intervenciones.')
-    
-    st.markdown("---")
-    
-    # Tipos de viajero
+
+
+@profiled('Análisis por Tipo de Viajero')
+def _eda_traveller_types(df):
+    """Reparto y calificación promedio por tipo de viajero."""
+    import matplotlib.pyplot as plt
+
     st.markdown("## Análisis por Tipo de Viajero")
-    
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
         fig, ax = plt.subplots(figsize=(10, 6))
         traveller_counts = df['Type Of Traveller'].value_counts()
@@ -283,11 +384,11 @@ def show_eda(df):
             "- **Acción práctica:** priorizar comunicaciones y mejoras para los segmentos con peor experiencia."
         )
         st.markdown('</div>', unsafe_allow_html=True)
-    
+
     with col2:
         # Calificación promedio por tipo de viajero
         traveller_rating = df.groupby('Type Of Traveller')['Overall Rating'].mean().sort_values(ascending=False)
-        
+
         fig, ax = plt.subplots(figsize=(10, 6))
         bars = ax.barh(traveller_rating.index, traveller_rating.values, color='coral')
         ax.set_title('Calificación Promedio por Tipo de Viajero', 
@@ -295,12 +396,12 @@ def show_eda(df):
         ax.set_xlabel('Calificación Promedio', fontsize=11, color='black')
         ax.tick_params(colors='black')
         ax.grid(axis='x', alpha=0.3)
-        
+
         for i, bar in enumerate(bars):
             width = bar.get_width()
             ax.text(width + 0.1, bar.get_y() + bar.get_height()/2, 
                    f'{width:.2f}', ha='left', va='center', fontsize=10, color='black')
-        
+
         plt.tight_layout()
         st.pyplot(fig)
         plt.close()
@@ -313,15 +414,18 @@ def show_eda(df):
             "- **Acción práctica:** diseñar acciones dirigidas (p. ej. políticas de equipaje para familias) y monitorizar su efecto."
         )
         st.markdown('</div>', unsafe_allow_html=True)
-    
-    st.markdown("---")
-    
-    # Recomendación vs Calificación
+
+
+@profiled('Relación entre Calificación y Recomendación')
+def _eda_rating_vs_recommendation(df):
+    """Porcentaje de recomendación según la calificación general."""
+    import matplotlib.pyplot as plt
+
     st.markdown("## Relación entre Calificación y Recomendación")
-    
+
     rec_by_rating = df.groupby('Overall Rating')['Recommended_bool'].agg(['sum', 'count'])
     rec_by_rating['percentage'] = (rec_by_rating['sum'] / rec_by_rating['count'] * 100)
-    
+
     fig, ax = plt.subplots(figsize=(12, 6))
     ax.plot(rec_by_rating.index, rec_by_rating['percentage'], marker='o', 
             linewidth=2, markersize=8, color='darkblue')
@@ -336,50 +440,53 @@ def show_eda(df):
     plt.tight_layout()
     st.pyplot(fig)
     plt.close()
-    
+
     st.markdown('<div class="insight-box">', unsafe_allow_html=True)
     st.markdown("""
     **Insight:** Existe una clara correlación positiva entre la calificación general y la probabilidad de recomendación. 
     Las calificaciones superiores a 7 muestran tasas de recomendación significativamente más altas.
     """)
     st.markdown('</div>', unsafe_allow_html=True)
-    
-    st.markdown("---")
-    
-    # Matriz de correlación
+
+
+@profiled('Correlación entre Aspectos del Servicio')
+def _eda_aspect_correlation(df):
+    """Matriz de correlación entre aspectos del servicio."""
+    import matplotlib.pyplot as plt
+
     st.markdown("## Correlación entre Aspectos del Servicio")
-    
+
     service_aspects = ['Overall Rating', 'Seat Comfort', 'Cabin Staff Service', 
                        'Food & Beverages', 'Ground Service', 'Value For Money']
     correlation_matrix = df[service_aspects].corr()
-    
+
     fig, ax = plt.subplots(figsize=(10, 8))
     im = ax.imshow(correlation_matrix, cmap='coolwarm', aspect='auto', vmin=-1, vmax=1)
-    
+
     # Configurar etiquetas
     ax.set_xticks(np.arange(len(service_aspects)))
     ax.set_yticks(np.arange(len(service_aspects)))
     ax.set_xticklabels(service_aspects, rotation=45, ha='right')
     ax.set_yticklabels(service_aspects)
     ax.tick_params(colors='black')
-    
+
     # Agregar valores de correlación
     for i in range(len(service_aspects)):
         for j in range(len(service_aspects)):
             text = ax.text(j, i, f'{correlation_matrix.iloc[i, j]:.2f}',
                          ha="center", va="center", color="black", fontsize=10)
-    
+
     ax.set_title('Matriz de Correlación - Aspectos del Servicio', 
                  fontsize=14, fontweight='bold', color='black', pad=20)
-    
+
     # Colorbar
     cbar = plt.colorbar(im, ax=ax)
     cbar.ax.tick_params(colors='black')
-    
+
     plt.tight_layout()
     st.pyplot(fig)
     plt.close()
-    
+
     st.markdown('<div class="insight-box">', unsafe_allow_html=True)
     st.markdown("""
     **Insight:** La correlación más fuerte con la calificación general se observa en aspectos específicos del servicio. 
@@ -387,19 +494,48 @@ def show_eda(df):
     """)
     st.markdown('</div>', unsafe_allow_html=True)
 
-def show_temporal_analysis(df):
-    """Análisis Temporal"""
-    st.title("Análisis Temporal de Reseñas")
-    st.markdown("### Evolución de la Satisfacción del Cliente")
-    display_story('Análisis Temporal')
+
+@profiled('Análisis Exploratorio')
+def show_eda(df):
+    """Análisis Exploratorio de Datos"""
+    st.title("Análisis Exploratorio de Datos (EDA)")
+    st.markdown("### Exploración Detallada del Dataset")
+    display_story('Análisis Exploratorio')
     st.markdown("---")
     
-    # Volumen de reseñas por mes
-    st.markdown("## Volumen de Reseñas a lo Largo del Tiempo")
+    # Información general
+    _eda_overview(df)
     
-    monthly_reviews = df.groupby('Month_Published').size()
-    monthly_reviews.index = monthly_reviews.index.astype(str)
+    st.markdown("---")
     
+    # Distribución de calificaciones
+    _eda_rating_distribution(df)
+    
+    st.markdown("---")
+    
+    # Tipos de viajero
+    _eda_traveller_types(df)
+    
+    st.markdown("---")
+    
+    # Recomendación vs Calificación
+    _eda_rating_vs_recommendation(df)
+    
+    st.markdown("---")
+    
+    # Matriz de correlación
+    _eda_aspect_correlation(df)
+
+@profiled('Volumen de Reseñas a lo Largo del Tiempo')
+def _temporal_volume(df):
+    """Reseñas por mes; devuelve el resumen mensual."""
+    import matplotlib.pyplot as plt
+
+    st.markdown("## Volumen de Reseñas a lo Largo del Tiempo")
+
+    monthly = monthly_summary(df)
+    monthly_reviews = monthly['reviews']
+
     fig, ax = plt.subplots(figsize=(14, 6))
     ax.bar(range(len(monthly_reviews)), monthly_reviews.values, color='steelblue', edgecolor='black')
     ax.set_title('Número de Reseñas por Mes', fontsize=14, fontweight='bold', color='black')
@@ -412,20 +548,20 @@ def show_temporal_analysis(df):
     plt.tight_layout()
     st.pyplot(fig)
     plt.close()
-    
-    st.markdown("---")
-    
-    # Tendencia de calificaciones
+    return monthly
+
+
+@profiled('Evolución de la Calificación Promedio')
+def _temporal_rating_trend(df, monthly):
+    """Calificación y recomendación mensual a partir del resumen mensual."""
+    import matplotlib.pyplot as plt
+
     st.markdown("## Evolución de la Calificación Promedio")
-    
-    monthly_avg = df.groupby('Month_Published').agg({
-        'Overall Rating': 'mean',
-        'Recommended_bool': lambda x: (x.sum() / x.notna().sum() * 100) if x.notna().sum() > 0 else 0
-    })
-    monthly_avg.index = monthly_avg.index.astype(str)
-    
+
+    monthly_avg = monthly[['Overall Rating', 'Recommended_bool']]
+
     fig, ax1 = plt.subplots(figsize=(14, 6))
-    
+
     color1 = 'darkblue'
     ax1.set_xlabel('Mes', fontsize=11, color='black')
     ax1.set_ylabel('Calificación Promedio (1-10)', fontsize=11, color=color1)
@@ -436,7 +572,7 @@ def show_temporal_analysis(df):
     ax1.set_xticks(range(len(monthly_avg)))
     ax1.set_xticklabels(monthly_avg.index, rotation=45, ha='right')
     ax1.grid(True, alpha=0.3)
-    
+
     # Segundo eje Y para tasa de recomendación
     ax2 = ax1.twinx()
     color2 = 'darkgreen'
@@ -445,15 +581,15 @@ def show_temporal_analysis(df):
                      color=color2, marker='s', linewidth=2, linestyle='--', 
                      label='% Recomendación')
     ax2.tick_params(axis='y', labelcolor=color2)
-    
+
     # Leyenda combinada
     lines = line1 + line2
     labels = [l.get_label() for l in lines]
     ax1.legend(lines, labels, loc='best')
-    
+
     ax1.set_title('Tendencia Temporal: Calificación y Recomendación', 
                   fontsize=14, fontweight='bold', color='black')
-    
+
     plt.tight_layout()
     st.pyplot(fig)
     plt.close()
@@ -477,17 +613,21 @@ def show_temporal_analysis(df):
     except Exception:
         rec_rate_overall = 0
     st.markdown(f"**Resumen global:** Calificación promedio **{avg_rating_overall:.2f}/10**, Tasa de recomendación **{rec_rate_overall:.1f}%**")
-    
-    st.markdown("---")
-    
-    # Análisis por año
+
+
+@profiled('Comparativa Anual')
+def _temporal_yearly(df):
+    """Calificación y recomendación por año."""
+    import matplotlib.pyplot as plt
+
     st.markdown("## Comparativa Anual")
-    
+
+    yearly = yearly_summary(df)
     col1, col2 = st.columns(2)
-    
+
     with col1:
-        yearly_avg = df.groupby('Year_Published')['Overall Rating'].mean()
-        
+        yearly_avg = yearly['Overall Rating']
+
         fig, ax = plt.subplots(figsize=(10, 6))
         bars = ax.bar(yearly_avg.index.astype(str), yearly_avg.values, 
                       color='coral', edgecolor='black')
@@ -497,22 +637,20 @@ def show_temporal_analysis(df):
         ax.tick_params(colors='black')
         ax.grid(axis='y', alpha=0.3)
         ax.set_ylim(0, 10)
-        
+
         for bar in bars:
             height = bar.get_height()
             ax.text(bar.get_x() + bar.get_width()/2., height,
                    f'{height:.2f}',
                    ha='center', va='bottom', fontsize=11, fontweight='bold', color='black')
-        
+
         plt.tight_layout()
         st.pyplot(fig)
         plt.close()
-    
+
     with col2:
-        yearly_rec = df.groupby('Year_Published')['Recommended_bool'].apply(
-            lambda x: (x.sum() / x.notna().sum() * 100) if x.notna().sum() > 0 else 0
-        )
-        
+        yearly_rec = yearly['Recommended_bool']
+
         fig, ax = plt.subplots(figsize=(10, 6))
         bars = ax.bar(yearly_rec.index.astype(str), yearly_rec.values, 
                       color='lightseagreen', edgecolor='black')
@@ -522,33 +660,37 @@ def show_temporal_analysis(df):
         ax.tick_params(colors='black')
         ax.grid(axis='y', alpha=0.3)
         ax.set_ylim(0, 100)
-        
+
         for bar in bars:
             height = bar.get_height()
             ax.text(bar.get_x() + bar.get_width()/2., height,
                    f'{height:.1f}%',
                    ha='center', va='bottom', fontsize=11, fontweight='bold', color='black')
-        
+
         plt.tight_layout()
         st.pyplot(fig)
         plt.close()
-    
-    st.markdown("---")
-    
-    # Insights temporales
+
+
+@profiled('Insights Temporales')
+def _temporal_insights(monthly):
+    """Tendencia y meses destacados del resumen mensual."""
+    monthly_reviews = monthly['reviews']
+    monthly_avg = monthly[['Overall Rating', 'Recommended_bool']]
+
     st.markdown("## Insights Temporales")
-    
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
         st.markdown('<div class="insight-box">', unsafe_allow_html=True)
         st.markdown("### Tendencias Identificadas")
-        
+
         # Calcular tendencia
         recent_avg = monthly_avg['Overall Rating'].tail(3).mean()
         older_avg = monthly_avg['Overall Rating'].head(3).mean()
         trend = "al alza" if recent_avg > older_avg else "a la baja"
-        
+
         st.markdown(f"""
         - La tendencia general de calificaciones está **{trend}**
         - Promedio últimos 3 meses: **{recent_avg:.2f}**
@@ -556,19 +698,19 @@ def show_temporal_analysis(df):
         - Cambio: **{((recent_avg - older_avg) / older_avg * 100):+.1f}%**
         """)
         st.markdown('</div>', unsafe_allow_html=True)
-    
+
     with col2:
         st.markdown('<div class="warning-box">', unsafe_allow_html=True)
         st.markdown("### Puntos de Atención")
-        
+
         # Mes con menor calificación
         worst_month = monthly_avg['Overall Rating'].idxmin()
         worst_score = monthly_avg['Overall Rating'].min()
-        
+
         # Mes con mayor volumen
         peak_month = monthly_reviews.idxmax()
         peak_count = monthly_reviews.max()
-        
+
         st.markdown(f"""
         - Mes con menor calificación: **{worst_month}** ({worst_score:.2f})
         - Mayor volumen de reseñas: **{peak_month}** ({peak_count} reseñas)
@@ -576,43 +718,114 @@ def show_temporal_analysis(df):
         """)
         st.markdown('</div>', unsafe_allow_html=True)
 
-def show_rating_analysis(df):
-    """Análisis Detallado de Calificaciones"""
-    st.title("Análisis Detallado de Calificaciones")
-    st.markdown("### Evaluación Profunda de la Satisfacción")
+
+@profiled('Análisis Temporal')
+def show_temporal_analysis(df, term_matrix=None):
+    """Análisis Temporal"""
+    st.title("Análisis Temporal de Reseñas")
+    st.markdown("### Evolución de la Satisfacción del Cliente")
+    display_story('Análisis Temporal')
     st.markdown("---")
     
-    # Aspectos del servicio
-    service_aspects = SERVICE_ASPECTS
+    # Volumen de reseñas por mes
+    monthly = _temporal_volume(df)
     
-    st.markdown("## Calificaciones por Aspecto del Servicio")
+    st.markdown("---")
+    
+    # Tendencia de calificaciones
+    _temporal_rating_trend(df, monthly)
+    
+    st.markdown("---")
+
+    if term_matrix is not None:
+        show_term_trends(df, term_matrix)
+        st.markdown("---")
+    
+    # Análisis por año
+    _temporal_yearly(df)
     
+    st.markdown("---")
+    
+    # Insights temporales
+    _temporal_insights(monthly)
+
+@profiled('Términos Mencionados en los Comentarios')
+def show_term_trends(df, term_matrix):
+    """Frecuencia mensual de términos en los comentarios (desde la matriz términos × mes)."""
+    import matplotlib.pyplot as plt
+
+    st.markdown("## Términos Mencionados en los Comentarios")
+
+    months = sorted(m for m in df['Month_Published'].astype(str).unique() if m != 'NaT')
+    terms_text = st.text_input('Términos a seguir (separados por comas):', value='delay, refund, boarding')
+    terms = [t.strip() for t in terms_text.split(',') if t.strip()]
+
+    if terms and len(months) > 1:
+        trend = term_matrix.trend(terms, months)
+        fig, ax = plt.subplots(figsize=(14, 6))
+        for term in trend.columns:
+            ax.plot(range(len(trend)), trend[term].values, marker='o', linewidth=2, label=term)
+        ax.set_title('% de Reseñas del Mes que Mencionan cada Término', fontsize=14, fontweight='bold', color='black')
+        ax.set_xlabel('Mes', fontsize=11, color='black')
+        ax.set_ylabel('% de Reseñas', fontsize=11, color='black')
+        ax.set_xticks(range(len(trend)))
+        ax.set_xticklabels(trend.index, rotation=45, ha='right')
+        ax.tick_params(colors='black')
+        ax.grid(alpha=0.3)
+        ax.legend(loc='best')
+        plt.tight_layout()
+        st.pyplot(fig)
+        plt.close()
+        unknown = [term for term in trend.columns if term not in term_matrix]
+        if unknown:
+            st.caption(f"Sin menciones (o no es una sola palabra): {', '.join(unknown)}")
+
+    window = 6
+    rising = term_matrix.rising_terms(window, months)
+    st.markdown(f"**Términos en alza:** últimos {window} meses frente a los {window} anteriores")
+    if rising.empty:
+        st.info('No hay meses suficientes en la selección para comparar ventanas.')
+    else:
+        st.dataframe(
+            rising.style.format({'% reciente': '{:.1f}%', '% anterior': '{:.1f}%', 'Cambio (pp)': '{:+.1f}'}),
+            use_container_width=True, hide_index=True
+        )
+    st.caption('Calculado sobre todas las reseñas de los meses seleccionados; los demás filtros no se aplican.')
+
+
+@profiled('Calificaciones por Aspecto del Servicio')
+def _ratings_boxplot(df, service_aspects):
+    """Boxplot de las calificaciones por aspecto y KPIs rápidos."""
+    import matplotlib.pyplot as plt
+
+    st.markdown("## Calificaciones por Aspecto del Servicio")
+
     # Boxplot comparativo
     fig, ax = plt.subplots(figsize=(14, 7))
-    
+
     # Preparar datos para boxplot
     data_to_plot = [df[aspect].dropna() for aspect in service_aspects]
-    
+
     bp = ax.boxplot(data_to_plot, labels=service_aspects, patch_artist=True,
                     showmeans=True, meanline=True)
-    
+
     # Colorear boxes
     colors = ['lightblue', 'lightgreen', 'lightyellow', 'lightcoral', 'plum']
     for patch, color in zip(bp['boxes'], colors):
         patch.set_facecolor(color)
         patch.set_edgecolor('black')
-    
+
     # Configurar líneas
     for element in ['whiskers', 'fliers', 'means', 'medians', 'caps']:
         plt.setp(bp[element], color='black')
-    
+
     ax.set_title('Distribución de Calificaciones por Aspecto del Servicio (Boxplot)', 
                  fontsize=14, fontweight='bold', color='black')
     ax.set_ylabel('Calificación (1-5)', fontsize=11, color='black')
     ax.tick_params(colors='black')
     ax.grid(axis='y', alpha=0.3)
     ax.set_xticklabels(service_aspects, rotation=45, ha='right')
-    
+
     plt.tight_layout()
     st.pyplot(fig)
     plt.close()
@@ -630,12 +843,13 @@ def show_rating_analysis(df):
     recommendation_rate = calculate_recommendation_rate(df)
     nps = calculate_nps(df)
     st.markdown(f"**KPIs rápidos:** Total: **{total_reviews:,}**, Promedio: **{avg_rating:.2f}/10**, Recomendación: **{recommendation_rate:.1f}%**, NPS aprox.: **{nps:.1f}**")
-    
-    st.markdown("---")
-    
-    # Comparación de aspectos
+
+
+@profiled('Comparación Detallada por Aspecto')
+def _ratings_aspect_table(df, service_aspects):
+    """Tabla de estadísticos por aspecto."""
     st.markdown("## Comparación Detallada por Aspecto")
-    
+
     aspect_stats = pd.DataFrame({
         'Promedio': df[service_aspects].mean(),
         'Mediana': df[service_aspects].median(),
@@ -643,28 +857,31 @@ def show_rating_analysis(df):
         'Mínimo': df[service_aspects].min(),
         'Máximo': df[service_aspects].max()
     }).round(2)
-    
+
     st.dataframe(aspect_stats.style.background_gradient(cmap='RdYlGn', subset=['Promedio']), 
                  use_container_width=True)
     st.markdown("**Interpretación rápida:**")
     st.markdown(
         "La tabla muestra promedios y dispersiones por aspecto. Prioriza los aspectos con menor promedio y mayor número de reseñas para mejorar impacto."
     )
-    
-    st.markdown("---")
-    
-    # Análisis por categoría de rating
+
+
+@profiled('Distribución de Aspectos según Categoría de Satisfacción')
+def _ratings_by_category(df, service_aspects):
+    """Calificación promedio de los aspectos en cada categoría de satisfacción."""
+    import matplotlib.pyplot as plt
+
     st.markdown("## Distribución de Aspectos según Categoría de Satisfacción")
-    
+
     for category in ['Positivo (8-10)', 'Neutral (4-7)', 'Negativo (1-3)']:
         if category in df['Rating_Category'].unique():
             st.markdown(f"### {category}")
-            
+
             df_cat = df[df['Rating_Category'] == category]
             aspect_means_cat = df_cat[service_aspects].mean().sort_values(ascending=False)
-            
+
             fig, ax = plt.subplots(figsize=(12, 5))
-            
+
             # Determinar color según categoría
             if 'Positivo' in category:
                 color = 'forestgreen'
@@ -672,7 +889,7 @@ def show_rating_analysis(df):
                 color = 'goldenrod'
             else:
                 color = 'crimson'
-            
+
             bars = ax.bar(aspect_means_cat.index, aspect_means_cat.values, 
                          color=color, alpha=0.7, edgecolor='black')
             ax.set_title(f'Calificación Promedio de Aspectos - {category}', 
@@ -681,13 +898,13 @@ def show_rating_analysis(df):
             ax.tick_params(colors='black')
             ax.grid(axis='y', alpha=0.3)
             plt.xticks(rotation=45, ha='right')
-            
+
             for bar in bars:
                 height = bar.get_height()
                 ax.text(bar.get_x() + bar.get_width()/2., height,
                        f'{height:.2f}',
                        ha='center', va='bottom', fontsize=10, color='black')
-            
+
             plt.tight_layout()
             st.pyplot(fig)
             plt.close()
@@ -697,12 +914,15 @@ def show_rating_analysis(df):
                 f"Este gráfico muestra las calificaciones promedio de los aspectos para la categoría **{category}**. "
                 "Si una barra es significativamente más baja que las demás, enfoca mejoras allí para ese grupo de clientes."
             )
-    
-    st.markdown("---")
-    
-    # Correlación con recomendación
+
+
+@profiled('Impacto de Cada Aspecto en la Recomendación')
+def _ratings_recommendation_impact(df, service_aspects):
+    """Correlación de cada aspecto con la recomendación."""
+    import matplotlib.pyplot as plt
+
     st.markdown("## Impacto de Cada Aspecto en la Recomendación")
-    
+
     correlations = []
     for aspect in service_aspects:
         valid_data = df[[aspect, 'Recommended_bool']].dropna()
@@ -711,12 +931,12 @@ def show_rating_analysis(df):
             correlations.append(corr)
         else:
             correlations.append(0)
-    
+
     corr_df = pd.DataFrame({
         'Aspecto': service_aspects,
         'Correlación con Recomendación': correlations
     }).sort_values('Correlación con Recomendación', ascending=False)
-    
+
     fig, ax = plt.subplots(figsize=(12, 6))
     colors_corr = ['green' if x > 0 else 'red' for x in corr_df['Correlación con Recomendación']]
     bars = ax.barh(corr_df['Aspecto'], corr_df['Correlación con Recomendación'], color=colors_corr)
@@ -726,7 +946,7 @@ def show_rating_analysis(df):
     ax.tick_params(colors='black')
     ax.axvline(x=0, color='black', linestyle='-', linewidth=1)
     ax.grid(axis='x', alpha=0.3)
-    
+
     for i, bar in enumerate(bars):
         width = bar.get_width()
         ax.text(width + 0.01 if width > 0 else width - 0.01, 
@@ -734,11 +954,11 @@ def show_rating_analysis(df):
                f'{width:.3f}',
                ha='left' if width > 0 else 'right', 
                va='center', fontsize=10, color='black')
-    
+
     plt.tight_layout()
     st.pyplot(fig)
     plt.close()
-    
+
     st.markdown('<div class="insight-box">', unsafe_allow_html=True)
     st.markdown(f"""
     **Insight Clave:** El aspecto **{corr_df.iloc[0]['Aspecto']}** muestra la correlación más fuerte 
@@ -748,13 +968,39 @@ def show_rating_analysis(df):
     st.markdown('</div>', unsafe_allow_html=True)
 
 
-def show_geographic_analysis(df):
-    """Análisis Geográfico: países, rutas y calificaciones por ubicación."""
-    st.title("Análisis Geográfico")
-    st.markdown("### Distribución Geográfica de Reseñas")
+@profiled('Análisis de Calificaciones')
+def show_rating_analysis(df):
+    """Análisis Detallado de Calificaciones"""
+    st.title("Análisis Detallado de Calificaciones")
+    st.markdown("### Evaluación Profunda de la Satisfacción")
+    st.markdown("---")
+    
+    # Aspectos del servicio
+    service_aspects = SERVICE_ASPECTS
+    
+    _ratings_boxplot(df, service_aspects)
+    
+    st.markdown("---")
+    
+    # Comparación de aspectos
+    _ratings_aspect_table(df, service_aspects)
+    
     st.markdown("---")
+    
+    # Análisis por categoría de rating
+    _ratings_by_category(df, service_aspects)
+    
+    st.markdown("---")
+    
+    # Correlación con recomendación
+    _ratings_recommendation_impact(df, service_aspects)
+
+
+@profiled('Top Países por Número de Reseñas')
+def _geo_top_countries(df):
+    """Países con más reseñas."""
+    import matplotlib.pyplot as plt
 
-    # Top países por número de reseñas
     st.markdown("## Top Países por Número de Reseñas")
     top_countries = df['Passenger Country'].value_counts().head(TOP_N_COUNTRIES)
     fig, ax = plt.subplots(figsize=(12, 6))
@@ -784,17 +1030,17 @@ def show_geographic_analysis(df):
         "El Reino Unido y otros mercados clave concentran gran parte del volumen; prioriza pilotos y acciones en esos mercados para obtener impacto rápido. "
         "Revisa también la satisfacción relativa por país para detectar focos problemáticos locales."
     )
-    st.markdown('---')
 
-    # Calificación promedio por país (top 15 por volumen)
+
+@profiled('Calificación Promedio por País (Top 15 por Volumen)')
+def _geo_country_ratings(df):
+    """Calificación promedio de los países con más reseñas."""
+    import matplotlib.pyplot as plt
+
     st.markdown("## Calificación Promedio por País (Top 15 por Volumen)")
-    country_ratings = df.groupby('Passenger Country').agg({
-        'Overall Rating': 'mean',
-        'Passenger Country': 'count'
-    }).rename(columns={'Passenger Country': 'Count'}).sort_values('Count', ascending=False).head(TOP_N_COUNTRIES)
-    country_ratings = country_ratings.sort_values('Overall Rating', ascending=True)
+    country_ratings = compute_country_ratings(df, TOP_N_COUNTRIES)
     fig, ax = plt.subplots(figsize=(12, 6))
-    bars = ax.barh(country_ratings.index, country_ratings['Overall Rating'], color=plt.cm.RdYlGn(country_ratings['Overall Rating']/10))
+    bars = ax.barh(country_ratings.index, country_ratings['Overall Rating'], color=plt.cm.RdYlGn(country_ratings['Overall Rating'].values / 10))
     ax.set_title('Calificación Promedio por País (Top 15)', fontsize=14, fontweight='bold')
     ax.set_xlabel('Calificación Promedio')
     ax.set_xlim(0, 10)
@@ -805,9 +1051,12 @@ def show_geographic_analysis(df):
     st.pyplot(fig)
     plt.close()
 
-    st.markdown('---')
 
-    # Rutas más populares
+@profiled('Rutas Más Populares')
+def _geo_top_routes(df):
+    """Rutas con más reseñas."""
+    import matplotlib.pyplot as plt
+
     st.markdown("## Rutas Más Populares")
     # La columna 'Route' ya se crea en load_data
     top_routes = df['Route'].value_counts().head(TOP_N_ROUTES)
@@ -828,18 +1077,17 @@ def show_geographic_analysis(df):
     for route, cnt in top5_routes.items():
         st.markdown(f"- **{route}**: {int(cnt):,} reseñas")
 
-    st.markdown('---')
 
-    # Calificación promedio por ruta (con al menos MIN_REVIEWS_FOR_ROUTE_ANALYSIS reseñas)
+@profiled('Calificación Promedio por Ruta')
+def _geo_route_ratings(df):
+    """Peores rutas por calificación promedio."""
+    import matplotlib.pyplot as plt
+
     st.markdown(f"## Calificación Promedio por Ruta (mínimo {MIN_REVIEWS_FOR_ROUTE_ANALYSIS} reseñas)")
-    route_ratings = df.groupby('Route').agg({
-        'Overall Rating': 'mean',
-        'Route': 'count'
-    }).rename(columns={'Route': 'Count'})
-    route_ratings = route_ratings[route_ratings['Count'] >= MIN_REVIEWS_FOR_ROUTE_ANALYSIS].sort_values('Overall Rating', ascending=True).head(TOP_N_ROUTES)
+    route_ratings = compute_route_ratings(df, MIN_REVIEWS_FOR_ROUTE_ANALYSIS, TOP_N_ROUTES)
     if not route_ratings.empty:
         fig, ax = plt.subplots(figsize=(12, 6))
-        bars = ax.barh(route_ratings.index, route_ratings['Overall Rating'], color=plt.cm.RdYlGn(route_ratings['Overall Rating']/10))
+        bars = ax.barh(route_ratings.index, route_ratings['Overall Rating'], color=plt.cm.RdYlGn(route_ratings['Overall Rating'].values / 10))
         ax.set_title('Peores Rutas por Calificación (mínimo 5 reseñas)', fontsize=14, fontweight='bold')
         ax.set_xlabel('Calificación Promedio')
         ax.set_xlim(0, 10)
@@ -853,19 +1101,39 @@ def show_geographic_analysis(df):
     else:
         st.info('No hay rutas con al menos 5 reseñas para mostrar.')
 
-def show_recommendations(df):
-    """Recomendaciones Estratégicas (texto adaptado desde el notebook)"""
-    st.title("Recomendaciones Estratégicas")
-    st.markdown("### Plan de Acción y Recomendaciones")
+
+@profiled('Análisis Geográfico')
+def show_geographic_analysis(df):
+    """Análisis Geográfico: países, rutas y calificaciones por ubicación."""
+    st.title("Análisis Geográfico")
+    st.markdown("### Distribución Geográfica de Reseñas")
     st.markdown("---")
 
+    # Top países por número de reseñas
+    _geo_top_countries(df)
+    st.markdown('---')
+
+    # Calificación promedio por país (top 15 por volumen)
+    _geo_country_ratings(df)
+
+    st.markdown('---')
+
+    # Rutas más populares
+    _geo_top_routes(df)
+
+    st.markdown('---')
+
+    # Calificación promedio por ruta (con al menos MIN_REVIEWS_FOR_ROUTE_ANALYSIS reseñas)
+    _geo_route_ratings(df)
+
+@profiled('Resumen de KPIs')
+def _recommendations_kpis(df):
+    """Resumen de KPIs de la página de recomendaciones; devuelve el resultado de kpi_summary."""
     # Métricas clave
-    total_reviews = len(df)
-    avg_rating = df['Overall Rating'].mean()
-    recommendation_rate = calculate_recommendation_rate(df)
-    nps = calculate_nps(df)
-    positive_rate = (df['Sentiment'] == 'Positivo').sum() / total_reviews * 100 if total_reviews > 0 else 0
-    negative_rate = (df['Sentiment'] == 'Negativo').sum() / total_reviews * 100 if total_reviews > 0 else 0
+    kpis = kpi_summary(df)
+    total_reviews, avg_rating = kpis['total_reviews'], kpis['avg_rating']
+    recommendation_rate, nps = kpis['recommendation_rate'], kpis['nps']
+    positive_rate, negative_rate = kpis['positive_rate'], kpis['negative_rate']
 
     st.markdown("### ✅ Resumen de KPIs")
     st.markdown(f"- **Total de Reseñas:** {total_reviews:,}")
@@ -874,14 +1142,71 @@ def show_recommendations(df):
     st.markdown(f"- **Reseñas Positivas:** {positive_rate:.1f}%")
     st.markdown(f"- **Reseñas Negativas:** {negative_rate:.1f}%")
     st.markdown(f"- **NPS aproximado:** {nps:.1f}")
+    return kpis
 
-    st.markdown('---')
+
+@profiled('Áreas Críticas de Mejora')
+def _recommendations_complaints(df):
+    """Categorías de queja más frecuentes, su tendencia y su evolución mensual."""
+    import matplotlib.pyplot as plt
 
     st.markdown('#### 📌 Áreas Críticas de Mejora')
-    st.markdown("- **Servicio en Tierra (Ground Service):** Es típicamente el aspecto peor valorado — acción: mejorar capacitación y procesos de check-in.")
-    st.markdown("- **Transparencia de Precios:** Muchas quejas sobre cargos ocultos — acción: clarificar tarifas en el proceso de reserva.")
-    st.markdown("- **Gestión de Equipaje:** Problemas y cobros frecuentes — acción: revisar políticas y comunicación.")
-    st.markdown("- **Comunicación con Pasajeros:** Falta de información en retrasos/incidencias — acción: implementar comunicación proactiva.")
+    trend_months = 6
+    categories = category_summary(df, recent_months=trend_months)
+    if categories['Reseñas'].sum() == 0:
+        st.info('Ninguna reseña de la selección menciona las categorías de queja.')
+    else:
+        for name, row in categories[categories['Reseñas'] > 0].head(4).iterrows():
+            trend = row['Tendencia (pp)']
+            trend_text = ('' if pd.isna(trend)
+                          else f", {trend:+.1f} pp desde {categories.attrs['trend_since']}")
+            st.markdown(
+                f"- **{name}:** {int(row['Reseñas']):,} reseñas ({row['% del total']:.1f}%), "
+                f"{row['% no recomienda']:.0f}% no recomienda{trend_text} — acción: "
+                f"{COMPLAINT_CATEGORIES[name]['action'][0].lower()}{COMPLAINT_CATEGORIES[name]['action'][1:]}"
+            )
+
+        st.dataframe(
+            categories.style.format({
+                '% del total': '{:.1f}%', '% no recomienda': '{:.1f}%', 'Tendencia (pp)': '{:+.1f}'
+            }, na_rep='—'),
+            use_container_width=True
+        )
+
+        share = monthly_share(df)
+        if len(share) > 1:
+            top = categories.index[:4]
+            fig, ax = plt.subplots(figsize=FIGURE_SIZES['extra_large'])
+            for name in top:
+                ax.plot(range(len(share)), share[name].values, marker='o', linewidth=2, label=name)
+            ax.set_title('Menciones por Categoría de Queja (% de reseñas del mes)',
+                         fontsize=14, fontweight='bold', color='black')
+            ax.set_xlabel('Mes', fontsize=11, color='black')
+            ax.set_ylabel('% de Reseñas', fontsize=11, color='black')
+            ax.set_xticks(range(len(share)))
+            ax.set_xticklabels(share.index, rotation=45, ha='right')
+            ax.tick_params(colors='black')
+            ax.grid(alpha=0.3)
+            ax.legend(loc='best')
+            plt.tight_layout()
+            st.pyplot(fig)
+            plt.close()
+
+
+@profiled('Recomendaciones Estratégicas')
+def show_recommendations(df):
+    """Recomendaciones Estratégicas (texto adaptado desde el notebook)"""
+    st.title("Recomendaciones Estratégicas")
+    st.markdown("### Plan de Acción y Recomendaciones")
+    st.markdown("---")
+
+    kpis = _recommendations_kpis(df)
+    total_reviews, avg_rating = kpis['total_reviews'], kpis['avg_rating']
+    recommendation_rate = kpis['recommendation_rate']
+
+    st.markdown('---')
+
+    _recommendations_complaints(df)
 
     st.markdown('---')
 
@@ -951,23 +1276,58 @@ def show_recommendations(df):
     """)
     st.markdown('</div>', unsafe_allow_html=True)
 
-def main():
+def show_profiling_diagnostics(profiler, trace):
+    """Panel lateral con las secciones más lentas de esta ejecución y del proceso"""
+    with st.sidebar.expander("🩺 Diagnóstico de Rendimiento", expanded=False):
+        slowest = pd.DataFrame(trace.slowest(PROFILING_TOP_N))
+        if not slowest.empty:
+            st.markdown("**Esta ejecución**")
+            st.dataframe(
+                slowest[['section', 'wall_ms', 'cpu_ms', 'memory_mb']].rename(columns={
+                    'section': 'sección', 'wall_ms': 'tiempo (ms)', 'cpu_ms': 'CPU (ms)', 'memory_mb': 'memoria (MB)'
+                }).round(1),
+                hide_index=True
+            )
+            if not trace.trace_memory:
+                st.caption("Memoria solo en ejecuciones muestreadas o con la opción de abajo activada.")
+
+        snapshot = profiler.recorder.snapshot()
+        if snapshot:
+            st.markdown("**Acumulado del proceso**")
+            table = pd.DataFrame(snapshot).T[['count', 'p50', 'p95', 'max']]
+            table[['p50', 'p95', 'max']] *= 1000
+            table['count'] = table['count'].astype(int)
+            table = table.sort_values('p95', ascending=False).head(PROFILING_TOP_N)
+            st.dataframe(table.rename(columns={'count': 'ejecuciones', 'p50': 'p50 (ms)', 'p95': 'p95 (ms)',
+                                               'max': 'máx (ms)'}).round(1))
+
+        st.toggle("Medir memoria en cada ejecución", key='profile_memory',
+                  help="Activa tracemalloc en esta sesión (más lento); por defecto solo se mide en una muestra")
+        st.download_button("📥 Descargar trazas", profiler.traces_text(), file_name=PROFILING_TRACES_PATH,
+                           mime='application/jsonl')
+        if st.button("💾 Guardar trazas en disco"):
+            profiler.export(PROFILING_TRACES_PATH)
+            st.success(f"{len(profiler.traces):,} trazas guardadas en {PROFILING_TRACES_PATH}")
+        if st.button("🗑️ Reiniciar perfilado"):
+            profiler.reset()
+
+
+def render_dashboard():
     # Cargar datos: permitir uploader en sidebar si no hay CSV disponible
     uploaded_file = st.sidebar.file_uploader('Upload reviews CSV', type=['csv'])
-    if uploaded_file is not None:
-        df = load_data(uploaded_file)
-    else:
-        df = load_data()
+    with profile_section('load_data'):
+        if uploaded_file is not None:
+            df = load_data(uploaded_file)
+        else:
+            df = load_data()
 
     # Botón para recargar datos sin reiniciar el servidor
     if st.sidebar.button('Recargar datos'):
+        load_data.clear()
         try:
             st.cache_data.clear()
         except Exception:
-            try:
-                load_data.clear()
-            except Exception:
-                pass
+            pass
 
         if uploaded_file is not None:
             new_df = load_data(uploaded_file)
@@ -986,6 +1346,16 @@ def main():
         st.info('Sube el CSV usando el uploader en la barra lateral para continuar.')
         return
 
+    # Categorías de queja precalculadas: las páginas solo agregan la máscara
+    with profile_section('ingest'):
+        documents, corpus_key = get_documents(df)
+        data_path = resolve_data_path() if uploaded_file is None else None
+        df[TAGS_COLUMN] = get_complaint_tags(documents, corpus_key)
+        df[DUPLICATE_COLUMN] = get_duplicates(df, corpus_key, data_path)
+        df[SCORE_COLUMN] = get_text_sentiment(df, corpus_key)
+        df[LABEL_COLUMN] = sentiment_label(df[SCORE_COLUMN])
+        term_matrix = get_term_matrix(df, corpus_key, data_path)
+
     # Guardar en session_state para uso interactivo
     st.session_state['df'] = df
 
@@ -1031,6 +1401,14 @@ def main():
         default=sorted(df['Type Of Traveller'].dropna().unique())
     )
 
+    # Filtro por sentimiento del texto del comentario (independiente de la calificación)
+    text_sentiments = st.sidebar.multiselect(
+        "Sentimiento del comentario:",
+        options=[SENTIMENT_CATEGORIES[k] for k in ('positive', 'neutral', 'negative', 'unknown')],
+        default=[],
+        help="Calculado sobre el texto; incluye reseñas sin calificación. Vacío = todas"
+    )
+
     # Filtro por país
     all_countries = sorted(df['Passenger Country'].dropna().unique())
     country_filter = st.sidebar.multiselect(
@@ -1047,22 +1425,44 @@ def main():
         value=(1, 10)
     )
 
-    # Aplicar filtros básicos
-    df_filtered = apply_filters(df, date_range, verification_filter)
-
-    # Aplicar filtros adicionales
-    if traveller_types:
-        df_filtered = df_filtered[df_filtered['Type Of Traveller'].isin(traveller_types)]
+    # Búsqueda de texto sobre el índice invertido de los comentarios
+    text_query = st.sidebar.text_input(
+        "Buscar en comentarios:",
+        help='Palabras (todas deben aparecer), "frases exactas" entre comillas y prefijos con * (p. ej. bag*)'
+    )
 
-    if 'Todos' not in country_filter and country_filter:
-        df_filtered = df_filtered[df_filtered['Passenger Country'].isin(country_filter)]
+    # Reseñas casi duplicadas (reposts y sindicadas): se marcan siempre y se
+    # excluyen si se activa el interruptor
+    n_duplicates = int((df[DUPLICATE_COLUMN] >= 0).sum())
+    collapse_duplicates = st.sidebar.toggle(
+        "Contraer reseñas duplicadas",
+        value=False,
+        help=f"{n_duplicates:,} reseñas son casi idénticas a otra publicada antes; al activarlo solo se cuenta la original"
+    )
 
-    df_filtered = df_filtered[
-        (df_filtered['Overall Rating'] >= rating_range[0]) &
-        (df_filtered['Overall Rating'] <= rating_range[1])
-    ]
+    with profile_section('filters'):
+        text_matches = None
+        if text_query.strip():
+            with profile_section('text_search'):
+                text_matches = get_text_index(documents, corpus_key).search(text_query, documents)
+
+        # Todos los filtros en una sola máscara (ver analytics.filter_reviews)
+        df_filtered = filter_reviews(df, ReviewFilters(
+            date_range=date_range,
+            verification=verification_filter,
+            traveller_types=traveller_types,
+            text_sentiments=text_sentiments,
+            countries=None if 'Todos' in country_filter else country_filter,
+            rating_range=rating_range,
+            collapse_duplicates=collapse_duplicates,
+            text_matches=text_matches,
+        ))
 
     st.sidebar.markdown(f"**Reseñas seleccionadas:** {len(df_filtered):,} de {len(df):,}")
+    if not collapse_duplicates:
+        n_flagged = int((df_filtered[DUPLICATE_COLUMN] >= 0).sum())
+        if n_flagged:
+            st.sidebar.caption(f"⚠️ {n_flagged:,} posibles duplicados en la selección")
 
     # Botón para exportar datos filtrados
     if st.sidebar.button('📥 Exportar datos filtrados'):
@@ -1080,7 +1480,7 @@ def main():
     elif page == "Análisis Exploratorio":
         show_eda(df_filtered)
     elif page == "Análisis Temporal":
-        show_temporal_analysis(df_filtered)
+        show_temporal_analysis(df_filtered, term_matrix)
     elif page == "Análisis de Calificaciones":
         show_rating_analysis(df_filtered)
     elif page == "Recomendaciones Estratégicas":
@@ -1089,5 +1489,13 @@ def main():
         show_geographic_analysis(df_filtered)
 
 
+def main():
+    # Cada ejecución del script se mide por secciones; el panel lateral muestra las más lentas
+    profiler = get_profiler()
+    with profiler.rerun(trace_memory=st.session_state.get('profile_memory', False)) as trace:
+        render_dashboard()
+        show_profiling_diagnostics(profiler, trace)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,298 @@
+"""
+Scoring por lotes del modelo de recomendación de Ryanair.
+
+Lee un CSV de reseñas por bloques, alinea las columnas con el modelo de forma
+vectorizada, calcula `predict_proba` en un pool de procesos y escribe las
+predicciones en streaming a un CSV de salida. Con `--explain` añade las
+atribuciones TreeSHAP de cada aspecto (columnas `SHAP_*`).
+
+Uso:
+    python batch_predict.py "ryanair_reviews (1).csv" predicciones.csv --only-missing
+"""
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from config import MODEL_PATH, SERVICE_ASPECTS, BATCH_CHUNK_SIZE, FEATURE_STORE_DIR
+from ml_utils import load_model, align_features, model_category_levels, model_impute_values
+from ml_runtime import FlatForest
+from ml_explain import shap_values, group_attributions
+from ml_features import load_or_materialize, load_feature_set
+
+# Modelo (y runtime para explicaciones) cargado una vez por proceso worker
+_worker_model = None
+_worker_explainer = None
+# Matriz del almacén de features, abierta (memory-mapped) una vez por proceso
+_worker_features = None
+
+
+def _load(model_path, explain):
+    """Cargar el modelo y, si se piden explicaciones, su versión aplanada."""
+    model = load_model(model_path)
+    return model, FlatForest.from_sklearn(model) if explain else None
+
+
+def _init_worker(model_path, explain):
+    """Cargar el modelo en el proceso worker."""
+    global _worker_model, _worker_explainer
+    _worker_model, _worker_explainer = _load(model_path, explain)
+
+
+def score_chunk(model, chunk, impute_values=None, explainer=None):
+    """
+    Calcular predicción y probabilidad para un bloque de reseñas.
+
+    Args:
+        model: Modelo entrenado con `feature_names_in_` y `predict_proba`.
+        chunk: DataFrame con las reseñas a evaluar.
+        impute_values: Dict aspecto -> valor para rellenar nulos.
+        explainer: FlatForest para calcular atribuciones TreeSHAP (opcional).
+
+    Returns:
+        pd.DataFrame: Columnas 'Prediction' y 'Probability' (clase positiva) y,
+        con `explainer`, 'SHAP_base' y una columna 'SHAP_<variable>' por aspecto.
+    """
+    X = align_features(chunk, model.feature_names_in_, impute_values, model_category_levels(model))
+    return score_features(model, X, explainer)
+
+
+def score_features(model, X, explainer=None):
+    """
+    Calcular predicción y probabilidad sobre una matriz ya alineada.
+
+    Args:
+        model: Modelo entrenado con `predict_proba`.
+        X: DataFrame con las columnas del modelo.
+        explainer: FlatForest para calcular atribuciones TreeSHAP (opcional).
+
+    Returns:
+        pd.DataFrame: Mismas columnas que `score_chunk`, con el índice de `X`.
+    """
+    proba = model.predict_proba(X)
+    classes = np.asarray(model.classes_)
+    result = pd.DataFrame({
+        'Prediction': classes[proba.argmax(axis=1)],
+        'Probability': proba[:, list(classes).index(1)]
+    }, index=X.index)
+
+    if explainer is not None:
+        phi, base = shap_values(explainer, X)
+        result['SHAP_base'] = base
+        for name, values in group_attributions(phi, explainer.feature_names_in_).items():
+            result[f'SHAP_{name}'] = values
+    return result
+
+
+def _score_in_worker(chunk, impute_values):
+    return score_chunk(_worker_model, chunk, impute_values, _worker_explainer)
+
+
+def _store_rows(store_dir, version, start, stop, feature_names):
+    """Vista de las filas [start, stop) del almacén con las columnas del modelo."""
+    global _worker_features
+    if _worker_features is None or _worker_features.version != version:
+        _worker_features = load_feature_set(version, store_dir)
+    X = _worker_features.frame(labeled=None).iloc[start:stop]
+    if list(X.columns) != list(feature_names):
+        X = X.reindex(columns=feature_names, fill_value=0)
+    return X
+
+
+def _score_store_in_worker(store_dir, version, start, stop):
+    X = _store_rows(store_dir, version, start, stop, _worker_model.feature_names_in_)
+    return score_features(_worker_model, X, _worker_explainer)
+
+
+def compute_impute_values(input_path):
+    """
+    Calcular la mediana de cada aspecto leyendo solo esas columnas.
+
+    Solo para modelos anteriores que no guardan las medianas de entrenamiento
+    (`ml_utils.model_impute_values`): con ellas la predicción de una fila no
+    depende de las demás filas del archivo.
+
+    Args:
+        input_path: Ruta del CSV de entrada.
+
+    Returns:
+        dict: Aspecto -> mediana.
+    """
+    header = pd.read_csv(input_path, nrows=0).columns
+    usecols = [col for col in SERVICE_ASPECTS if col in header]
+    medians = pd.read_csv(input_path, usecols=usecols).median()
+    return medians.dropna().to_dict()
+
+
+def _iter_chunks(input_path, chunksize, only_missing):
+    """Leer el CSV por bloques, filtrando opcionalmente las filas sin 'Recommended'."""
+    offset = 0
+    for chunk in pd.read_csv(input_path, chunksize=chunksize):
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk), name='row')
+        offset += len(chunk)
+        if only_missing and 'Recommended' in chunk.columns:
+            recommended = chunk['Recommended'].fillna('').astype(str).str.strip().str.lower()
+            chunk = chunk[~recommended.isin(['yes', 'no'])]
+        if len(chunk):
+            yield chunk
+
+
+def run_batch(input_path, output_path, model_path=MODEL_PATH,
+              chunksize=BATCH_CHUNK_SIZE, workers=None, only_missing=False, explain=False):
+    """
+    Evaluar un CSV completo y escribir las predicciones en streaming.
+
+    Se mantienen como máximo `2 * workers` bloques en vuelo para que la
+    memoria no crezca con el tamaño del archivo; el orden de salida es el
+    mismo que el de entrada.
+
+    Args:
+        input_path: CSV de reseñas de entrada.
+        output_path: CSV de salida con 'row', 'Prediction' y 'Probability'.
+        model_path: Ruta del modelo serializado.
+        chunksize: Filas por bloque.
+        workers: Número de procesos (por defecto, todos los cores).
+        only_missing: Evaluar solo filas sin valor válido en 'Recommended'.
+        explain: Añadir las atribuciones TreeSHAP por aspecto.
+
+    Returns:
+        dict: Filas evaluadas, segundos transcurridos y filas por segundo.
+    """
+    workers = workers or os.cpu_count() or 1
+    model, explainer = _load(model_path, explain) if workers == 1 else (load_model(model_path), None)
+    # Las mismas medianas que en el entrenamiento y en prediction_server.py
+    impute_values = model_impute_values(model)
+    if impute_values is None:
+        impute_values = compute_impute_values(input_path)
+    chunks = _iter_chunks(input_path, chunksize, only_missing)
+
+    n_rows = 0
+    header = True
+    start = time.perf_counter()
+
+    def write(result):
+        nonlocal n_rows, header
+        result.to_csv(output_path, mode='w' if header else 'a', header=header)
+        header = False
+        n_rows += len(result)
+
+    if workers == 1:
+        for chunk in chunks:
+            write(score_chunk(model, chunk, impute_values, explainer))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_path, explain)) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_score_in_worker, chunk, impute_values))
+                if len(pending) >= 2 * workers:
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+
+    if header:
+        # Sin filas que evaluar: dejar un archivo con solo la cabecera
+        pd.DataFrame(columns=['row', 'Prediction', 'Probability']).to_csv(output_path, index=False)
+
+    elapsed = time.perf_counter() - start
+    return {
+        'rows': n_rows,
+        'seconds': elapsed,
+        'rows_per_second': n_rows / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def run_store_batch(input_path, output_path, model_path=MODEL_PATH, chunksize=BATCH_CHUNK_SIZE,
+                    workers=None, only_missing=False, explain=False, store_dir=FEATURE_STORE_DIR):
+    """
+    Evaluar el dataset leyendo la matriz materializada del almacén de features.
+
+    En lugar de parsear y alinear el CSV, cada worker abre la misma matriz
+    memory-mapped y evalúa un rango de filas. La matriz se materializa con las
+    columnas y niveles categóricos del modelo (una entrada del almacén por
+    codificación), igual que `align_features` en el modo CSV. La salida sigue el orden del
+    almacén (primero las filas etiquetadas); 'row' es la posición en el CSV.
+
+    Args:
+        input_path: CSV de reseñas (identifica la versión del dataset).
+        output_path: CSV de salida con 'row', 'Prediction' y 'Probability'.
+        model_path: Ruta del modelo serializado.
+        chunksize: Filas por tarea.
+        workers: Número de procesos (por defecto, todos los cores).
+        only_missing: Evaluar solo las filas sin etiqueta.
+        explain: Añadir las atribuciones TreeSHAP por aspecto.
+        store_dir: Directorio raíz del almacén.
+
+    Returns:
+        dict: Filas evaluadas, segundos transcurridos y filas por segundo.
+    """
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    model, explainer = _load(model_path, explain)
+    # La matriz se codifica con las columnas y niveles del modelo, no con el top del CSV
+    features = load_or_materialize(input_path, store_dir, model.feature_names_in_,
+                                   model_category_levels(model), model_impute_values(model))
+    first = features.n_labeled if only_missing else 0
+    ranges = [(begin, min(begin + chunksize, len(features.X)))
+              for begin in range(first, len(features.X), chunksize)]
+
+    if workers == 1:
+        global _worker_model, _worker_explainer
+        _worker_model, _worker_explainer = model, explainer
+        results = (_score_store_in_worker(store_dir, features.version, b, e) for b, e in ranges)
+        n_rows = _write_results(results, output_path)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_path, explain)) as executor:
+            results = executor.map(_score_store_in_worker, *zip(*[
+                (store_dir, features.version, b, e) for b, e in ranges
+            ])) if ranges else []
+            n_rows = _write_results(results, output_path)
+
+    elapsed = time.perf_counter() - start
+    return {
+        'rows': n_rows,
+        'seconds': elapsed,
+        'rows_per_second': n_rows / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def _write_results(results, output_path):
+    """Escribir en streaming los resultados; devuelve el número de filas."""
+    n_rows = 0
+    for result in results:
+        result.to_csv(output_path, mode='a' if n_rows else 'w', header=not n_rows)
+        n_rows += len(result)
+    if not n_rows:
+        pd.DataFrame(columns=['row', 'Prediction', 'Probability']).to_csv(output_path, index=False)
+    return n_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scoring por lotes del modelo de recomendación')
+    parser.add_argument('input', help='CSV de reseñas a evaluar')
+    parser.add_argument('output', help='CSV de salida con las predicciones')
+    parser.add_argument('--model', default=MODEL_PATH, help='Ruta del modelo .pkl')
+    parser.add_argument('--chunksize', type=int, default=BATCH_CHUNK_SIZE, help='Filas por bloque')
+    parser.add_argument('--workers', type=int, default=None, help='Procesos del pool (por defecto, todos los cores)')
+    parser.add_argument('--only-missing', action='store_true',
+                        help="Evaluar solo reseñas sin valor en 'Recommended'")
+    parser.add_argument('--explain', action='store_true',
+                        help='Añadir atribuciones TreeSHAP por aspecto (columnas SHAP_*)')
+    parser.add_argument('--use-store', action='store_true',
+                        help='Leer la matriz materializada del almacén de features (ml_features.py)')
+    args = parser.parse_args()
+
+    runner = run_store_batch if args.use_store else run_batch
+    stats = runner(args.input, args.output, args.model, args.chunksize,
+                   args.workers, args.only_missing, args.explain)
+    print(f"✅ {stats['rows']:,} filas evaluadas en {stats['seconds']:.2f}s "
+          f"({stats['rows_per_second']:,.0f} filas/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+Suite de benchmarks de escalado del dashboard.
+
+Para cada escala (número de reseñas) genera o reutiliza un CSV sintético
+(`synthetic_reviews.py`) y mide, paso a paso, tiempo y memoria pico de:
+
+- `analytics.load_reviews` (lectura y derivación de columnas, sin caché).
+- La publicación del dataset compartido entre procesos y la conexión de un
+  worker a él (`shared_dataset.py`).
+- La ingesta de texto: índice invertido, categorías de queja, duplicados,
+  sentimiento del texto y matriz términos × mes.
+- Los filtros del sidebar (`filter_reviews` y la búsqueda de texto).
+- Los KPIs (`calculate_recommendation_rate`, `calculate_nps`).
+- Cada página `show_*` de `app.py` (agregaciones y render de los gráficos,
+  con Streamlit en modo sin servidor).
+
+La memoria pico es la asignada durante el paso según `tracemalloc` (incluye
+los arrays de NumPy/pandas); se mide en una segunda ejecución para no
+distorsionar los tiempos. Los resultados se escriben como JSON y pueden
+compararse con una ejecución anterior para detectar regresiones.
+
+Además se mide el tiempo de importación en frío de `app` y `ml_app` con
+`python -X importtime` en un proceso nuevo: total y módulos con más tiempo
+acumulado, comparados con `IMPORT_TIME_BUDGET_MS`.
+
+Uso:
+    python benchmark_suite.py --scales 10000 100000 1000000 --out benchmark_results.json
+    python benchmark_suite.py --baseline benchmark_results_main.json --tolerance 0.2
+    python benchmark_suite.py --import-only
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from config import (
+    BENCHMARK_SCALES, BENCHMARK_RESULTS_PATH, SYNTHETIC_DATA_DIR, IMPORT_TIME_BUDGET_MS, IMPORT_TIME_TOP_N
+)
+
+
+def measure(fn, memory=True):
+    """
+    Ejecutar `fn` y medir tiempo de pared, tiempo de CPU y memoria pico.
+
+    Args:
+        fn: Función sin argumentos.
+        memory: Repetir la ejecución bajo `tracemalloc` para la memoria pico.
+
+    Returns:
+        tuple: (resultado de la primera ejecución, dict con 'seconds',
+        'cpu_seconds' y 'peak_mb'; o 'error' si falló).
+    """
+    gc.collect()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        result = fn()
+    except Exception as e:
+        return None, {'error': f"{type(e).__name__}: {e}"}
+    stats = {'seconds': time.perf_counter() - wall, 'cpu_seconds': time.process_time() - cpu}
+
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            stats['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1e6
+        finally:
+            tracemalloc.stop()
+    return result, stats
+
+
+def _quiet_streamlit():
+    """Silenciar los avisos de Streamlit al llamar a las páginas sin servidor."""
+    from streamlit import config
+    from streamlit.logger import set_log_level
+
+    config.get_option('logger.level')  # cargar la configuración, que restablece el nivel
+    set_log_level(logging.ERROR)
+
+
+def run_scale(path, memory=True, text_query='baggage'):
+    """
+    Medir todos los pasos sobre un CSV.
+
+    Args:
+        path: CSV de reseñas.
+        memory: Medir memoria pico.
+        text_query: Consulta de la búsqueda de texto.
+
+    Returns:
+        list: Un dict por paso con 'step' y las métricas de `measure`.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    _quiet_streamlit()
+    import app
+    from analytics import (
+        ReviewFilters, load_reviews, filter_reviews, calculate_recommendation_rate, calculate_nps
+    )
+    from text_index import TextIndex, documents_from
+    from complaint_tags import TAGS_COLUMN, tag_documents
+    from near_duplicates import DUPLICATE_COLUMN, find_duplicates
+    from text_sentiment import SCORE_COLUMN, LABEL_COLUMN, score_texts, label
+    from term_trends import build as build_term_matrix
+    from shared_dataset import SharedDatasetStore
+
+    results = []
+
+    def step(name, fn):
+        result, stats = measure(fn, memory)
+        results.append({'step': name, **stats})
+        plt.close('all')
+        return result
+
+    df = step('load_data', lambda: load_reviews(path))
+    if df is None:
+        return results
+
+    # El resto de pasos usa el DataFrame mapeado, como los workers de la app
+    shared_dir = tempfile.TemporaryDirectory(ignore_cleanup_errors=True)
+    store = SharedDatasetStore(shared_dir.name, load_reviews)
+    metadata = step('shared.publish', lambda: store.publish(path, df))
+    if metadata is not None:
+        attached = step('shared.attach', lambda: store.attach(path, metadata))
+        df = attached if attached is not None else df
+
+    documents = step('ingest.documents', lambda: documents_from(df))
+    index = step('ingest.text_index', lambda: TextIndex.build(documents))
+    df[TAGS_COLUMN] = step('ingest.complaint_tags', lambda: tag_documents(documents.tolist()))
+    df[DUPLICATE_COLUMN] = step('ingest.near_duplicates', lambda: find_duplicates(df))
+    scores = step('ingest.text_sentiment', lambda: score_texts(df['Comment'].fillna('').astype(str).tolist(), 1))
+    df[SCORE_COLUMN] = scores
+    df[LABEL_COLUMN] = label(scores)
+    term_matrix = step('ingest.term_trends', lambda: build_term_matrix(df))
+
+    # Valores por defecto del sidebar: todo el rango de fechas y calificaciones
+    filters = ReviewFilters(
+        date_range=(df['Date Published'].min(), df['Date Published'].max()),
+        verification=list(df['Trip_verified_clean'].unique()),
+        rating_range=(1, 10),
+    )
+    step('filters.filter_reviews', lambda: filter_reviews(df, filters))
+    step('filters.text_search',
+         lambda: filter_reviews(df, filters._replace(text_matches=index.search(text_query, documents))))
+    step('kpi.recommendation_rate', lambda: calculate_recommendation_rate(df))
+    step('kpi.nps', lambda: calculate_nps(df))
+
+    pages = {
+        'page.executive_summary': lambda: app.show_executive_summary(df),
+        'page.eda': lambda: app.show_eda(df),
+        'page.temporal_analysis': lambda: app.show_temporal_analysis(df, term_matrix),
+        'page.geographic_analysis': lambda: app.show_geographic_analysis(df),
+        'page.rating_analysis': lambda: app.show_rating_analysis(df),
+        'page.recommendations': lambda: app.show_recommendations(df),
+    }
+    for name, fn in pages.items():
+        step(name, fn)
+    shared_dir.cleanup()
+    return results
+
+
+def import_times(module, repeat=3, top_n=IMPORT_TIME_TOP_N):
+    """
+    Tiempo de importación en frío de un módulo según `python -X importtime`.
+
+    Cada medición se hace en un proceso nuevo desde el directorio del repo y se
+    conserva la más rápida de `repeat`, para reducir el ruido del sistema.
+
+    Args:
+        module: Módulo a importar (p. ej. 'app').
+        repeat: Procesos a lanzar.
+        top_n: Módulos a incluir en el desglose.
+
+    Returns:
+        dict: 'module', 'total_ms' y 'modules' (las importaciones de primer
+        nivel del módulo, cada una con 'module', 'self_ms' y 'cumulative_ms',
+        de mayor a menor tiempo acumulado); o 'error' si la importación falló.
+    """
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                              capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        if proc.returncode != 0:
+            lines = proc.stderr.strip().splitlines()
+            return {'module': module, 'error': lines[-1] if lines else f'código de salida {proc.returncode}'}
+        entries = []
+        for line in proc.stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            if not self_us.strip().isdigit():
+                continue  # cabecera
+            depth = (len(name) - len(name.lstrip())) // 2
+            entries.append({'module': name.strip(), 'self_ms': int(self_us) / 1000,
+                            'cumulative_ms': int(cumulative_us) / 1000, 'depth': depth})
+        # La línea del módulo pedido es la última (se cierra después de sus dependencias)
+        # y sus dependencias directas son las líneas anteriores de un nivel más hasta
+        # la anterior de su mismo nivel (las importaciones del arranque del intérprete)
+        root = next((i for i in range(len(entries) - 1, -1, -1) if entries[i]['module'] == module), None)
+        if root is None:
+            return {'module': module, 'error': 'sin datos de -X importtime'}
+        total = entries[root]['cumulative_ms']
+        if best is None or total < best['total_ms']:
+            direct = []
+            for e in reversed(entries[:root]):
+                if e['depth'] <= entries[root]['depth']:
+                    break
+                if e['depth'] == entries[root]['depth'] + 1:
+                    direct.append({k: e[k] for k in ('module', 'self_ms', 'cumulative_ms')})
+            direct.sort(key=lambda e: e['cumulative_ms'], reverse=True)
+            best = {'module': module, 'total_ms': total, 'modules': direct[:top_n]}
+    return best
+
+
+def compare(current, baseline, tolerance=0.2, min_seconds=0.01):
+    """
+    Pasos más lentos que en una ejecución de referencia.
+
+    Args:
+        current: Resultados actuales (dict de `main`).
+        baseline: Resultados de referencia con el mismo formato.
+        tolerance: Aumento relativo de tiempo admitido.
+        min_seconds: Se ignoran los pasos más rápidos que esto en la referencia.
+
+    Returns:
+        list: Dicts con 'rows', 'step', 'baseline', 'current' y 'ratio'.
+    """
+    reference = {(r['rows'], r['step']): r for r in baseline['results'] if 'seconds' in r}
+    regressions = []
+    for r in current['results']:
+        before = reference.get((r['rows'], r['step']))
+        if before is None or 'seconds' not in r or before['seconds'] < min_seconds:
+            continue
+        ratio = r['seconds'] / before['seconds']
+        if ratio > 1 + tolerance:
+            regressions.append({'rows': r['rows'], 'step': r['step'], 'baseline': before['seconds'],
+                                'current': r['seconds'], 'ratio': ratio})
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks de escalado del dashboard')
+    parser.add_argument('--scales', type=int, nargs='+', default=BENCHMARK_SCALES, help='Reseñas por escala')
+    parser.add_argument('--source', default=None, help='CSV real para el generador (por defecto, DATA_PATHS)')
+    parser.add_argument('--data-dir', default=SYNTHETIC_DATA_DIR, help='Directorio de los CSV sintéticos')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help='No medir memoria pico (la mitad de tiempo)')
+    parser.add_argument('--out', default=BENCHMARK_RESULTS_PATH, help='JSON de resultados')
+    parser.add_argument('--baseline', default=None, help='JSON de referencia para detectar regresiones')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Aumento relativo de tiempo admitido')
+    parser.add_argument('--import-only', action='store_true', help='Medir solo el tiempo de importación de las apps')
+    args = parser.parse_args()
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'imports': [],
+        'results': [],
+    }
+    over_budget = []
+    for module, budget in IMPORT_TIME_BUDGET_MS.items():
+        result = import_times(module)
+        report['imports'].append({**result, 'budget_ms': budget})
+        if 'error' in result:
+            print(f"⏱️ import {module:<22} ❌ {result['error']}")
+            continue
+        flag = '⚠️' if result['total_ms'] > budget else '✅'
+        print(f"⏱️ import {module:<22} {result['total_ms']:>9.0f} ms (presupuesto {budget} ms) {flag}")
+        for entry in result['modules']:
+            print(f"   {entry['module']:<28} {entry['cumulative_ms']:>9.0f} ms")  # acumulado
+        if result['total_ms'] > budget:
+            over_budget.append(module)
+
+    scales = [] if args.import_only else args.scales
+    if scales:
+        from analytics import resolve_data_path
+        from synthetic_reviews import ensure_synthetic
+
+        source_path = resolve_data_path(args.source)
+        if source_path is None:
+            raise SystemExit("❌ No se encontró el CSV de reseñas")
+
+    for n_rows in scales:
+        start = time.perf_counter()
+        path = ensure_synthetic(source_path, n_rows, args.seed, args.data_dir)
+        print(f"📦 {n_rows:,} reseñas ({path}, {time.perf_counter() - start:.1f}s)")
+        for result in run_scale(path, memory=not args.no_memory):
+            report['results'].append({'rows': n_rows, **result})
+            if 'error' in result:
+                print(f"   {result['step']:<28} ❌ {result['error']}")
+            else:
+                peak = f"{result['peak_mb']:>9,.1f} MB" if 'peak_mb' in result else ''
+                print(f"   {result['step']:<28} {result['seconds']:>9.3f}s {peak}")
+
+    tmp_path = f"{args.out}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, args.out)
+    print(f"✅ Resultados guardados en {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"⚠️ {r['rows']:,} filas, {r['step']}: {r['baseline']:.3f}s → {r['current']:.3f}s (x{r['ratio']:.2f})")
+        if regressions:
+            raise SystemExit(1)
+    if over_budget:
+        print(f"⚠️ Tiempo de importación por encima del presupuesto: {', '.join(over_budget)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Etiquetado de categorías de queja en los comentarios de las reseñas.
+
+Los documentos ('Comment title' + 'Comment') se procesan por bloques: cada
+bloque se convierte en una matriz dispersa binaria de términos y pares de
+términos (feature hashing, con el mismo tokenizador que `text_index`) y se
+multiplica por la matriz de pesos de las categorías de `COMPLAINT_CATEGORIES`.
+Una reseña recibe la categoría cuando su puntuación llega a
+`COMPLAINT_TAG_THRESHOLD`.
+
+El resultado es una columna de enteros con un bit por categoría, guardada en
+`.npy` por versión del corpus y del léxico; las páginas agregan esa columna
+(volúmenes, tasa de no recomendación, tendencia mensual) sin volver a leer texto.
+
+Uso:
+    python complaint_tags.py "ryanair_reviews (1).csv"
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    COMPLAINT_CATEGORIES, COMPLAINT_TAGS_DIR, COMPLAINT_HASH_FEATURES, COMPLAINT_TAG_THRESHOLD,
+    BATCH_CHUNK_SIZE
+)
+from text_index import tokenize, term_pairs, documents_from, corpus_version
+
+TAGS_COLUMN = 'Complaint Tags'
+
+
+def _hasher(n_features=COMPLAINT_HASH_FEATURES):
+    from sklearn.feature_extraction import FeatureHasher
+    return FeatureHasher(n_features=n_features, input_type='string', alternate_sign=False)
+
+
+def _terms(document):
+    """Términos y pares de términos consecutivos de cada campo (sin repetir) de un documento."""
+    return set(tokenize(document)).union(term_pairs(document))
+
+
+def _mask_dtype(n_categories):
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if n_categories <= np.iinfo(dtype).bits:
+            return dtype
+    raise ValueError(f"Demasiadas categorías para una máscara de bits: {n_categories}")
+
+
+def weight_matrix(categories=COMPLAINT_CATEGORIES, n_features=COMPLAINT_HASH_FEATURES):
+    """
+    Matriz de pesos (features × categorías) en el espacio de hashing.
+
+    Args:
+        categories: Dict categoría -> {'terms': {término: peso}, ...}.
+        n_features: Dimensión del hashing.
+
+    Returns:
+        scipy.sparse.csr_matrix: Pesos de cada término en su columna hasheada.
+    """
+    from scipy import sparse
+
+    hasher = _hasher(n_features)
+    columns = []
+    for spec in categories.values():
+        terms = list(spec['terms'])
+        hashed = hasher.transform([[term] for term in terms])
+        columns.append(sparse.csr_matrix(np.asarray(list(spec['terms'].values()))) @ hashed)
+    return sparse.vstack(columns).T.tocsr()
+
+
+def tag_documents(documents, categories=COMPLAINT_CATEGORIES, threshold=COMPLAINT_TAG_THRESHOLD,
+                  chunksize=BATCH_CHUNK_SIZE):
+    """
+    Asignar categorías de queja a cada documento, procesando por bloques.
+
+    Args:
+        documents: Iterable de textos.
+        categories: Dict de categorías (el orden define el bit).
+        threshold: Puntuación mínima para asignar una categoría.
+        chunksize: Documentos por bloque.
+
+    Returns:
+        np.ndarray: Máscara de bits por documento (bit i = categoría i).
+    """
+    hasher = _hasher()
+    weights = weight_matrix(categories)
+    dtype = _mask_dtype(len(categories))
+    bits = (np.ones(1, dtype=dtype) << np.arange(len(categories), dtype=dtype))
+
+    documents = list(documents) if not hasattr(documents, '__len__') else documents
+    masks = np.zeros(len(documents), dtype=dtype)
+    for start in range(0, len(documents), chunksize):
+        chunk = documents[start:start + chunksize]
+        X = hasher.transform(_terms(doc) for doc in chunk)
+        X.data[:] = 1
+        scores = (X @ weights).toarray()
+        masks[start:start + len(chunk)] = ((scores >= threshold) * bits).sum(axis=1, dtype=dtype)
+    return masks
+
+
+def lexicon_digest(categories=COMPLAINT_CATEGORIES, threshold=COMPLAINT_TAG_THRESHOLD):
+    """Hash corto del léxico y el umbral (cambiarlos invalida la caché)."""
+    payload = json.dumps([categories, threshold, COMPLAINT_HASH_FEATURES], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:8]
+
+
+def load_or_tag(documents, version=None, cache_dir=COMPLAINT_TAGS_DIR):
+    """
+    Cargar las etiquetas de esta versión del corpus o calcularlas y guardarlas.
+
+    Args:
+        documents: Serie de documentos (ver `text_index.documents_from`).
+        version: Versión del corpus (por defecto, `corpus_version(documents)`).
+        cache_dir: Directorio de la caché.
+
+    Returns:
+        np.ndarray: Máscara de bits por fila (memory-mapped si venía de disco).
+    """
+    version = version or corpus_version(documents)
+    path = os.path.join(cache_dir, f"{version}-{lexicon_digest()}.npy")
+    if os.path.exists(path):
+        return np.load(path, mmap_mode='r')
+    masks = tag_documents(documents.tolist())
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}.npy"
+    np.save(tmp_path, masks)
+    os.replace(tmp_path, path)
+    return masks
+
+
+def decode(masks, categories=COMPLAINT_CATEGORIES):
+    """
+    Expandir la máscara de bits a una columna booleana por categoría.
+
+    Args:
+        masks: Máscaras por reseña (array o Serie).
+        categories: Dict de categorías usado al etiquetar.
+
+    Returns:
+        pd.DataFrame: Una columna booleana por categoría.
+    """
+    index = masks.index if isinstance(masks, pd.Series) else None
+    values = np.asarray(masks, dtype=np.uint64)
+    flags = (values[:, None] >> np.arange(len(categories), dtype=np.uint64)) & 1
+    return pd.DataFrame(flags.astype(bool), columns=list(categories), index=index)
+
+
+def _window_start(reviews, end, min_months, min_reviews):
+    """
+    Inicio de la ventana que termina en `end` (exclusivo) sobre los meses con reseñas.
+
+    La ventana abarca al menos `min_months` meses y se amplía hacia atrás hasta
+    sumar `min_reviews` reseñas.
+
+    Args:
+        reviews: Reseñas por mes (solo meses con reseñas, ordenados).
+        end: Posición donde termina la ventana (o None).
+        min_months: Meses mínimos de la ventana.
+        min_reviews: Reseñas mínimas de la ventana.
+
+    Returns:
+        int o None: Posición del primer mes, o None si no hay meses suficientes.
+    """
+    if end is None:
+        return None
+    # Reseñas acumuladas desde cada mes hasta `end`
+    totals = reviews.iloc[:end].to_numpy()[::-1].cumsum()[::-1]
+    candidates = np.flatnonzero(totals >= max(min_reviews, 1))
+    if not len(candidates):
+        return None
+    start = min(int(candidates[-1]), end - min_months)
+    return start if start >= 0 else None
+
+
+def category_summary(df, recent_months=3, min_reviews=20, categories=COMPLAINT_CATEGORIES):
+    """
+    Volumen, tasa de no recomendación y tendencia de cada categoría.
+
+    Args:
+        df: Reseñas con `TAGS_COLUMN`, 'Recommended_bool' y 'Month_Published'.
+        recent_months: Meses de cada ventana de la tendencia.
+        min_reviews: Reseñas mínimas en cada ventana para calcular la tendencia.
+        categories: Dict de categorías usado al etiquetar.
+
+    Returns:
+        pd.DataFrame: Por categoría, 'Reseñas', '% del total', '% no recomienda'
+        y 'Tendencia (pp)' (cuota de reseñas de la ventana reciente menos la de
+        la anterior; cada ventana abarca al menos `recent_months` meses con
+        reseñas y se amplía hacia atrás hasta reunir `min_reviews`; NaN solo si
+        el histórico no alcanza para dos ventanas), ordenado por volumen. El
+        primer mes de la ventana reciente queda en `attrs['trend_since']`.
+    """
+    flags = decode(df[TAGS_COLUMN], categories)
+    total = max(len(df), 1)
+    not_recommended = (df['Recommended_bool'] == 0).to_numpy()
+    counts = flags.sum()
+
+    mentions, reviews = monthly_counts(df, categories)
+    recent_start = _window_start(reviews, len(reviews), recent_months, min_reviews)
+    previous_start = _window_start(reviews, recent_start, recent_months, min_reviews)
+    if previous_start is not None:
+        recent, previous = slice(recent_start, None), slice(previous_start, recent_start)
+        trend = (mentions.iloc[recent].sum() / reviews.iloc[recent].sum()
+                 - mentions.iloc[previous].sum() / reviews.iloc[previous].sum()) * 100
+    else:
+        trend = pd.Series(np.nan, index=list(categories))
+
+    summary = pd.DataFrame({
+        'Reseñas': counts.astype(int),
+        '% del total': counts / total * 100,
+        '% no recomienda': flags[not_recommended].sum() / counts.replace(0, np.nan) * 100,
+        'Tendencia (pp)': trend,
+    }).sort_values('Reseñas', ascending=False)
+    # Primer mes de la ventana reciente, para rotular la tendencia
+    summary.attrs['trend_since'] = reviews.index[recent_start] if previous_start is not None else None
+    return summary
+
+
+def monthly_counts(df, categories=COMPLAINT_CATEGORIES):
+    """
+    Menciones de cada categoría y reseñas totales por mes.
+
+    Args:
+        df: Reseñas con `TAGS_COLUMN` y 'Month_Published'.
+        categories: Dict de categorías usado al etiquetar.
+
+    Returns:
+        tuple: (DataFrame meses × categorías con las menciones, Serie de reseñas
+        por mes), con los meses ordenados y sin las reseñas sin fecha.
+    """
+    months = df['Month_Published'].astype(str)
+    dated = (months != 'NaT').to_numpy()
+    flags = decode(df[TAGS_COLUMN], categories)[dated]
+    grouped = flags.groupby(months.to_numpy()[dated])
+    return grouped.sum().sort_index(), grouped.size().sort_index()
+
+
+def monthly_share(df, categories=COMPLAINT_CATEGORIES):
+    """
+    Porcentaje mensual de reseñas que mencionan cada categoría.
+
+    Args:
+        df: Reseñas con `TAGS_COLUMN` y 'Month_Published'.
+        categories: Dict de categorías usado al etiquetar.
+
+    Returns:
+        pd.DataFrame: Meses (ordenados) × categorías.
+    """
+    mentions, reviews = monthly_counts(df, categories)
+    return mentions.div(reviews, axis=0) * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Etiquetado de categorías de queja')
+    parser.add_argument('data', help='CSV de reseñas')
+    parser.add_argument('--cache', default=COMPLAINT_TAGS_DIR, help='Directorio de caché')
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    documents = documents_from(df)
+    df[TAGS_COLUMN] = load_or_tag(documents, cache_dir=args.cache)
+    df['Recommended_bool'] = df['Recommended'].fillna('').astype(str).str.strip().str.lower().map({'yes': 1, 'no': 0})
+    df['Month_Published'] = pd.to_datetime(df['Date Published'], errors='coerce').dt.to_period('M').astype(str)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(category_summary(df).round(1))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 """
 Configuración y constantes para la aplicación de análisis de satisfacción de Ryanair.
 """
+import json
 import os
 
 # ==================== RUTAS DE ARCHIVOS ====================
@@ -8,6 +9,11 @@ import os
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
 
+# Léxicos de sentimiento y de categorías de queja (datos, no código)
+LEXICONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lexicons.json')
+with open(LEXICONS_PATH, encoding='utf-8') as _f:
+    LEXICONS = json.load(_f)
+
 DATA_PATHS = [
     os.path.join(DATA_DIR, 'ryanair_reviews (1).csv'),
     os.path.join(DATA_DIR, 'ryanair_reviews.csv'),
@@ -33,6 +39,164 @@ SERVICE_ASPECTS = [
     'Value For Money'
 ]
 
+# ==================== MODELO DE MACHINE LEARNING ====================
+MODEL_PATH = 'ryanair_recommendation_model.pkl'
+# Artefacto con arrays memory-mapped (ver ml_artifact.py); tiene prioridad sobre el .pkl
+MODEL_ARTIFACT_PATH = 'ryanair_recommendation_model'
+# Versiones del artefacto que se conservan en '<artefacto>.versions/'
+MODEL_ARTIFACT_KEEP_VERSIONS = 2
+# Registro de versiones con puntero a la versión promovida (ver ml_registry.py)
+MODEL_REGISTRY_DIR = 'model_registry'
+
+# Variables categóricas codificadas con One-Hot en el notebook de entrenamiento
+ML_CATEGORICAL_FEATURES = [
+    'Type Of Traveller',
+    'Passenger Country'
+]
+
+# Categoría usada cuando un país no está entre las columnas del modelo
+ML_OTHER_CATEGORY = 'Other'
+ML_UNKNOWN_CATEGORY = 'Unknown'
+
+# Escala de los sliders de aspectos en ml_app (1.0 a 5.0 en pasos de 0.5)
+ML_RATING_MIN = 1.0
+ML_RATING_MAX = 5.0
+ML_RATING_STEP = 0.5
+
+TRAVELLER_TYPES = ['Couple Leisure', 'Solo Leisure', 'Family Leisure', 'Business']
+
+# Partición train/test del notebook de entrenamiento
+ML_RANDOM_STATE = 42
+ML_TEST_SIZE = 0.2
+# Fracción del test que ml_compact.py usa para elegir la variante; el resto queda
+# reservado para informar sus métricas
+ML_COMPACT_VALIDATION_SIZE = 0.5
+ML_TOP_COUNTRIES = 10
+
+# Entrenamiento (train_model.py): hiperparámetros base del notebook y rejilla
+# explorada con successive halving
+ML_RF_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 10,
+    'min_samples_split': 10,
+    'min_samples_leaf': 5,
+    'class_weight': 'balanced',
+}
+ML_PARAM_GRID = {
+    'n_estimators': [100, 200, 300],
+    'max_depth': [6, 10, 14, None],
+    'min_samples_split': [2, 10, 20],
+    'min_samples_leaf': [1, 5, 10],
+}
+ML_CV_FOLDS = 5
+ML_HALVING_FACTOR = 3
+# Filas mínimas de la primera ronda de halving: con menos, la puntuación de cada
+# candidato es ruido y se descartan configuraciones buenas
+ML_HALVING_MIN_RESOURCES = 300
+METRICS_PATH = 'ryanair_recommendation_metrics.json'
+
+# Almacén de matrices de features por versión del dataset (ver ml_features.py)
+FEATURE_STORE_DIR = 'feature_store'
+
+# Búsqueda de contrafactuales en ml_app
+PROMOTER_THRESHOLD = 0.7
+COUNTERFACTUAL_TIME_BUDGET = 0.5  # segundos
+COUNTERFACTUAL_BATCH_SIZE = 4096
+
+# Exportación de los histogramas de latencia de ml_app (formato texto de Prometheus)
+LATENCY_METRICS_PATH = 'ml_app_latency.prom'
+
+# Datasets procesados que guarda la caché del núcleo analítico (ver analytics.py)
+ANALYTICS_CACHE_ENTRIES = 4
+# Dataset derivado publicado en disco y mapeado en memoria por todos los procesos
+# worker (ver shared_dataset.py). None lo desactiva: cada proceso lee el CSV
+SHARED_DATASET_DIR = 'shared_dataset'
+SHARED_DATASET_KEEP_VERSIONS = 2
+
+# Perfilado por secciones de app.py (ver instrumentation.SectionProfiler): todas
+# las ejecuciones registran tiempos; una fracción se guarda completa, con memoria
+PROFILING_SAMPLE_RATE = 0.1
+PROFILING_MAX_TRACES = 500
+PROFILING_TOP_N = 10
+PROFILING_TRACES_PATH = 'app_profile_traces.jsonl'
+
+# Servicio HTTP de predicción (prediction_server.py)
+PREDICTION_SERVER_HOST = '127.0.0.1'
+PREDICTION_SERVER_PORT = 8765
+MICROBATCH_WINDOW = 0.005  # segundos que se esperan peticiones para agrupar
+MICROBATCH_MAX_ROWS = 256
+
+# Estado acumulado de los benchmarks por segmento (ver segment_benchmarks.py)
+SEGMENT_BENCHMARK_DIR = 'benchmark_cache'
+
+# Índice invertido de los comentarios por versión del corpus (ver text_index.py)
+TEXT_INDEX_DIR = 'text_index'
+TEXT_COLUMNS = ['Comment title', 'Comment']
+
+# Matriz términos × mes de los comentarios, actualizada de forma incremental
+# (ver term_trends.py)
+TERM_TRENDS_DIR = 'term_trends'
+# Palabras del dominio que se excluyen (además de las stopwords en inglés) de
+# los términos en alza
+TERM_TRENDS_STOPWORDS = ['ryanair', 'flight', 'flights', 'fly', 'flew', 'flying', 'airline', 'plane']
+
+# Reseñas casi duplicadas con MinHash + LSH (ver near_duplicates.py). Con 16
+# bandas de 8 valores, pares con Jaccard >= ~0.7 coinciden en alguna banda con
+# alta probabilidad; se confirman con la similitud estimada por la firma
+NEAR_DUP_DIR = 'near_duplicates'
+NEAR_DUP_NUM_PERM = 128
+NEAR_DUP_BANDS = 16
+NEAR_DUP_SHINGLE = 3
+NEAR_DUP_THRESHOLD = 0.8
+
+# Sentimiento del texto de 'Comment' con léxico (ver text_sentiment.py). Pesos en
+# la escala de VADER (-4 a 4), también para pares de palabras, en la clave
+# 'sentiment' de lexicons.json; la suma se normaliza a [-1, 1] con x / sqrt(x² + 15)
+SENTIMENT_CACHE_DIR = 'sentiment_cache'
+SENTIMENT_BATCH_SIZE = 2000
+SENTIMENT_TEXT_THRESHOLD = 0.05
+SENTIMENT_NEGATIONS = ['not', 'no', 'never', 'nothing', 'nobody', 'without', 'cannot', 'don', 'didn',
+                       'doesn', 'isn', 'wasn', 'weren', 'aren', 'couldn', 'wouldn', 'won', 'hardly']
+SENTIMENT_INTENSIFIERS = ['very', 'really', 'extremely', 'so', 'absolutely', 'totally', 'incredibly',
+                          'completely', 'truly', 'super']
+SENTIMENT_LEXICON = LEXICONS['sentiment']
+
+# Reseñas sintéticas y suite de benchmarks de escalado (ver synthetic_reviews.py
+# y benchmark_suite.py)
+SYNTHETIC_DATA_DIR = 'synthetic_data'
+BENCHMARK_SCALES = [10_000, 100_000, 1_000_000]
+BENCHMARK_RESULTS_PATH = 'benchmark_results.json'
+# Presupuesto de tiempo de importación (arranque en frío) por app, en ms; lo
+# comprueba `benchmark_suite.py` con `python -X importtime`
+IMPORT_TIME_BUDGET_MS = {'app': 1500, 'ml_app': 1500}
+IMPORT_TIME_TOP_N = 10
+
+# Etiquetado de quejas (ver complaint_tags.py). Las categorías están en la clave
+# 'complaint_categories' de lexicons.json y cada una ocupa un bit según su orden.
+# Los términos (palabras o pares de palabras) se puntúan con su peso y una reseña
+# queda etiquetada cuando la suma llega a COMPLAINT_TAG_THRESHOLD
+COMPLAINT_TAGS_DIR = 'complaint_tags'
+COMPLAINT_HASH_FEATURES = 2 ** 18
+COMPLAINT_TAG_THRESHOLD = 1.0
+COMPLAINT_CATEGORIES = LEXICONS['complaint_categories']
+
+# Importancia por permutación
+PERMUTATION_REPEATS = 10
+
+# Scoring por lotes
+BATCH_CHUNK_SIZE = 50000
+
+# Nombres en español para mostrar en la app de ML
+ML_FEATURE_DISPLAY_NAMES = {
+    'Seat Comfort': 'Comodidad del Asiento',
+    'Cabin Staff Service': 'Servicio del Personal',
+    'Food & Beverages': 'Comida y Bebidas',
+    'Ground Service': 'Servicio en Tierra',
+    'Value For Money': 'Relación Calidad-Precio',
+    'Type Of Traveller': 'Tipo de Viajero',
+    'Passenger Country': 'País del Pasajero'
+}
+
 # ==================== CATEGORÍAS DE RATING ====================
 RATING_THRESHOLDS = {
     'negative_max': 3,
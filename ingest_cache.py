@@ -0,0 +1,62 @@
+"""
+Utilidades compartidas por las cachés incrementales del CSV de reseñas.
+
+`segment_benchmarks`, `term_trends` y `near_duplicates` guardan junto a su
+estado el tamaño del CSV y el hash de los bytes ya procesados. Si el archivo
+ha crecido y ese prefijo no ha cambiado (reseñas añadidas al final), solo se
+leen las filas nuevas a partir del byte donde terminó la última ingesta.
+
+El módulo solo depende de pandas, así que lo pueden importar los módulos de
+análisis sin arrastrar el stack de ML.
+"""
+import hashlib
+
+import pandas as pd
+
+
+def prefix_digest(path, n_bytes, block_size=1 << 20):
+    """
+    SHA-256 de los primeros `n_bytes` bytes del archivo.
+
+    Args:
+        path: Ruta del archivo.
+        n_bytes: Bytes a incluir en el hash.
+        block_size: Bytes leídos por iteración.
+
+    Returns:
+        str: Hash hexadecimal.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        remaining = n_bytes
+        while remaining > 0:
+            block = f.read(min(block_size, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def read_rows(data_path, offset, chunksize):
+    """
+    Leer por bloques las filas del CSV a partir del byte `offset`.
+
+    Args:
+        data_path: CSV de reseñas.
+        offset: Byte donde empiezan las filas a leer (0 = archivo completo).
+        chunksize: Filas por bloque.
+
+    Yields:
+        pd.DataFrame: Bloques con las columnas de la cabecera del CSV.
+    """
+    if offset == 0:
+        yield from pd.read_csv(data_path, chunksize=chunksize)
+        return
+    columns = pd.read_csv(data_path, nrows=0).columns
+    with open(data_path, 'rb') as f:
+        f.seek(offset)
+        if not f.read(1):
+            return
+        f.seek(offset)
+        yield from pd.read_csv(f, header=None, names=columns, chunksize=chunksize)
@@ -0,0 +1,385 @@
+"""
+Instrumentación de latencia para las apps de Streamlit.
+
+`LatencyRecorder` acumula la duración de cada etapa en un histograma por
+etapa con cubetas logarítmicas fijas (de 10 µs a ~100 s), de modo que el coste
+de registrar una muestra es constante y la memoria no crece con el número de
+peticiones. Los percentiles se estiman a partir de las cubetas y el contenido
+se exporta en formato de texto de Prometheus para fijar SLOs de latencia.
+
+`SectionProfiler` mide además secciones anidadas de cada ejecución del script
+(página, gráfico, carga, filtros): tiempo de pared, tiempo de CPU del hilo y,
+en las ejecuciones muestreadas, memoria asignada con `tracemalloc`. Las
+duraciones van a un `LatencyRecorder` y las trazas muestreadas a un buffer
+circular exportable a JSON Lines.
+
+Este módulo no depende de Streamlit: la app crea un único recorder por
+proceso (con `st.cache_resource`) y lo comparten todas las sesiones.
+"""
+import json
+import os
+import random
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+import numpy as np
+
+# Límites superiores de las cubetas en segundos: 10 por década de 1e-5 a 1e2
+BUCKET_BOUNDS = np.logspace(-5, 2, 71)
+
+
+class LatencyHistogram:
+    """
+    Histograma de latencias de una etapa.
+
+    Attributes:
+        counts: Muestras por cubeta (la última recoge las mayores que BUCKET_BOUNDS[-1]).
+        count: Número total de muestras.
+        total: Suma de las duraciones en segundos.
+        max: Duración máxima observada.
+    """
+
+    def __init__(self):
+        self.counts = np.zeros(len(BUCKET_BOUNDS) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        """Registrar una duración en segundos."""
+        self.counts[np.searchsorted(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        """
+        Estimar un percentil interpolando dentro de la cubeta que lo contiene.
+
+        Args:
+            q: Percentil entre 0 y 100.
+
+        Returns:
+            float: Latencia estimada en segundos (NaN si no hay muestras).
+        """
+        if self.count == 0:
+            return float('nan')
+        rank = q / 100 * self.count
+        cumulative = np.cumsum(self.counts)
+        bucket = int(np.searchsorted(cumulative, rank))
+        if bucket >= len(BUCKET_BOUNDS):
+            return self.max
+        lower = BUCKET_BOUNDS[bucket - 1] if bucket > 0 else 0.0
+        upper = BUCKET_BOUNDS[bucket]
+        previous = cumulative[bucket - 1] if bucket > 0 else 0
+        fraction = (rank - previous) / self.counts[bucket] if self.counts[bucket] else 1.0
+        return float(min(lower + (upper - lower) * fraction, self.max))
+
+
+class LatencyRecorder:
+    """
+    Histogramas de latencia por etapa, seguros para varios hilos.
+
+    Streamlit ejecuta cada sesión en su propio hilo, así que todas las
+    escrituras se hacen bajo un lock.
+    """
+
+    def __init__(self, namespace='ml_app'):
+        self.namespace = namespace
+        self.started_at = time.time()
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        """
+        Registrar la duración de una etapa.
+
+        Args:
+            stage: Nombre de la etapa (por ejemplo, 'predict_proba').
+            seconds: Duración en segundos.
+        """
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        """
+        Medir el bloque `with` y registrarlo en la etapa `stage`.
+
+        Args:
+            stage: Nombre de la etapa.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def snapshot(self):
+        """
+        Resumen de todas las etapas.
+
+        Returns:
+            dict: Etapa -> {'count', 'mean', 'p50', 'p95', 'p99', 'max'} en segundos.
+        """
+        with self._lock:
+            return {
+                stage: {
+                    'count': h.count,
+                    'mean': h.total / h.count if h.count else float('nan'),
+                    'p50': h.percentile(50),
+                    'p95': h.percentile(95),
+                    'p99': h.percentile(99),
+                    'max': h.max,
+                }
+                for stage, h in self._histograms.items()
+            }
+
+    def to_text(self):
+        """
+        Exportar los histogramas en formato de texto de Prometheus.
+
+        Returns:
+            str: Métrica `<namespace>_stage_seconds` con cubetas acumuladas,
+            suma y número de muestras por etapa.
+        """
+        name = f"{self.namespace}_stage_seconds"
+        lines = [f"# HELP {name} Latencia por etapa en segundos.",
+                 f"# TYPE {name} histogram"]
+        with self._lock:
+            for stage, h in sorted(self._histograms.items()):
+                cumulative = np.cumsum(h.counts)
+                for bound, value in zip(BUCKET_BOUNDS, cumulative):
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound:.6g}"}} {value}')
+                lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {h.total:.9f}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """
+        Escribir `to_text()` en un archivo.
+
+        Args:
+            path: Ruta del archivo de métricas.
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_text())
+
+    def reset(self):
+        """Descartar todas las muestras."""
+        with self._lock:
+            self._histograms.clear()
+            self.started_at = time.time()
+
+
+# Traza activa del hilo (Streamlit ejecuta cada sesión en su propio hilo)
+_local = threading.local()
+# Usuarios de tracemalloc: se activa con la primera traza con memoria y se
+# detiene al acabar la última
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+
+def _start_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+
+
+class RerunTrace:
+    """
+    Secciones medidas durante una ejecución del script.
+
+    Attributes:
+        started_at: Marca de tiempo de inicio (epoch).
+        trace_memory: Si se mide la memoria asignada por sección.
+        records: Un dict por sección terminada con 'section' (ruta bajo la
+            raíz separada por ' / '), 'depth', 'offset_ms', 'wall_ms', 'cpu_ms' y 'memory_mb'
+            (pico asignado por encima del inicio de la sección, o None).
+    """
+
+    def __init__(self, trace_memory=False):
+        self.started_at = time.time()
+        self.trace_memory = trace_memory
+        self.records = []
+        self._start = time.perf_counter()
+        self._stack = []
+
+    @contextmanager
+    def section(self, name):
+        """
+        Medir el bloque `with` como sección hija de la sección abierta.
+
+        Con memoria, el pico de `tracemalloc` se reinicia al entrar en cada
+        sección y se propaga a la sección padre al salir, de modo que las
+        secciones anidadas no se falsean entre sí. `tracemalloc` es global al
+        proceso: con sesiones concurrentes la memoria es aproximada.
+
+        Args:
+            name: Nombre de la sección.
+        """
+        frame = {'name': name, 'memory_start': 0, 'memory_peak': 0}
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                parent = self._stack[-1]
+                parent['memory_peak'] = max(parent['memory_peak'], peak)
+            tracemalloc.reset_peak()
+            frame['memory_start'] = frame['memory_peak'] = current
+        self._stack.append(frame)
+        start, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - start, time.thread_time() - cpu
+            memory = None
+            if self.trace_memory:
+                frame['memory_peak'] = max(frame['memory_peak'], tracemalloc.get_traced_memory()[1])
+                memory = (frame['memory_peak'] - frame['memory_start']) / 1e6
+            # La raíz ('rerun') no se repite en la ruta de sus secciones hijas
+            path = self._stack[1:] or self._stack
+            self.records.append({
+                'section': ' / '.join(f['name'] for f in path),
+                'depth': len(self._stack) - 1,
+                'offset_ms': (start - self._start) * 1000,
+                'wall_ms': wall * 1000,
+                'cpu_ms': cpu * 1000,
+                'memory_mb': memory,
+            })
+            self._stack.pop()
+            if self._stack:
+                parent = self._stack[-1]
+                parent['memory_peak'] = max(parent['memory_peak'], frame['memory_peak'])
+
+    def slowest(self, n=10):
+        """Las `n` secciones terminadas con más tiempo de pared."""
+        return sorted(self.records, key=lambda r: r['wall_ms'], reverse=True)[:n]
+
+    def to_dict(self):
+        """Traza serializable a JSON, con las secciones en orden de inicio."""
+        return {
+            'started_at': self.started_at,
+            'trace_memory': self.trace_memory,
+            'sections': sorted(self.records, key=lambda r: r['offset_ms']),
+        }
+
+
+@contextmanager
+def profile_section(name):
+    """
+    Medir un bloque en la traza activa del hilo (no hace nada si no hay ninguna).
+
+    Args:
+        name: Nombre de la sección.
+    """
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        yield
+        return
+    with trace.section(name):
+        yield
+
+
+def profiled(name):
+    """
+    Decorador que mide cada llamada a la función como una sección.
+
+    Args:
+        name: Nombre de la sección.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with profile_section(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class SectionProfiler:
+    """
+    Perfilado por secciones de las ejecuciones del script, compartido por las sesiones.
+
+    Todas las ejecuciones registran el tiempo de pared de cada sección en
+    `recorder` (histogramas por sección). Una fracción `sample_rate` de ellas,
+    y las que pidan memoria explícitamente, se guarda completa en un buffer
+    circular de `max_traces` trazas para exportarla.
+    """
+
+    def __init__(self, namespace='app', sample_rate=0.1, max_traces=500):
+        self.recorder = LatencyRecorder(namespace)
+        self.sample_rate = sample_rate
+        self.traces = deque(maxlen=max_traces)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def rerun(self, trace_memory=False):
+        """
+        Medir una ejecución completa del script como sección raíz 'rerun'.
+
+        Args:
+            trace_memory: Medir la memoria de esta ejecución aunque no salga
+                en el muestreo.
+
+        Yields:
+            RerunTrace: Traza de la ejecución (activa en el hilo).
+        """
+        sampled = trace_memory or random.random() < self.sample_rate
+        trace = RerunTrace(trace_memory=sampled)
+        if sampled:
+            _start_tracemalloc()
+        previous, _local.trace = getattr(_local, 'trace', None), trace
+        try:
+            with trace.section('rerun'):
+                yield trace
+        finally:
+            _local.trace = previous
+            if sampled:
+                _stop_tracemalloc()
+            for record in trace.records:
+                self.recorder.observe(record['section'], record['wall_ms'] / 1000)
+            if sampled:
+                with self._lock:
+                    self.traces.append(trace.to_dict())
+
+    def traces_text(self):
+        """Trazas muestreadas en JSON Lines (una ejecución por línea)."""
+        with self._lock:
+            traces = list(self.traces)
+        return ''.join(json.dumps(trace, ensure_ascii=False) + '\n' for trace in traces)
+
+    def export(self, path):
+        """
+        Escribir las trazas muestreadas en un archivo JSON Lines (escritura atómica).
+
+        Args:
+            path: Ruta del archivo.
+        """
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.traces_text())
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        """Descartar histogramas y trazas."""
+        self.recorder.reset()
+        with self._lock:
+            self.traces.clear()
@@ -0,0 +1,110 @@
+"""
+Generador de carga para el servicio HTTP de predicción.
+
+Lanza `--concurrency` clientes que envían peticiones de una reseña (o de
+`--batch-size` reseñas) con calificaciones aleatorias de la rejilla de los
+sliders, y reporta throughput y latencias p50/p95/p99 medidas en el cliente.
+
+Uso:
+    python prediction_server.py &
+    python load_test.py --concurrency 32 --requests 2000
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+from config import SERVICE_ASPECTS, TRAVELLER_TYPES, PREDICTION_SERVER_HOST, PREDICTION_SERVER_PORT
+from ml_utils import RATING_GRID
+
+
+def _random_payload(rng, batch_size):
+    """Cuerpo JSON con `batch_size` reseñas aleatorias."""
+    instances = [
+        {**dict(zip(SERVICE_ASPECTS, map(float, rng.choice(RATING_GRID, len(SERVICE_ASPECTS))))),
+         'Type Of Traveller': str(rng.choice(TRAVELLER_TYPES))}
+        for _ in range(batch_size)
+    ]
+    body = instances[0] if batch_size == 1 else {'instances': instances}
+    return json.dumps(body).encode('utf-8')
+
+
+def run_load(url, concurrency, n_requests, batch_size=1, seed=0):
+    """
+    Enviar `n_requests` peticiones repartidas entre `concurrency` clientes.
+
+    Args:
+        url: URL del endpoint /predict.
+        concurrency: Número de clientes en paralelo.
+        n_requests: Peticiones totales.
+        batch_size: Reseñas por petición.
+        seed: Semilla de los payloads.
+
+    Returns:
+        dict: Peticiones, errores, segundos, peticiones y filas por segundo y
+        latencias (p50, p95, p99, max) en segundos.
+    """
+    latencies = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+
+    def client(worker):
+        rng = np.random.default_rng(seed + worker)
+        for _ in range(worker, n_requests, concurrency):
+            request = urllib.request.Request(url, data=_random_payload(rng, batch_size),
+                                             headers={'Content-Type': 'application/json'})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request) as response:
+                    response.read()
+            except OSError:
+                errors[worker] += 1
+                continue
+            latencies[worker].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(w,)) for w in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    samples = np.concatenate([np.asarray(l) for l in latencies]) if n_requests else np.zeros(0)
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) if len(samples) else (np.nan,) * 3
+    return {
+        'requests': int(len(samples)),
+        'errors': int(sum(errors)),
+        'seconds': elapsed,
+        'requests_per_second': len(samples) / elapsed,
+        'rows_per_second': len(samples) * batch_size / elapsed,
+        'p50': float(p50),
+        'p95': float(p95),
+        'p99': float(p99),
+        'max': float(samples.max()) if len(samples) else float('nan'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generador de carga del servicio de predicción')
+    parser.add_argument('--url', default=f"http://{PREDICTION_SERVER_HOST}:{PREDICTION_SERVER_PORT}/predict")
+    parser.add_argument('--concurrency', type=int, default=16, help='Clientes en paralelo')
+    parser.add_argument('--requests', type=int, default=1000, help='Peticiones totales')
+    parser.add_argument('--batch-size', type=int, default=1, help='Reseñas por petición')
+    parser.add_argument('--json', action='store_true', help='Imprimir el resultado como JSON')
+    args = parser.parse_args()
+
+    stats = run_load(args.url, args.concurrency, args.requests, args.batch_size)
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return
+    print(f"✅ {stats['requests']:,} peticiones ({stats['errors']} errores) en {stats['seconds']:.2f}s")
+    print(f"   Throughput: {stats['requests_per_second']:,.0f} peticiones/s | {stats['rows_per_second']:,.0f} filas/s")
+    print(f"   Latencia: p50 {stats['p50']*1000:.1f} ms | p95 {stats['p95']*1000:.1f} ms | "
+          f"p99 {stats['p99']*1000:.1f} ms | máx {stats['max']*1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,17 @@
 App Interactiva de Machine Learning - Predicción de Recomendación Ryanair
 Versión Simple y Limpia
 """
+import time
+
 import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pickle
 
-# Configuración de la página
+from config import (
+    MODEL_PATH, MODEL_ARTIFACT_PATH, MODEL_REGISTRY_DIR, SERVICE_ASPECTS, TRAVELLER_TYPES, ML_FEATURE_DISPLAY_NAMES,
+    PROMOTER_THRESHOLD, LATENCY_METRICS_PATH
+)
+
+# Configuración de la página (antes de importar pandas y los módulos del
+# modelo, para que el navegador pinte el layout mientras se cargan)
 st.set_page_config(
     page_title="ML Predictor - Ryanair",
     page_icon="🤖",
@@ -89,33 +92,102 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Cargar modelo
+import pandas as pd  # noqa: E402
+import numpy as np  # noqa: E402
+
+from ml_utils import align_features, model_category_levels, sensitivity_analysis, RATING_GRID  # noqa: E402
+from ml_registry import ModelHolder  # noqa: E402
+from instrumentation import LatencyRecorder  # noqa: E402
+from analytics import resolve_data_path  # noqa: E402
+from segment_benchmarks import load_or_update, summarize, score_percentile  # noqa: E402
+from ml_importance import aspect_importances  # noqa: E402
+from ml_explain import shap_values, group_attributions  # noqa: E402
+from ml_counterfactual import make_scorer, make_bound, find_counterfactual  # noqa: E402
+
+# Histogramas de latencia por etapa, compartidos por todas las sesiones del proceso
+@st.cache_resource
+def get_latency_recorder():
+    """Recorder de latencias del proceso de Streamlit"""
+    return LatencyRecorder('ml_app')
+
+# Modelo activo compartido entre sesiones, con sustitución en caliente
 @st.cache_resource
-def load_model():
-    """Cargar modelo Random Forest"""
+def get_model_holder():
+    """Versión promovida del registro (o, en su defecto, el artefacto / .pkl local)"""
     try:
-        with open('ryanair_recommendation_model.pkl', 'rb') as f:
-            model = pickle.load(f)
-        return model
+        with get_latency_recorder().time('load_model'):
+            return ModelHolder(MODEL_REGISTRY_DIR, MODEL_ARTIFACT_PATH, MODEL_PATH)
     except Exception as e:
         st.error(f"❌ Error: {str(e)}")
-        st.info("💡 Ejecuta primero: python run_ml_analysis.py")
+        st.info("💡 Ejecuta primero: python train_model.py --register --promote")
+        return None
+
+def show_latency_diagnostics(recorder):
+    """Panel lateral con percentiles de latencia por etapa y exportación de métricas"""
+    with st.sidebar.expander("⏱️ Diagnóstico de Latencia", expanded=False):
+        snapshot = recorder.snapshot()
+        if not snapshot:
+            st.caption("Sin peticiones registradas todavía.")
+            return
+        table = pd.DataFrame(snapshot).T[['count', 'p50', 'p95', 'p99', 'max']]
+        table[['p50', 'p95', 'p99', 'max']] *= 1000
+        table['count'] = table['count'].astype(int)
+        st.dataframe(table.rename(columns={'count': 'peticiones', 'p50': 'p50 (ms)', 'p95': 'p95 (ms)',
+                                           'p99': 'p99 (ms)', 'max': 'máx (ms)'}).round(2))
+        metrics_text = recorder.to_text()
+        st.download_button("📥 Descargar métricas", metrics_text, file_name=LATENCY_METRICS_PATH,
+                           mime='text/plain')
+        if st.button("💾 Guardar en disco"):
+            recorder.export(LATENCY_METRICS_PATH)
+            st.success(f"Métricas guardadas en {LATENCY_METRICS_PATH}")
+        if st.button("🗑️ Reiniciar contadores"):
+            recorder.reset()
+
+def get_segment_benchmarks(model, model_version):
+    """Estado de benchmarks por segmento; solo procesa las reseñas nuevas del CSV"""
+    data_path = resolve_data_path()
+    if data_path is None:
+        return None
+    try:
+        with get_latency_recorder().time('segment_benchmarks'):
+            state, _ = load_or_update(data_path, model, model_version)
+        return state
+    except Exception as e:
+        st.warning(f"⚠️ No se pudieron calcular los benchmarks por segmento: {e}")
         return None
 
+def format_metric(metrics, key, percent=True):
+    """Formatear una métrica del modelo activo ('N/D' si el modelo no la incluye)"""
+    if key not in metrics:
+        return "N/D"
+    return f"{metrics[key]*100:.2f}%" if percent else f"{metrics[key]:.4f}"
+
 def main():
     # Título profesional
     st.markdown("# 🎯 Sistema Predictivo de Recomendación")
     st.markdown("### Análisis de Machine Learning para Evaluación de Satisfacción del Cliente")
     st.markdown("---")
 
-    # Cargar modelo
-    model = load_model()
-    if model is None:
+    # Cargar modelo: instantánea de la versión activa para toda esta ejecución
+    recorder = get_latency_recorder()
+    holder = get_model_holder()
+    if holder is None:
         st.stop()
+    with recorder.time('refresh_model'):
+        swapping = holder.refresh()
+    active = holder.current
+    model, probability_grid = active.model, active.grid
+    metrics = model.metadata.get('metrics', {})
+    training = model.metadata.get('training', {})
+    n_reviews = training.get('n_train', 0) + training.get('n_test', 0)
+    if swapping:
+        st.caption("🔄 Cargando una nueva versión del modelo en segundo plano...")
+    if holder.error is not None:
+        st.warning(f"⚠️ No se pudo cargar la versión promovida: {holder.error}")
 
     # Información del modelo
     with st.expander("ℹ️ Información del Sistema Predictivo", expanded=False):
-        st.markdown("""
+        st.markdown(f"""
         ### 🔍 Descripción del Sistema
 
         Este sistema utiliza algoritmos de **Machine Learning** (Random Forest Classifier)
@@ -125,11 +197,12 @@ def main():
         ### 📊 Especificaciones Técnicas
 
         - **Algoritmo:** Random Forest Classifier
-        - **Accuracy:** 94.67%
-        - **Precision:** 90.14%
-        - **Recall:** 91.03%
-        - **ROC-AUC Score:** 0.9467
-        - **Dataset de Entrenamiento:** 2,249 reseñas verificadas
+        - **Versión del Modelo:** {active.version or 'N/D'}
+        - **Accuracy:** {format_metric(metrics, 'accuracy')}
+        - **Precision:** {format_metric(metrics, 'precision')}
+        - **Recall:** {format_metric(metrics, 'recall')}
+        - **ROC-AUC Score:** {format_metric(metrics, 'roc_auc', percent=False)}
+        - **Dataset de Entrenamiento:** {f"{n_reviews:,} reseñas" if n_reviews else 'N/D'}
         - **Variables Predictoras:** 5 aspectos del servicio + segmento de cliente
 
         ### 🎯 Aplicaciones
@@ -188,7 +261,7 @@ def main():
 
     traveller_type = st.selectbox(
         "Tipo de Viajero:",
-        ["Couple Leisure", "Solo Leisure", "Family Leisure", "Business"],
+        TRAVELLER_TYPES,
         help="Selecciona el tipo de pasajero para un análisis más personalizado"
     )
 
@@ -198,67 +271,91 @@ def main():
             "emoji": "💑",
             "descripcion": "Pareja viajando por placer",
             "caracteristicas": "Suelen buscar comodidad y buen servicio. Valoran la experiencia general más que el precio.",
-            "avg_satisfaction": 4.5,
             "prioridades": ["Servicio del Personal", "Comodidad del Asiento", "Relación Calidad-Precio"]
         },
         "Solo Leisure": {
             "emoji": "🧳",
             "descripcion": "Viajero individual por placer",
             "caracteristicas": "Más flexible con el servicio. Valora mucho la relación calidad-precio y la puntualidad.",
-            "avg_satisfaction": 4.3,
             "prioridades": ["Relación Calidad-Precio", "Servicio en Tierra", "Puntualidad"]
         },
         "Family Leisure": {
             "emoji": "👨‍👩‍👧‍👦",
             "descripcion": "Familia viajando con niños",
             "caracteristicas": "Segmento más crítico. Necesitan espacio, buen servicio y gestión de equipaje. Muy sensibles a problemas.",
-            "avg_satisfaction": 3.8,
             "prioridades": ["Servicio en Tierra", "Equipaje", "Espacio y Comodidad"]
         },
         "Business": {
             "emoji": "💼",
             "descripcion": "Viajero de negocios",
             "caracteristicas": "Valora eficiencia y puntualidad por encima de todo. Menos sensible al precio.",
-            "avg_satisfaction": 4.6,
             "prioridades": ["Puntualidad", "Servicio en Tierra", "Eficiencia"]
         }
     }
 
-    segment = segment_descriptions[traveller_type]
+    # Benchmarks del segmento calculados sobre las reseñas reales
+    segment = dict(segment_descriptions[traveller_type])
+    benchmark_state = get_segment_benchmarks(model, active.version)
+    if benchmark_state is not None and traveller_type in benchmark_state.index:
+        benchmark = summarize(benchmark_state).loc[traveller_type]
+        client_percentile = score_percentile(benchmark_state, traveller_type, avg_score)
+        segment['avg_satisfaction'] = benchmark['avg_satisfaction']
+        segment['benchmark_note'] = (
+            f"mediana {benchmark['p50']:.1f}, P25–P75 {benchmark['p25']:.1f}–{benchmark['p75']:.1f}; "
+            f"cliente en el percentil {client_percentile:.0f} de {int(benchmark['reviews']):,} reseñas"
+        )
+    else:
+        benchmark = None
+        segment['avg_satisfaction'] = float('nan')
+        segment['benchmark_note'] = "sin datos de reseñas"
 
     with st.expander(f"{segment['emoji']} Ver perfil de este segmento", expanded=False):
         st.markdown(f"**Descripción:** {segment['descripcion']}")
         st.markdown(f"**Características:** {segment['caracteristicas']}")
-        st.markdown(f"**Satisfacción promedio:** {segment['avg_satisfaction']:.1f}/5.0")
+        if benchmark is None:
+            st.caption("No se encontró el CSV de reseñas para calcular los benchmarks del segmento.")
+        else:
+            st.markdown(f"**Satisfacción promedio:** {segment['avg_satisfaction']:.2f}/5.0 "
+                        f"({int(benchmark['reviews']):,} reseñas)")
+            st.markdown(f"**Bandas de calificación media:** P10 {benchmark['p10']:.1f} · P25 {benchmark['p25']:.1f} · "
+                        f"P50 {benchmark['p50']:.1f} · P75 {benchmark['p75']:.1f} · P90 {benchmark['p90']:.1f}")
+            st.markdown(f"**Tasa de recomendación:** real {benchmark['actual_rate']*100:.1f}% | "
+                        f"predicha por el modelo {benchmark['predicted_rate']*100:.1f}%")
+            st.markdown("**Media por aspecto:** " + " · ".join(
+                f"{ML_FEATURE_DISPLAY_NAMES[a]} {benchmark[a]:.2f}" for a in SERVICE_ASPECTS
+            ))
         st.markdown("**Prioridades principales:**")
         for i, prioridad in enumerate(segment['prioridades'], 1):
             st.markdown(f"   {i}. {prioridad}")
 
+    show_pairwise = st.checkbox(
+        "📈 Incluir mapas de sensibilidad por pares de aspectos",
+        value=False,
+        help="Añade al análisis what-if las rejillas 2-D de cada par de aspectos"
+    )
+
     st.markdown("---")
 
     # Botón de predicción profesional
     if st.button("📊 EJECUTAR ANÁLISIS PREDICTIVO"):
 
-        # Preparar datos
-        input_data = pd.DataFrame({
-            'Seat Comfort': [seat_comfort],
-            'Cabin Staff Service': [cabin_staff],
-            'Food & Beverages': [food_bev],
-            'Ground Service': [ground_service],
-            'Value For Money': [value_money]
-        })
-
-        # Añadir columnas faltantes (todas en 0)
-        for col in model.feature_names_in_:
-            if col not in input_data.columns:
-                input_data[col] = 0
-
-        # Reordenar columnas
-        input_data = input_data[model.feature_names_in_]
-
-        # Predicción
-        prediction = model.predict(input_data)[0]
-        probability = model.predict_proba(input_data)[0]
+        request_start = time.perf_counter()
+        aspects_input = [seat_comfort, cabin_staff, food_bev, ground_service, value_money]
+        with recorder.time('align_features'):
+            input_data = pd.DataFrame([aspects_input], columns=SERVICE_ASPECTS)
+            input_data['Type Of Traveller'] = traveller_type
+            input_data = align_features(input_data, model.feature_names_in_,
+                                        category_levels=model_category_levels(model))
+
+        # Predicción: consulta O(1) en la tabla precalculada; el modelo solo
+        # se evalúa si la entrada queda fuera de la rejilla
+        with recorder.time('predict_proba'):
+            probability = probability_grid.lookup(aspects_input, traveller_type)
+            if probability is None:
+                prediction, probability = model.predict_with_proba(input_data)
+                prediction, probability = prediction[0], probability[0]
+            else:
+                prediction = model.classes_[np.argmax(probability)]
 
         # Mostrar resultado
         st.markdown("---")
@@ -306,7 +403,7 @@ def main():
                 st.markdown(f"""
                 **{segment['emoji']} Segmento:** {segment['descripcion']}
 
-                **Benchmark del Segmento:** {segment['avg_satisfaction']:.1f}/5.0
+                **Benchmark del Segmento:** {segment['avg_satisfaction']:.2f}/5.0 ({segment['benchmark_note']})
                 **Calificación del Cliente:** {avg_score:.2f}/5.0
                 **Desviación:** {'+' if avg_score > segment['avg_satisfaction'] else ''}{(avg_score - segment['avg_satisfaction']):.2f} puntos
 
@@ -337,7 +434,7 @@ def main():
                 st.markdown(f"""
                 **{segment['emoji']} Segmento:** {segment['descripcion']}
 
-                **Benchmark del Segmento:** {segment['avg_satisfaction']:.1f}/5.0
+                **Benchmark del Segmento:** {segment['avg_satisfaction']:.2f}/5.0 ({segment['benchmark_note']})
                 **Calificación del Cliente:** {avg_score:.2f}/5.0
                 **Desviación:** {'+' if avg_score > segment['avg_satisfaction'] else ''}{(avg_score - segment['avg_satisfaction']):.2f} puntos
 
@@ -369,7 +466,7 @@ def main():
                 st.markdown(f"""
                 **{segment['emoji']} Segmento:** {segment['descripcion']}
 
-                **Benchmark del Segmento:** {segment['avg_satisfaction']:.1f}/5.0 (segmento más exigente)
+                **Benchmark del Segmento:** {segment['avg_satisfaction']:.2f}/5.0 ({segment['benchmark_note']})
                 **Calificación del Cliente:** {avg_score:.2f}/5.0
                 **Desviación:** {'+' if avg_score > segment['avg_satisfaction'] else ''}{(avg_score - segment['avg_satisfaction']):.2f} puntos
 
@@ -402,7 +499,7 @@ def main():
                 st.markdown(f"""
                 **{segment['emoji']} Segmento:** {segment['descripcion']}
 
-                **Benchmark del Segmento:** {segment['avg_satisfaction']:.1f}/5.0 (segmento con mayor satisfacción)
+                **Benchmark del Segmento:** {segment['avg_satisfaction']:.2f}/5.0 ({segment['benchmark_note']})
                 **Calificación del Cliente:** {avg_score:.2f}/5.0
                 **Desviación:** {'+' if avg_score > segment['avg_satisfaction'] else ''}{(avg_score - segment['avg_satisfaction']):.2f} puntos
 
@@ -438,9 +535,9 @@ def main():
                 st.markdown(f"""
                 **{segment['emoji']} Segmento:** {segment['descripcion']}
 
-                **Benchmark del Segmento:** {segment['avg_satisfaction']:.1f}/5.0
+                **Benchmark del Segmento:** {segment['avg_satisfaction']:.2f}/5.0 ({segment['benchmark_note']})
                 **Calificación del Cliente:** {avg_score:.2f}/5.0
-                **Gap Crítico:** {(avg_score - segment['avg_satisfaction']):.2f} puntos bajo benchmark
+                **Gap vs. Benchmark:** {(avg_score - segment['avg_satisfaction']):+.2f} puntos
 
                 #### Análisis de Factores Negativos:
 
@@ -476,9 +573,9 @@ def main():
                 st.markdown(f"""
                 **{segment['emoji']} Segmento:** {segment['descripcion']}
 
-                **Benchmark del Segmento:** {segment['avg_satisfaction']:.1f}/5.0 (segmento más tolerante)
+                **Benchmark del Segmento:** {segment['avg_satisfaction']:.2f}/5.0 ({segment['benchmark_note']})
                 **Calificación del Cliente:** {avg_score:.2f}/5.0
-                **Gap Crítico:** {(avg_score - segment['avg_satisfaction']):.2f} puntos bajo benchmark
+                **Gap vs. Benchmark:** {(avg_score - segment['avg_satisfaction']):+.2f} puntos
 
                 #### Análisis de Factores Negativos:
 
@@ -514,9 +611,9 @@ def main():
                 st.markdown(f"""
                 **{segment['emoji']} Segmento:** {segment['descripcion']}
 
-                **Benchmark del Segmento:** {segment['avg_satisfaction']:.1f}/5.0 (segmento más exigente)
+                **Benchmark del Segmento:** {segment['avg_satisfaction']:.2f}/5.0 ({segment['benchmark_note']})
                 **Calificación del Cliente:** {avg_score:.2f}/5.0
-                **Gap Crítico:** {(avg_score - segment['avg_satisfaction']):.2f} puntos bajo benchmark ya bajo
+                **Gap vs. Benchmark:** {(avg_score - segment['avg_satisfaction']):+.2f} puntos
 
                 #### Análisis de Factores Negativos:
 
@@ -554,9 +651,9 @@ def main():
                 st.markdown(f"""
                 **{segment['emoji']} Segmento:** {segment['descripcion']}
 
-                **Benchmark del Segmento:** {segment['avg_satisfaction']:.1f}/5.0 (segmento con mayor satisfacción histórica)
+                **Benchmark del Segmento:** {segment['avg_satisfaction']:.2f}/5.0 ({segment['benchmark_note']})
                 **Calificación del Cliente:** {avg_score:.2f}/5.0
-                **Gap Crítico:** {(avg_score - segment['avg_satisfaction']):.2f} puntos - **Desviación Anómala**
+                **Gap vs. Benchmark:** {(avg_score - segment['avg_satisfaction']):+.2f} puntos
 
                 #### Análisis de Factores Negativos:
 
@@ -610,7 +707,9 @@ def main():
                 delta=None
             )
 
-        # Gráfico visual simple
+        # Gráfico visual simple (matplotlib solo se importa al mostrar resultados)
+        import matplotlib.pyplot as plt
+
         fig, ax = plt.subplots(figsize=(10, 2))
         colors = ['#dc3545', '#28a745']
         labels = ['No Recomienda', 'Sí Recomienda']
@@ -663,68 +762,170 @@ def main():
             else:
                 st.markdown("⚠️ No hay fortalezas destacadas")
 
-        # Importancia de aspectos (hardcoded basado en el modelo)
+        # Explicación de la predicción: atribuciones TreeSHAP por aspecto
+        st.markdown("---")
+        st.markdown("### 🔬 ¿Por Qué Esta Predicción?")
+
+        if model.node_weights is None:
+            st.info("💡 El artefacto del modelo no incluye pesos de nodo. "
+                    "Vuelve a exportarlo con `python ml_artifact.py export` para ver explicaciones.")
+        else:
+            with recorder.time('explain'):
+                phi, base_value = shap_values(model, input_data)
+            contributions = {
+                ML_FEATURE_DISPLAY_NAMES.get(name, name): float(values[0])
+                for name, values in group_attributions(phi, model.feature_names_in_).items()
+            }
+            contributions = dict(sorted(contributions.items(), key=lambda item: abs(item[1])))
+
+            st.markdown(f"""
+            Partiendo de la probabilidad media del modelo (**{base_value*100:.1f}%**), cada aspecto
+            suma o resta puntos hasta llegar a la probabilidad de recomendación de este cliente
+            (**{probability[1]*100:.1f}%**).
+            """)
+
+            fig, ax = plt.subplots(figsize=(10, 4))
+            values = [v * 100 for v in contributions.values()]
+            ax.barh(list(contributions.keys()), values,
+                    color=['#28a745' if v >= 0 else '#dc3545' for v in values])
+            ax.axvline(0, color='black', linewidth=1)
+            ax.set_xlabel('Contribución a la probabilidad de recomendar (puntos %)')
+            for i, v in enumerate(values):
+                ax.text(v, i, f' {v:+.1f}', va='center', ha='left' if v >= 0 else 'right', fontsize=9)
+            ax.grid(axis='x', alpha=0.3)
+            plt.tight_layout()
+            st.pyplot(fig)
+            plt.close()
+
+        # Análisis what-if: todas las entradas perturbadas en un único lote
+        st.markdown("---")
+        st.markdown("### 📈 Análisis de Sensibilidad (What-If)")
+        st.markdown("*Cómo cambia la probabilidad de recomendar al variar cada aspecto, manteniendo el resto fijo*")
+
+        with recorder.time('sensitivity'):
+            curves, pair_grids = sensitivity_analysis(model, aspects_input, traveller_type, show_pairwise)
+        aspect_labels = [ML_FEATURE_DISPLAY_NAMES[a] for a in SERVICE_ASPECTS]
+
+        fig, ax = plt.subplots(figsize=(10, 5))
+        for i, label in enumerate(aspect_labels):
+            line = ax.plot(RATING_GRID, curves[i] * 100, marker='o', linewidth=2, label=label)
+            current = int(round((aspects_input[i] - RATING_GRID[0]) / (RATING_GRID[1] - RATING_GRID[0])))
+            ax.scatter([RATING_GRID[current]], [curves[i][current] * 100], s=120,
+                       color=line[0].get_color(), edgecolor='black', zorder=3)
+        ax.axhline(50, color='gray', linestyle='--', linewidth=1)
+        ax.set_xlabel('Calificación del aspecto (1-5)')
+        ax.set_ylabel('Probabilidad de recomendar (%)')
+        ax.set_ylim(0, 100)
+        ax.grid(alpha=0.3)
+        ax.legend(loc='best', fontsize=9)
+        plt.tight_layout()
+        st.pyplot(fig)
+        plt.close()
+
+        if pair_grids:
+            fig, axes = plt.subplots(2, 5, figsize=(16, 6.5))
+            for ax, ((i, j), grid) in zip(axes.ravel(), pair_grids.items()):
+                image = ax.imshow(grid * 100, origin='lower', cmap='RdYlGn', vmin=0, vmax=100,
+                                  extent=[RATING_GRID[0] - 0.25, RATING_GRID[-1] + 0.25,
+                                          RATING_GRID[0] - 0.25, RATING_GRID[-1] + 0.25])
+                ax.scatter([aspects_input[j]], [aspects_input[i]], marker='x', color='black')
+                ax.set_xlabel(aspect_labels[j], fontsize=8)
+                ax.set_ylabel(aspect_labels[i], fontsize=8)
+                ax.tick_params(labelsize=7)
+            fig.colorbar(image, ax=axes.ravel().tolist(), label='Probabilidad de recomendar (%)')
+            st.pyplot(fig)
+            plt.close()
+
+        # Importancia de aspectos calculada a partir del modelo cargado
         st.markdown("---")
         st.markdown("### 🎯 ¿Qué Aspectos Son Más Importantes?")
 
-        importance_data = {
-            'Servicio en Tierra': 0.31,
-            'Relación Calidad-Precio': 0.24,
-            'Servicio del Personal': 0.21,
-            'Comodidad del Asiento': 0.15,
-            'Comida y Bebidas': 0.09
-        }
+        importances = model.metadata.get('feature_importances', {})
+        importance_data = aspect_importances(importances, 'impurity')
+        permutation_data = aspect_importances(importances, 'permutation_mean')
 
         st.markdown("""
         El modelo ha identificado que estos aspectos tienen el siguiente impacto
         en la decisión de recomendar:
         """)
 
-        for aspect, importance in importance_data.items():
-            st.progress(importance)
-            st.caption(f"**{aspect}**: {importance*100:.0f}% de impacto")
+        for feature, importance in importance_data.items():
+            st.progress(min(max(importance, 0.0), 1.0))
+            caption = f"**{ML_FEATURE_DISPLAY_NAMES.get(feature, feature)}**: {importance*100:.0f}% de impacto"
+            if feature in permutation_data:
+                caption += f" | Caída de ROC-AUC al permutar: {permutation_data[feature]:.3f}"
+            st.caption(caption)
 
         # Insight final
         st.markdown("---")
         st.markdown("### 💡 Insight Clave")
 
-        if ground_service < 3:
-            st.warning("""
-            **⚠️ Atención:** El **Servicio en Tierra** está bajo y es el aspecto MÁS IMPORTANTE
-            para la recomendación. Mejorar este aspecto tiene el mayor impacto potencial.
-            """)
-        elif value_money < 3:
-            st.warning("""
-            **⚠️ Atención:** La **Relación Calidad-Precio** está baja y es el segundo
-            aspecto más importante. Los clientes sienten que no vale la pena.
-            """)
-        elif avg_score >= 4:
-            st.success("""
-            **🎉 Excelente:** Las calificaciones son buenas en general.
-            Este cliente está satisfecho y probablemente recomendará.
-            """)
-        else:
-            st.info("""
-            **📊 Análisis:** Las calificaciones son mixtas. Hay oportunidades de mejora
-            especialmente en Servicio en Tierra y Relación Calidad-Precio.
+        # Mejoras mínimas que cambian la predicción, buscadas sobre el propio modelo
+        score_indices = make_scorer(model, traveller_type, probability_grid)
+        score_bound = make_bound(model, traveller_type, probability_grid)
+        positive_probability = probability[list(model.classes_).index(1)]
+
+        def describe(result):
+            return "\n".join(
+                f"- **{ML_FEATURE_DISPLAY_NAMES[aspect]}**: {current:.1f} → {target:.1f}"
+                for aspect, (current, target) in result['changes'].items()
+            )
+
+        targets = []
+        if prediction != 1:
+            targets.append(('recomendar', 0.5))
+        if positive_probability <= PROMOTER_THRESHOLD:
+            targets.append(('ser PROMOTOR', PROMOTER_THRESHOLD))
+
+        if not targets:
+            st.success(f"""
+            **🎉 Excelente:** La probabilidad de recomendar ({positive_probability*100:.1f}%) supera el
+            umbral de promotor ({PROMOTER_THRESHOLD*100:.0f}%). Mantener el nivel actual en todos los aspectos.
             """)
 
+        for label, threshold in targets:
+            with recorder.time('counterfactual'):
+                result = find_counterfactual(score_indices, aspects_input, threshold, bound=score_bound)
+            if result is None:
+                st.warning(f"""
+                **⚠️ Atención:** Ninguna combinación de mejoras en los aspectos del servicio lleva
+                a este cliente a {label} (umbral {threshold*100:.0f}%) dentro del tiempo de búsqueda.
+                """)
+                continue
+
+            message = (f"**🎯 Para {label}** (>{threshold*100:.0f}%), el cambio mínimo es mejorar "
+                       f"{len(result['changes'])} aspecto(s) en {result['steps']} paso(s) de 0.5:\n\n"
+                       f"{describe(result)}\n\n"
+                       f"Probabilidad resultante: **{result['probability']*100:.1f}%**")
+            if prediction != 1 and threshold == 0.5:
+                st.warning(message)
+            else:
+                st.info(message)
+            pruned = f" ({result['pruned']:,} descartadas por la cota)" if score_bound is not None else ""
+            st.caption(f"{result['evaluated']:,} combinaciones evaluadas{pruned} "
+                       f"en {result['seconds']*1000:.0f} ms"
+                       + ("" if result['complete'] else " (búsqueda interrumpida por tiempo)"))
+
+        recorder.observe('request', time.perf_counter() - request_start)
+
     # Footer profesional
     st.markdown("---")
-    st.markdown("""
+    st.markdown(f"""
         <div style='text-align: center; background: linear-gradient(135deg, #073590 0%, #0A4DAB 100%);
                     padding: 25px; border-radius: 8px; margin-top: 30px;'>
             <p style='color: #F1C933; font-size: 18px; font-weight: 600; margin: 0;'>
                 Sistema de Machine Learning - Ryanair Customer Analytics
             </p>
             <p style='color: white; font-size: 14px; margin-top: 10px;'>
-                Modelo: Random Forest Classifier | Accuracy: 94.67% | ROC-AUC: 0.9467
+                Modelo: Random Forest Classifier {active.version or ''} | Accuracy: {format_metric(metrics, 'accuracy')} | ROC-AUC: {format_metric(metrics, 'roc_auc', percent=False)}
             </p>
             <p style='color: #F1C933; font-size: 12px; margin-top: 8px;'>
-                Dataset: 2,249 reseñas verificadas | Última actualización: Febrero 2026
+                Dataset: {f"{n_reviews:,} reseñas" if n_reviews else 'N/D'} | Última actualización: {model.metadata.get('created_at', 'N/D')}
             </p>
         </div>
     """, unsafe_allow_html=True)
 
+    show_latency_diagnostics(recorder)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,317 @@
+"""
+Formato de artefacto del modelo de recomendación con carga memory-mapped.
+
+Un artefacto es un directorio con:
+    metadata.json   Cabecera: formato, versión, features, clases y métricas.
+    <array>.npy     Arrays del runtime NumPy (sin comprimir). `node_weights`
+                    es opcional y habilita las explicaciones TreeSHAP.
+
+`save_artifact` escribe cada versión en un directorio nuevo de
+`<artefacto>.versions/` y la publica cambiando de forma atómica el enlace
+simbólico `<artefacto>`, así que las rutas de siempre siguen funcionando.
+
+Los arrays se cargan con `mmap_mode='r'`, de modo que varios procesos worker
+de Streamlit comparten las mismas páginas físicas del archivo en lugar de
+deserializar cada uno el bosque completo en su heap.
+
+Uso:
+    python ml_artifact.py export --model ryanair_recommendation_model.pkl --out ryanair_recommendation_model
+    python ml_artifact.py info ryanair_recommendation_model
+    python ml_artifact.py bench --model ryanair_recommendation_model.pkl --artifact ryanair_recommendation_model
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from config import MODEL_PATH, MODEL_ARTIFACT_PATH, MODEL_ARTIFACT_KEEP_VERSIONS
+from ml_runtime import FlatForest
+from ml_utils import load_model, model_category_levels, model_impute_values
+
+ARTIFACT_FORMAT_VERSION = 3
+SUPPORTED_FORMAT_VERSIONS = (1, 2, 3)
+METADATA_FILE = 'metadata.json'
+ARRAY_NAMES = ['feature', 'threshold', 'children', 'value', 'roots']
+# Arrays añadidos en las versiones 2 (node_weights) y 3 (missing_go_to_left)
+OPTIONAL_ARRAY_NAMES = ['node_weights', 'missing_go_to_left']
+VERSIONS_SUFFIX = '.versions'
+
+
+def _claim_version_dir(versions_dir, version):
+    """Crear un directorio nuevo y vacío para `version` (con sufijo si ya existe)."""
+    os.makedirs(versions_dir, exist_ok=True)
+    name, attempt = str(version), 1
+    while True:
+        try:
+            os.mkdir(os.path.join(versions_dir, name))
+            return os.path.join(versions_dir, name)
+        except FileExistsError:
+            attempt += 1
+            name = f"{version}-{attempt}"
+
+
+def _switch_pointer(path, version_dir, versions_dir):
+    """Hacer que el enlace simbólico `path` apunte a `version_dir` con un único rename."""
+    if os.path.isdir(path) and not os.path.islink(path):
+        # Artefacto con el formato anterior (directorio real): se mueve una
+        # sola vez a las versiones para poder sustituirlo por el enlace
+        try:
+            legacy_version = read_metadata(path).get('version', 'legacy')
+        except (OSError, ValueError):
+            legacy_version = 'legacy'
+        os.rename(path, _claim_version_dir(versions_dir, legacy_version))
+    tmp_link = f"{path}.tmp-{os.getpid()}"
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+    os.symlink(os.path.relpath(version_dir, os.path.dirname(os.path.abspath(path))), tmp_link)
+    os.replace(tmp_link, path)
+
+
+def _prune_versions(versions_dir, current, keep_versions):
+    """Borrar las versiones más antiguas, conservando `keep_versions` (incluida la actual)."""
+    entries = [
+        os.path.join(versions_dir, name) for name in os.listdir(versions_dir)
+        if os.path.join(versions_dir, name) != current
+    ]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    # Los archivos ya mapeados siguen siendo legibles tras borrarlos (POSIX)
+    for entry in entries[max(keep_versions - 1, 0):]:
+        shutil.rmtree(entry, ignore_errors=True)
+
+
+def save_artifact(forest, path, version=None, metrics=None, extra=None,
+                  keep_versions=MODEL_ARTIFACT_KEEP_VERSIONS):
+    """
+    Guardar un FlatForest como artefacto.
+
+    Cada guardado escribe un directorio nuevo en `<path>.versions/` y después
+    sustituye de forma atómica el enlace simbólico `path` para que apunte a
+    él. Nunca se borra ni se reescribe la versión que están leyendo otros
+    procesos: un lector ve la versión anterior completa o la nueva completa.
+
+    Args:
+        forest: FlatForest a guardar.
+        path: Ruta del artefacto (enlace simbólico a la versión actual).
+        version: Identificador de versión (por defecto, fecha y hora actuales).
+        metrics: Dict con métricas de entrenamiento (accuracy, roc_auc, ...).
+        extra: Dict con metadatos adicionales.
+        keep_versions: Versiones que se conservan en `<path>.versions/`.
+
+    Returns:
+        dict: Metadatos escritos.
+    """
+    metadata = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'version': version or datetime.now().strftime('%Y%m%d%H%M%S'),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'feature_names': [str(f) for f in forest.feature_names_in_],
+        'classes': np.asarray(forest.classes_).tolist(),
+        'max_depth': forest.max_depth,
+        'n_estimators': forest.n_estimators,
+        'metrics': metrics or {},
+    }
+    if extra:
+        metadata.update(extra)
+
+    versions_dir = f"{path}{VERSIONS_SUFFIX}"
+    version_dir = _claim_version_dir(versions_dir, metadata['version'])
+    for name in ARRAY_NAMES + OPTIONAL_ARRAY_NAMES:
+        array = getattr(forest, name)
+        if array is not None:
+            np.save(os.path.join(version_dir, f"{name}.npy"), np.ascontiguousarray(array))
+    with open(os.path.join(version_dir, METADATA_FILE), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+
+    _switch_pointer(path, version_dir, versions_dir)
+    _prune_versions(versions_dir, version_dir, keep_versions)
+    return metadata
+
+
+def read_metadata(path):
+    """
+    Leer la cabecera de un artefacto sin cargar los arrays.
+
+    Args:
+        path: Directorio del artefacto.
+
+    Returns:
+        dict: Metadatos del artefacto.
+    """
+    with open(os.path.join(path, METADATA_FILE), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_artifact(path, mmap=True):
+    """
+    Cargar un artefacto como FlatForest.
+
+    Args:
+        path: Directorio del artefacto.
+        mmap: Mapear los arrays en memoria en modo solo lectura.
+
+    Returns:
+        FlatForest: Modelo con el atributo `metadata`.
+
+    Raises:
+        ValueError: Si el formato del artefacto no es compatible.
+    """
+    # Resolver el enlace una vez: cabecera y arrays salen de la misma versión
+    # aunque otro proceso guarde una nueva mientras tanto
+    path = os.path.realpath(path)
+    metadata = read_metadata(path)
+    if metadata.get('format_version') not in SUPPORTED_FORMAT_VERSIONS:
+        raise ValueError(f"Formato de artefacto no soportado: {metadata.get('format_version')}")
+
+    mmap_mode = 'r' if mmap else None
+    arrays = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+        for name in ARRAY_NAMES
+    }
+    for name in OPTIONAL_ARRAY_NAMES:
+        array_path = os.path.join(path, f"{name}.npy")
+        if os.path.exists(array_path):
+            arrays[name] = np.load(array_path, mmap_mode=mmap_mode)
+    forest = FlatForest(
+        max_depth=metadata['max_depth'],
+        feature_names=metadata['feature_names'],
+        classes=metadata['classes'],
+        **arrays
+    )
+    forest.metadata = metadata
+    return forest
+
+
+def load_forest(artifact_path=MODEL_ARTIFACT_PATH, pickle_path=MODEL_PATH):
+    """
+    Cargar el modelo desde el artefacto o, si no existe, desde el pickle.
+
+    Args:
+        artifact_path: Directorio del artefacto.
+        pickle_path: Ruta del modelo serializado con pickle.
+
+    Returns:
+        tuple: (FlatForest, ruta del archivo que identifica la versión cargada).
+    """
+    if os.path.isfile(os.path.join(artifact_path, METADATA_FILE)):
+        return load_artifact(artifact_path), os.path.join(artifact_path, METADATA_FILE)
+
+    model = load_model(pickle_path)
+    forest = FlatForest.from_sklearn(model)
+    feature_names = [str(f) for f in model.feature_names_in_]
+    forest.metadata = {
+        'feature_importances': {
+            'impurity': dict(zip(feature_names, map(float, model.feature_importances_)))
+        },
+        'category_levels': model_category_levels(model),
+        'training': {'impute_values': model_impute_values(model)},
+    }
+    return forest, pickle_path
+
+
+def _measure_load(kind, path):
+    """Medir en este proceso el tiempo de carga y el RSS añadido (en MB)."""
+    def rss_mb():
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+        return float('nan')
+
+    before = rss_mb()
+    start = time.perf_counter()
+    if kind == 'pickle':
+        model = load_model(path)
+    else:
+        model = load_artifact(path)
+    seconds = time.perf_counter() - start
+    print(json.dumps({'seconds': seconds, 'rss_mb': rss_mb() - before}))
+    return model
+
+
+def benchmark_load(pickle_path, artifact_path):
+    """
+    Comparar carga en frío del pickle y del artefacto, cada uno en un proceso nuevo.
+
+    Args:
+        pickle_path: Ruta del modelo .pkl.
+        artifact_path: Directorio del artefacto.
+
+    Returns:
+        dict: Tipo de carga -> {'seconds', 'rss_mb'}.
+    """
+    results = {}
+    for kind, path in [('pickle', pickle_path), ('artifact', artifact_path)]:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '_measure', kind, path],
+            capture_output=True, text=True, check=True
+        ).stdout
+        results[kind] = json.loads(output.strip().splitlines()[-1])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Artefactos del modelo de recomendación')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    export = sub.add_parser('export', help='Convertir un modelo .pkl en artefacto')
+    export.add_argument('--model', default=MODEL_PATH, help='Ruta del modelo .pkl')
+    export.add_argument('--out', default=MODEL_ARTIFACT_PATH, help='Directorio del artefacto')
+    export.add_argument('--version', default=None, help='Versión del artefacto')
+    export.add_argument('--metrics', default=None, help='JSON con métricas de entrenamiento')
+    export.add_argument('--data', default=None,
+                        help='CSV de reseñas para calcular importancias (impureza y permutación)')
+
+    info = sub.add_parser('info', help='Mostrar la cabecera de un artefacto')
+    info.add_argument('path', nargs='?', default=MODEL_ARTIFACT_PATH)
+
+    bench = sub.add_parser('bench', help='Comparar carga en frío pickle vs artefacto')
+    bench.add_argument('--model', default=MODEL_PATH)
+    bench.add_argument('--artifact', default=MODEL_ARTIFACT_PATH)
+
+    measure = sub.add_parser('_measure')
+    measure.add_argument('kind', choices=['pickle', 'artifact'])
+    measure.add_argument('path')
+
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        metrics = None
+        if args.metrics:
+            with open(args.metrics, encoding='utf-8') as f:
+                metrics = json.load(f)
+        model = load_model(args.model)
+        # Los niveles y las medianas de entrenamiento viajan con el artefacto: sin
+        # ellos la inferencia agruparía el nivel de referencia en 'Other' e
+        # imputaría con las medianas del archivo evaluado
+        extra = {'category_levels': model_category_levels(model),
+                 'training': {'impute_values': model_impute_values(model)}}
+        if args.data:
+            from ml_features import load_or_materialize
+            from ml_utils import split_train_test
+            from ml_importance import compute_feature_importances
+            features = load_or_materialize(args.data, feature_names=model.feature_names_in_,
+                                           category_levels=model_category_levels(model),
+                                           impute_values=model_impute_values(model))
+            X, y = features.frame(), features.target()
+            _, X_test, _, y_test = split_train_test(X, y)
+            extra['feature_importances'] = compute_feature_importances(model, X_test, y_test)
+        forest = FlatForest.from_sklearn(model)
+        metadata = save_artifact(forest, args.out, args.version, metrics, extra)
+        print(f"✅ Artefacto guardado en {args.out} (versión {metadata['version']})")
+    elif args.command == 'info':
+        print(json.dumps(read_metadata(args.path), indent=2, ensure_ascii=False))
+    elif args.command == 'bench':
+        for kind, stats in benchmark_load(args.model, args.artifact).items():
+            print(f"{kind:>9}: {stats['seconds'] * 1000:8.1f} ms | RSS +{stats['rss_mb']:.1f} MB")
+    else:
+        _measure_load(args.kind, args.path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Compactación del Random Forest de recomendación.
+
+Genera variantes reducidas del ensemble a partir del runtime NumPy, sin
+reentrenar:
+
+- Menos árboles: se conservan los primeros `n` (los árboles de un bosque son
+  intercambiables).
+- Profundidad máxima: los nodos a esa profundidad pasan a ser hojas con la
+  distribución de clases que ya tienen guardada.
+- Fusión de hojas duplicadas: un nodo cuyos dos hijos son hojas con el mismo
+  valor se convierte en hoja, repitiendo hasta que no quedan pares. No cambia
+  ninguna predicción.
+
+El test del notebook se divide en dos mitades estratificadas: en la de
+validación se mide para cada variante accuracy, ROC-AUC, tamaño del artefacto
+y latencia de una fila y por lotes, y se elige la variante más pequeña que no
+pierde más de `--tolerance` de ROC-AUC ni de accuracy. Las métricas que se
+guardan con el artefacto (y las del modelo completo para comparar) se miden en
+la otra mitad, que no interviene en la elección.
+
+Uso:
+    python ml_compact.py --data "ryanair_reviews (1).csv" --out ryanair_recommendation_model_compact
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from config import MODEL_PATH, MODEL_ARTIFACT_PATH, ML_RANDOM_STATE, ML_COMPACT_VALIDATION_SIZE
+from ml_runtime import FlatForest, _median_seconds
+from ml_artifact import save_artifact, load_forest
+
+# Variantes evaluadas por defecto: (árboles, profundidad máxima); None = sin cambio
+DEFAULT_ESTIMATORS = [None, 50, 25, 10]
+DEFAULT_DEPTHS = [None, 8, 6, 4]
+
+
+def _is_leaf(forest):
+    return forest.left == np.arange(len(forest.feature))
+
+
+def _rebuild(forest, leaf_mask, roots, value=None):
+    """
+    Reconstruir los arrays con los nodos alcanzables desde `roots`.
+
+    Args:
+        forest: FlatForest de origen.
+        leaf_mask: Nodos que se tratan como hojas (se cortan sus subárboles).
+        roots: Raíces de los árboles que se conservan.
+        value: Valores de nodo a usar (por defecto, los del bosque).
+
+    Returns:
+        FlatForest: Bosque compacto con índices renumerados.
+    """
+    value = forest.value if value is None else value
+    left, right = forest.left, forest.right
+    reachable, frontier, depth = [], np.asarray(roots), 0
+    while len(frontier):
+        reachable.append(frontier)
+        internal = frontier[~leaf_mask[frontier]]
+        frontier = np.concatenate([left[internal], right[internal]])
+        depth += 1
+    nodes = np.sort(np.concatenate(reachable))
+    node_leaf = leaf_mask[nodes]
+    new_ids = np.arange(len(nodes), dtype=np.int32)
+
+    new_left = np.where(node_leaf, new_ids, np.searchsorted(nodes, left[nodes])).astype(np.int32)
+    new_right = np.where(node_leaf, new_ids, np.searchsorted(nodes, right[nodes])).astype(np.int32)
+    weights = forest.node_weights
+    missing = forest.missing_go_to_left
+    return FlatForest(
+        feature=np.where(node_leaf, 0, forest.feature[nodes]).astype(np.int32),
+        threshold=np.asarray(forest.threshold[nodes], dtype=np.float64),
+        children=np.stack([new_right, new_left], axis=1).ravel(),
+        value=np.asarray(value[nodes], dtype=np.float64),
+        roots=np.searchsorted(nodes, roots).astype(np.int32),
+        max_depth=depth - 1,
+        feature_names=forest.feature_names_in_,
+        classes=forest.classes_,
+        node_weights=None if weights is None else np.asarray(weights[nodes], dtype=np.float64),
+        missing_go_to_left=None if missing is None else np.asarray(missing[nodes], dtype=np.uint8),
+    )
+
+
+def _node_depths(forest):
+    """Profundidad de cada nodo alcanzable (-1 para los no alcanzables)."""
+    depths = np.full(len(forest.feature), -1, dtype=np.int32)
+    leaf = _is_leaf(forest)
+    frontier, depth = np.asarray(forest.roots), 0
+    while len(frontier):
+        depths[frontier] = depth
+        internal = frontier[~leaf[frontier]]
+        frontier = np.concatenate([forest.left[internal], forest.right[internal]])
+        depth += 1
+    return depths
+
+
+def select_estimators(forest, n_estimators):
+    """
+    Conservar los primeros `n_estimators` árboles.
+
+    Args:
+        forest: FlatForest de origen.
+        n_estimators: Árboles a conservar.
+
+    Returns:
+        FlatForest: Bosque reducido.
+    """
+    return _rebuild(forest, _is_leaf(forest), forest.roots[:n_estimators])
+
+
+def cap_depth(forest, max_depth):
+    """
+    Limitar la profundidad convirtiendo en hojas los nodos a `max_depth`.
+
+    Args:
+        forest: FlatForest de origen.
+        max_depth: Profundidad máxima.
+
+    Returns:
+        FlatForest: Bosque podado.
+    """
+    leaf_mask = _is_leaf(forest) | (_node_depths(forest) >= max_depth)
+    return _rebuild(forest, leaf_mask, forest.roots)
+
+
+def merge_duplicate_leaves(forest):
+    """
+    Fusionar pares de hojas hermanas con el mismo valor, hasta un punto fijo.
+
+    Args:
+        forest: FlatForest de origen.
+
+    Returns:
+        FlatForest: Bosque equivalente con menos nodos.
+    """
+    leaf_mask = _is_leaf(forest).copy()
+    value = np.array(forest.value, dtype=np.float64)
+    left, right = forest.left, forest.right
+    while True:
+        internal = np.flatnonzero(~leaf_mask)
+        both_leaves = internal[leaf_mask[left[internal]] & leaf_mask[right[internal]]]
+        same = both_leaves[np.all(value[left[both_leaves]] == value[right[both_leaves]], axis=1)]
+        if not len(same):
+            break
+        value[same] = value[left[same]]
+        leaf_mask[same] = True
+    return _rebuild(forest, leaf_mask, forest.roots, value)
+
+
+def compact(forest, n_estimators=None, max_depth=None, merge_leaves=True):
+    """
+    Aplicar las reducciones en orden: árboles, profundidad y fusión de hojas.
+
+    Args:
+        forest: FlatForest de origen.
+        n_estimators: Árboles a conservar (None = todos).
+        max_depth: Profundidad máxima (None = sin límite).
+        merge_leaves: Fusionar hojas duplicadas.
+
+    Returns:
+        FlatForest: Variante compacta.
+    """
+    if n_estimators is not None and n_estimators < forest.n_estimators:
+        forest = select_estimators(forest, n_estimators)
+    if max_depth is not None and max_depth < forest.max_depth:
+        forest = cap_depth(forest, max_depth)
+    if merge_leaves:
+        forest = merge_duplicate_leaves(forest)
+    return forest
+
+
+def artifact_size(forest):
+    """Tamaño en bytes del artefacto que se escribiría para `forest`."""
+    path = tempfile.mkdtemp(prefix='compact-')
+    try:
+        save_artifact(forest, os.path.join(path, 'model'))
+        folder = os.path.join(path, 'model')
+        return sum(os.path.getsize(os.path.join(folder, f)) for f in os.listdir(folder))
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def evaluate_variants(forest, X_test, y_test, estimators=DEFAULT_ESTIMATORS, depths=DEFAULT_DEPTHS,
+                      repeats=50):
+    """
+    Evaluar todas las combinaciones de árboles y profundidad.
+
+    Args:
+        forest: FlatForest de origen.
+        X_test: Matriz de evaluación (validación) con las columnas del modelo.
+        y_test: Target de evaluación.
+        estimators: Valores de árboles a probar.
+        depths: Valores de profundidad máxima a probar.
+        repeats: Repeticiones por medición de latencia.
+
+    Returns:
+        tuple: (tabla de resultados, dict (árboles, profundidad) -> FlatForest).
+    """
+    from sklearn.metrics import accuracy_score, roc_auc_score
+
+    X_test = X_test[list(forest.feature_names_in_)]
+    row = X_test.iloc[:1]
+    positive = list(forest.classes_).index(1)
+    rows, variants = [], {}
+    for n_estimators in estimators:
+        for max_depth in depths:
+            variant = compact(forest, n_estimators, max_depth)
+            key = (variant.n_estimators, max_depth if max_depth is not None else forest.max_depth)
+            if key in variants:
+                continue
+            variants[key] = variant
+            classes, proba = variant.predict_with_proba(X_test)
+            batch_seconds = _median_seconds(lambda: variant.predict_with_proba(X_test), max(1, repeats // 10))
+            rows.append({
+                'Árboles': key[0],
+                'Profundidad': key[1],
+                'Nodos': len(variant.feature),
+                'Accuracy': accuracy_score(y_test, classes),
+                'ROC-AUC': roc_auc_score(y_test, proba[:, positive]),
+                'Tamaño (KB)': artifact_size(variant) / 1024,
+                'Latencia 1 fila (ms)': _median_seconds(lambda: variant.predict_with_proba(row), repeats) * 1000,
+                'Filas/s (lote)': len(X_test) / batch_seconds if batch_seconds > 0 else float('inf'),
+            })
+    return pd.DataFrame(rows), variants
+
+
+def split_validation(X_test, y_test, validation_size=ML_COMPACT_VALIDATION_SIZE):
+    """
+    Dividir el test en una parte de validación (elección) y otra reservada (métricas).
+
+    Args:
+        X_test: Matriz de test.
+        y_test: Target de test.
+        validation_size: Fracción destinada a validación.
+
+    Returns:
+        tuple: (X_val, X_holdout, y_val, y_holdout).
+    """
+    from sklearn.model_selection import train_test_split
+    return train_test_split(X_test, y_test, train_size=validation_size,
+                            random_state=ML_RANDOM_STATE, stratify=y_test)
+
+
+def choose_variant(table, tolerance):
+    """
+    Elegir la variante más pequeña dentro de la tolerancia respecto al original.
+
+    Args:
+        table: Tabla de `evaluate_variants` (la primera fila es el modelo completo).
+        tolerance: Pérdida máxima admitida de accuracy y de ROC-AUC.
+
+    Returns:
+        pd.Series: Fila de la variante elegida.
+    """
+    baseline = table.iloc[0]
+    eligible = table[(table['ROC-AUC'] >= baseline['ROC-AUC'] - tolerance)
+                     & (table['Accuracy'] >= baseline['Accuracy'] - tolerance)]
+    return eligible.sort_values(['Tamaño (KB)', 'Latencia 1 fila (ms)']).iloc[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compactación del Random Forest')
+    parser.add_argument('--artifact', default=MODEL_ARTIFACT_PATH, help='Artefacto de origen')
+    parser.add_argument('--model', default=MODEL_PATH, help='Modelo .pkl si no existe el artefacto')
+    parser.add_argument('--data', default=None, help='CSV de reseñas para evaluar (por defecto, DATA_PATHS)')
+    parser.add_argument('--out', default=f"{MODEL_ARTIFACT_PATH}_compact", help='Artefacto compacto de salida')
+    parser.add_argument('--tolerance', type=float, default=0.005,
+                        help='Pérdida máxima de accuracy y ROC-AUC frente al modelo completo')
+    parser.add_argument('--repeats', type=int, default=50, help='Repeticiones por medición de latencia')
+    args = parser.parse_args()
+
+    from ml_features import load_or_materialize
+    from ml_utils import split_train_test
+    from train_model import evaluate
+
+    forest, _ = load_forest(args.artifact, args.model)
+    features = load_or_materialize(args.data)
+    _, X_test, _, y_test = split_train_test(features.frame(), features.target())
+    X_val, X_holdout, y_val, y_holdout = split_validation(X_test, y_test)
+    X_holdout = X_holdout[list(forest.feature_names_in_)]
+
+    print(f"Elección sobre {len(X_val):,} filas de validación; métricas sobre {len(X_holdout):,} reservadas")
+    table, variants = evaluate_variants(forest, X_val, y_val, repeats=args.repeats)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(table.round(4).to_string(index=False))
+
+    chosen = choose_variant(table, args.tolerance)
+    key = (int(chosen['Árboles']), int(chosen['Profundidad']))
+    metadata = getattr(forest, 'metadata', {})
+    metrics = evaluate(variants[key], X_holdout, y_holdout)
+    baseline_metrics = evaluate(forest, X_holdout, y_holdout)
+    extra = {k: v for k, v in metadata.items() if k in ('feature_importances', 'training', 'category_levels')}
+    extra['compaction'] = {
+        'source_version': metadata.get('version'),
+        'n_estimators': key[0],
+        'max_depth': key[1],
+        'merged_leaves': True,
+        'tolerance': args.tolerance,
+        'validation_rows': len(X_val),
+        'holdout_rows': len(X_holdout),
+        'baseline_metrics': baseline_metrics,
+    }
+    saved = save_artifact(variants[key], args.out, metrics=metrics, extra=extra)
+    print(f"\n✅ Variante elegida: {key[0]} árboles, profundidad {key[1]} "
+          f"({chosen['Tamaño (KB)']:.0f} KB, ROC-AUC de validación {chosen['ROC-AUC']:.4f})")
+    print(f"   Test reservado: ROC-AUC {metrics['roc_auc']:.4f} (completo {baseline_metrics['roc_auc']:.4f}), "
+          f"accuracy {metrics['accuracy']:.4f} (completo {baseline_metrics['accuracy']:.4f})")
+    print(f"   Guardada en {args.out} (versión {saved['version']}); "
+          f"publícala con: python ml_registry.py register {args.out} --promote")
+
+
+if __name__ == "__main__":
+    main()
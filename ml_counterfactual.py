@@ -0,0 +1,206 @@
+"""
+Búsqueda de contrafactuales de cambio mínimo para el modelo de recomendación.
+
+Dada una combinación de aspectos que el modelo clasifica como detractor, busca
+el menor conjunto de mejoras en la rejilla de 0.5 puntos que lleva la
+probabilidad de recomendar por encima de un umbral. El criterio es
+lexicográfico: primero el menor número de aspectos modificados y después el
+menor número total de pasos de 0.5.
+
+La búsqueda es un branch-and-bound sobre los subconjuntos de aspectos
+modificados: antes de generar las mejoras de un subconjunto se acota la
+probabilidad máxima que el bosque puede dar en la caja de esas mejoras
+(`FlatForest.proba_upper_bound`) y, si la cota no supera el umbral, el
+subconjunto entero se descarta sin evaluarlo. Los candidatos restantes se
+evalúan por lotes vectorizados en orden creciente de coste; en cuanto un lote
+contiene una solución, los lotes de coste mayor no se evalúan.
+"""
+import time
+from itertools import combinations, product
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    SERVICE_ASPECTS, COUNTERFACTUAL_TIME_BUDGET, COUNTERFACTUAL_BATCH_SIZE
+)
+from ml_utils import RATING_GRID, align_features, model_category_levels
+
+
+def _candidates(base_idx, n_changed, keep=None):
+    """
+    Generar todas las mejoras que modifican exactamente `n_changed` aspectos.
+
+    Args:
+        base_idx: Posición actual de cada aspecto en RATING_GRID.
+        n_changed: Número de aspectos a mejorar.
+        keep: Función subconjunto -> bool; los subconjuntos descartados no
+            generan candidatos (opcional).
+
+    Returns:
+        tuple: (índices candidatos (n, 5), coste en pasos (n,), candidatos
+        descartados por `keep`).
+    """
+    max_idx = len(RATING_GRID) - 1
+    improvable = [i for i, idx in enumerate(base_idx) if idx < max_idx]
+    blocks, pruned = [], 0
+    for subset in combinations(improvable, n_changed):
+        if keep is not None and not keep(subset):
+            pruned += int(np.prod([max_idx - base_idx[i] for i in subset]))
+            continue
+        steps = np.array(list(product(*[range(1, max_idx - base_idx[i] + 1) for i in subset])))
+        block = np.repeat(base_idx[np.newaxis], len(steps), axis=0)
+        block[:, list(subset)] += steps
+        blocks.append(block)
+    if not blocks:
+        return np.empty((0, len(base_idx)), dtype=int), np.empty(0, dtype=int), pruned
+    candidates = np.vstack(blocks)
+    return candidates, (candidates - base_idx).sum(axis=1), pruned
+
+
+def make_scorer(model, traveller_type, probability_grid=None):
+    """
+    Crear la función de puntuación por índices de rejilla.
+
+    Usa la tabla precalculada si cubre el tipo de viajero y, si no, evalúa el
+    modelo sobre el lote completo.
+
+    Args:
+        model: Modelo con `feature_names_in_`, `classes_` y `predict_proba`.
+        traveller_type: Tipo de viajero.
+        probability_grid: ProbabilityGrid opcional.
+
+    Returns:
+        callable: Array (n, 5) de posiciones -> probabilidad de recomendar (n,).
+    """
+    positive = list(model.classes_).index(1)
+
+    if probability_grid is not None and traveller_type in probability_grid.traveller_types:
+        return lambda indices: probability_grid.lookup_indices(indices, traveller_type)[:, positive]
+
+    levels = model_category_levels(model)
+
+    def score(indices):
+        inputs = pd.DataFrame(RATING_GRID[indices], columns=SERVICE_ASPECTS)
+        inputs['Type Of Traveller'] = traveller_type
+        return model.predict_proba(align_features(inputs, model.feature_names_in_,
+                                                  category_levels=levels))[:, positive]
+    return score
+
+
+def make_bound(model, traveller_type, probability_grid=None):
+    """
+    Crear la cota superior de la probabilidad de recomendar en una caja de la rejilla.
+
+    Solo compensa cuando `make_scorer` evalúa el modelo: con la tabla
+    precalculada cada candidato es una lectura O(1) y recorrer el bosque para
+    la cota cuesta más que puntuar los candidatos que descarta.
+
+    Args:
+        model: Modelo aplanado (`FlatForest`); con otros modelos no hay cota.
+        traveller_type: Tipo de viajero.
+        probability_grid: ProbabilityGrid opcional (la de `make_scorer`).
+
+    Returns:
+        callable o None: (posiciones mínimas (5,), posiciones máximas (5,)) ->
+        cota de la probabilidad de recomendar para cualquier punto de la caja.
+    """
+    if not hasattr(model, 'proba_upper_bound'):
+        return None
+    if probability_grid is not None and traveller_type in probability_grid.traveller_types:
+        return None
+    positive = list(model.classes_).index(1)
+    inputs = pd.DataFrame([RATING_GRID[np.zeros(len(SERVICE_ASPECTS), dtype=int)]], columns=SERVICE_ASPECTS)
+    inputs['Type Of Traveller'] = traveller_type
+    template = align_features(inputs, model.feature_names_in_,
+                              category_levels=model_category_levels(model)).to_numpy()[0]
+    columns = list(model.feature_names_in_)
+    positions = [columns.index(aspect) for aspect in SERVICE_ASPECTS]
+
+    def bound(low_idx, high_idx):
+        low, high = template.copy(), template.copy()
+        low[positions], high[positions] = RATING_GRID[low_idx], RATING_GRID[high_idx]
+        return model.proba_upper_bound(low, high)[positive]
+    return bound
+
+
+def find_counterfactual(score_indices, aspect_values, threshold,
+                        time_budget=COUNTERFACTUAL_TIME_BUDGET,
+                        batch_size=COUNTERFACTUAL_BATCH_SIZE, bound=None):
+    """
+    Buscar las mejoras mínimas que superan `threshold`.
+
+    Args:
+        score_indices: Función que recibe un array (n, 5) de posiciones en
+            RATING_GRID y devuelve la probabilidad de recomendar (n,).
+        aspect_values: Valores actuales en el orden de SERVICE_ASPECTS.
+        threshold: Probabilidad a superar (0.5 para recomendar, 0.7 para promotor).
+        time_budget: Segundos máximos de búsqueda.
+        batch_size: Candidatos evaluados por lote.
+        bound: Cota de `make_bound` para descartar subconjuntos de aspectos
+            sin evaluarlos (opcional).
+
+    Returns:
+        dict o None: 'changes' (aspecto -> (actual, objetivo)), 'probability',
+        'steps', 'evaluated' (candidatos evaluados), 'pruned' (candidatos
+        descartados por la cota), 'seconds' y 'complete' (False si se agotó
+        el presupuesto de tiempo). None si no hay solución.
+    """
+    start = time.perf_counter()
+    step = RATING_GRID[1] - RATING_GRID[0]
+    base_idx = np.rint((np.asarray(aspect_values, dtype=float) - RATING_GRID[0]) / step).astype(int)
+    max_idx = len(RATING_GRID) - 1
+    evaluated = pruned = 0
+    complete = True
+
+    def reachable(subset):
+        # Caja de las mejoras del subconjunto: al menos un paso y como mucho el máximo
+        low, high = base_idx.copy(), base_idx.copy()
+        low[list(subset)] += 1
+        high[list(subset)] = max_idx
+        return bound(low, high) > threshold
+
+    for n_changed in range(1, len(base_idx) + 1):
+        candidates, costs, level_pruned = _candidates(base_idx, n_changed, reachable if bound else None)
+        pruned += level_pruned
+        order = np.argsort(costs, kind='stable')
+        candidates, costs = candidates[order], costs[order]
+
+        best = None
+        for begin in range(0, len(candidates), batch_size):
+            if best is not None and costs[begin] > best[2]:
+                break  # los lotes restantes no pueden mejorar el coste
+            if time.perf_counter() - start > time_budget:
+                complete = False
+                break
+            batch = candidates[begin:begin + batch_size]
+            proba = score_indices(batch)
+            evaluated += len(batch)
+
+            feasible = np.flatnonzero(proba > threshold)
+            if len(feasible):
+                batch_costs = costs[begin:begin + batch_size][feasible]
+                tied = feasible[batch_costs == batch_costs.min()]
+                winner = tied[np.argmax(proba[tied])]
+                cost = int(costs[begin + winner])
+                if best is None or cost < best[2] or (cost == best[2] and proba[winner] > best[1]):
+                    best = (batch[winner], float(proba[winner]), cost)
+
+        if best is not None:
+            target_idx, probability, cost = best
+            changes = {
+                SERVICE_ASPECTS[i]: (float(RATING_GRID[base_idx[i]]), float(RATING_GRID[target_idx[i]]))
+                for i in range(len(base_idx)) if target_idx[i] != base_idx[i]
+            }
+            return {
+                'changes': changes,
+                'probability': probability,
+                'steps': cost,
+                'evaluated': evaluated,
+                'pruned': pruned,
+                'seconds': time.perf_counter() - start,
+                'complete': complete,
+            }
+        if not complete:
+            break
+    return None
@@ -0,0 +1,289 @@
+"""
+Almacén de matrices de features del modelo de recomendación.
+
+Materializa una vez por versión del dataset la matriz de features codificada
+e imputada (aspectos + One-Hot) y el target, como archivos `.npy` que se leen
+con `mmap_mode='r'`. Entrenamiento, folds de validación cruzada, importancia
+por permutación y scoring por lotes leen la misma matriz sin volver a parsear
+el CSV ni copiarla en memoria.
+
+El almacén de entrenamiento (`feature_store/<versión>/`) codifica las
+variables categóricas con los niveles del propio CSV. Para evaluar un modelo
+ya entrenado (`batch_predict.py --use-store`) se materializa aparte con las
+columnas, niveles y medianas de imputación del modelo, en
+`feature_store/<versión>-<codificación>/`, de modo que un país que el modelo
+agrupa en 'Other' no recibe columna propia aunque esté en el top del CSV
+evaluado, y los aspectos nulos se rellenan como al entrenar.
+
+Estructura de `feature_store/<clave>/`:
+    metadata.json   Columnas, medianas de imputación, niveles de las variables
+                    categóricas y número de filas etiquetadas.
+    X.npy           Matriz float64 (n_filas, n_features). Las filas etiquetadas
+                    van primero, de modo que `X[:n_labeled]` es una vista.
+    y.npy           Target (int8) de las filas etiquetadas.
+    row_index.npy   Posición de cada fila en el CSV original.
+
+Uso:
+    python ml_features.py "ryanair_reviews (1).csv"
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from config import FEATURE_STORE_DIR
+from ml_utils import build_training_frame, align_features
+from analytics import resolve_data_path, load_reviews
+
+METADATA_FILE = 'metadata.json'
+
+
+def dataset_version(path, block_size=1 << 20):
+    """
+    Identificar la versión de un CSV por el hash de su contenido.
+
+    Args:
+        path: Ruta del CSV.
+        block_size: Bytes leídos por bloque.
+
+    Returns:
+        str: Primeros 16 caracteres del SHA-256 del archivo.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def encoding_key(feature_names, category_levels, impute_values=None):
+    """
+    Identificar una codificación fija de features (la de un modelo entrenado).
+
+    Args:
+        feature_names: Columnas del modelo.
+        category_levels: Niveles de cada variable categórica del modelo.
+        impute_values: Medianas de imputación del modelo (opcional).
+
+    Returns:
+        str: Primeros 12 caracteres del SHA-256 de columnas, niveles y medianas.
+    """
+    encoding = {'feature_names': [str(f) for f in feature_names], 'category_levels': category_levels}
+    if impute_values is not None:
+        encoding['impute_values'] = {k: float(v) for k, v in impute_values.items()}
+    payload = json.dumps(encoding, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:12]
+
+
+class FeatureSet:
+    """
+    Matriz de features materializada de una versión del dataset.
+
+    Attributes:
+        X: Matriz (n_filas, n_features); memory-mapped si se cargó del almacén.
+        y: Target de las primeras `n_labeled` filas.
+        feature_names: Nombres de las columnas.
+        impute_values: Medianas usadas para imputar cada aspecto.
+        category_levels: Niveles de cada variable categórica (incluido el de
+            referencia que `drop_first` deja sin columna).
+        row_index: Posición de cada fila en el CSV original.
+        version: Clave en el almacén: versión del dataset y, si se codificó
+            con las columnas de un modelo, la de esa codificación.
+    """
+
+    def __init__(self, X, y, feature_names, impute_values, row_index, version, category_levels=None):
+        self.X = X
+        self.y = y
+        self.feature_names = list(feature_names)
+        self.impute_values = impute_values
+        self.category_levels = category_levels
+        self.row_index = row_index
+        self.version = version
+
+    @property
+    def n_labeled(self):
+        return len(self.y)
+
+    def frame(self, labeled=True):
+        """
+        Ver la matriz como DataFrame sin copiarla.
+
+        Args:
+            labeled: Solo filas etiquetadas (True), solo sin etiquetar (False)
+                o todas (None).
+
+        Returns:
+            pd.DataFrame: Vista indexada por la posición en el CSV original.
+        """
+        rows = {True: slice(0, self.n_labeled), False: slice(self.n_labeled, None),
+                None: slice(None)}[labeled]
+        return pd.DataFrame(self.X[rows], columns=self.feature_names,
+                            index=pd.Index(self.row_index[rows], name='row'), copy=False)
+
+    def target(self):
+        """Target de las filas etiquetadas como Serie alineada con `frame()`."""
+        return pd.Series(self.y, index=pd.Index(self.row_index[:self.n_labeled], name='row'),
+                         name='Recommended_bool', copy=False)
+
+
+def build_feature_set(df, version=None, feature_names=None, category_levels=None,
+                      impute_values=None):
+    """
+    Codificar e imputar todas las filas del dataset.
+
+    Las filas etiquetadas se construyen exactamente como en el notebook
+    (`build_training_frame`); las demás se alinean con esas columnas y
+    medianas, igual que en la inferencia. Con `feature_names` y
+    `category_levels` (los de un modelo) todas las filas se alinean con esa
+    codificación en lugar de la derivada del CSV, imputando con
+    `impute_values` si se indican.
+
+    Args:
+        df: DataFrame con las derivaciones de `analytics.load_reviews`.
+        version: Clave del almacén.
+        feature_names: Columnas de un modelo entrenado (opcional).
+        category_levels: Niveles categóricos de ese modelo (opcional).
+        impute_values: Medianas de entrenamiento de ese modelo (opcional;
+            por defecto, las del CSV).
+
+    Returns:
+        FeatureSet: Matriz en memoria.
+    """
+    X_labeled, y, csv_impute_values, training_levels = build_training_frame(df)
+    if feature_names is None or category_levels is None or impute_values is None:
+        impute_values = csv_impute_values
+    if feature_names is not None and category_levels is not None:
+        X_labeled = align_features(df.loc[X_labeled.index], feature_names, impute_values, category_levels)
+    else:
+        category_levels = training_levels
+    unlabeled = df[df['Recommended_bool'].isna()]
+    X_unlabeled = align_features(unlabeled, X_labeled.columns, impute_values, category_levels)
+
+    positions = pd.Series(np.arange(len(df)), index=df.index)
+    row_index = np.concatenate([positions[X_labeled.index].to_numpy(),
+                                positions[X_unlabeled.index].to_numpy()])
+    X = np.vstack([X_labeled.to_numpy(np.float64), X_unlabeled.to_numpy(np.float64)])
+    return FeatureSet(X, y.to_numpy(np.int8), X_labeled.columns, impute_values, row_index, version,
+                      category_levels)
+
+
+def save_feature_set(features, store_dir=FEATURE_STORE_DIR):
+    """
+    Guardar un FeatureSet en `store_dir/<versión>` de forma atómica.
+
+    Args:
+        features: FeatureSet con `version`.
+        store_dir: Directorio raíz del almacén.
+
+    Returns:
+        str: Directorio escrito.
+    """
+    path = os.path.join(store_dir, features.version)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, 'X.npy'), np.ascontiguousarray(features.X))
+    np.save(os.path.join(tmp_path, 'y.npy'), features.y)
+    np.save(os.path.join(tmp_path, 'row_index.npy'), features.row_index)
+    with open(os.path.join(tmp_path, METADATA_FILE), 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': features.version,
+            'feature_names': features.feature_names,
+            'impute_values': {k: float(v) for k, v in features.impute_values.items()},
+            'category_levels': features.category_levels,
+            'n_rows': int(len(features.X)),
+            'n_labeled': int(features.n_labeled),
+        }, f, indent=2, ensure_ascii=False)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_feature_set(version, store_dir=FEATURE_STORE_DIR, mmap=True):
+    """
+    Cargar una versión materializada del almacén.
+
+    Args:
+        version: Versión del dataset.
+        store_dir: Directorio raíz del almacén.
+        mmap: Mapear los arrays en memoria en modo solo lectura.
+
+    Returns:
+        FeatureSet o None si la versión no está materializada.
+    """
+    path = os.path.join(store_dir, version)
+    if not os.path.isfile(os.path.join(path, METADATA_FILE)):
+        return None
+    with open(os.path.join(path, METADATA_FILE), encoding='utf-8') as f:
+        metadata = json.load(f)
+    mmap_mode = 'r' if mmap else None
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+              for name in ['X', 'y', 'row_index']}
+    return FeatureSet(arrays['X'], arrays['y'], metadata['feature_names'],
+                      metadata['impute_values'], arrays['row_index'], version,
+                      metadata.get('category_levels'))
+
+
+def load_or_materialize(data_path=None, store_dir=FEATURE_STORE_DIR, feature_names=None,
+                        category_levels=None, impute_values=None):
+    """
+    Obtener la matriz de features de un CSV, materializándola si hace falta.
+
+    Args:
+        data_path: CSV de reseñas (por defecto, las rutas de `DATA_PATHS`).
+        store_dir: Directorio raíz del almacén.
+        feature_names: Columnas de un modelo entrenado; con `category_levels`,
+            la matriz se codifica como en su entrenamiento y se guarda con
+            una clave propia.
+        category_levels: Niveles categóricos de ese modelo
+            (`ml_utils.model_category_levels`).
+        impute_values: Medianas de entrenamiento de ese modelo
+            (`ml_utils.model_impute_values`); sin ellas se imputa con las del CSV.
+
+    Returns:
+        FeatureSet: Matriz memory-mapped de la versión del CSV.
+
+    Raises:
+        FileNotFoundError: Si no se encuentra el CSV de reseñas.
+        analytics.DataLoadError: Si el CSV no se puede leer o le faltan columnas.
+    """
+    path = resolve_data_path(data_path)
+    if path is None:
+        raise FileNotFoundError("No se encontró el CSV de reseñas")
+
+    version = dataset_version(path)
+    if feature_names is None or category_levels is None:
+        feature_names = category_levels = impute_values = None
+    else:
+        version = f"{version}-{encoding_key(feature_names, category_levels, impute_values)}"
+    features = load_feature_set(version, store_dir)
+    # Los almacenes anteriores no guardaban los niveles categóricos: se rematerializan
+    if features is None or features.category_levels is None:
+        df = load_reviews(path)
+        if df is None:
+            raise FileNotFoundError(f"No se pudo leer {path}")
+        save_feature_set(build_feature_set(df, version, feature_names, category_levels, impute_values),
+                         store_dir)
+        features = load_feature_set(version, store_dir)
+    return features
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Materializar la matriz de features del dataset')
+    parser.add_argument('data', nargs='?', default=None, help='CSV de reseñas (por defecto, DATA_PATHS)')
+    parser.add_argument('--store', default=FEATURE_STORE_DIR, help='Directorio del almacén')
+    args = parser.parse_args()
+
+    features = load_or_materialize(args.data, args.store)
+    print(f"✅ Versión {features.version}: {len(features.X):,} filas x {len(features.feature_names)} "
+          f"features ({features.n_labeled:,} etiquetadas) en {os.path.join(args.store, features.version)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Importancia de variables del modelo de recomendación.
+
+Calcula la importancia por impureza del Random Forest y la importancia por
+permutación sobre el conjunto de test, evaluando en paralelo todas las
+combinaciones (feature, repetición). El resultado se guarda en los metadatos
+del artefacto para que la app lo muestre sin coste por petición.
+"""
+import numpy as np
+
+from config import (
+    PERMUTATION_REPEATS, ML_RANDOM_STATE, SERVICE_ASPECTS, ML_CATEGORICAL_FEATURES
+)
+from ml_runtime import FlatForest
+
+
+def _permuted_score(model, X, y, column, seed, scorer):
+    """Puntuación del modelo con la columna `column` permutada."""
+    X_permuted = X.copy()
+    rng = np.random.default_rng(seed)
+    X_permuted[:, column] = X_permuted[rng.permutation(len(X_permuted)), column]
+    return scorer(y, model.predict_proba(X_permuted)[:, 1])
+
+
+def permutation_importance(model, X, y, n_repeats=PERMUTATION_REPEATS, n_jobs=-1,
+                           random_state=ML_RANDOM_STATE):
+    """
+    Importancia por permutación medida como caída de ROC-AUC.
+
+    Cada par (feature, repetición) es una tarea independiente que se reparte
+    entre procesos con joblib.
+
+    Args:
+        model: Modelo con `predict_proba` (sklearn o FlatForest).
+        X: Matriz de features de test.
+        y: Target de test.
+        n_repeats: Repeticiones por feature.
+        n_jobs: Procesos en paralelo (-1 = todos los cores).
+        random_state: Semilla base.
+
+    Returns:
+        tuple: (media, desviación estándar) de la caída de ROC-AUC por feature.
+    """
+    from joblib import Parallel, delayed
+    from sklearn.metrics import roc_auc_score
+
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    baseline = roc_auc_score(y, model.predict_proba(X)[:, 1])
+
+    n_features = X.shape[1]
+    tasks = [(column, random_state + column * n_repeats + repeat)
+             for column in range(n_features) for repeat in range(n_repeats)]
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(_permuted_score)(model, X, y, column, seed, roc_auc_score)
+        for column, seed in tasks
+    )
+    drops = baseline - np.asarray(scores).reshape(n_features, n_repeats)
+    return drops.mean(axis=1), drops.std(axis=1)
+
+
+def compute_feature_importances(model, X_test, y_test, n_repeats=PERMUTATION_REPEATS, n_jobs=-1):
+    """
+    Calcular importancia por impureza y por permutación.
+
+    Args:
+        model: RandomForestClassifier entrenado (aporta `feature_importances_`).
+        X_test: DataFrame de test con las columnas del modelo.
+        y_test: Target de test.
+        n_repeats: Repeticiones de la permutación.
+        n_jobs: Procesos en paralelo.
+
+    Returns:
+        dict: Importancias por feature, listo para guardarse en los metadatos.
+    """
+    feature_names = [str(f) for f in model.feature_names_in_]
+    X_test = X_test.reindex(columns=feature_names, fill_value=0)
+    mean, std = permutation_importance(FlatForest.from_sklearn(model), X_test, y_test,
+                                       n_repeats=n_repeats, n_jobs=n_jobs)
+    return {
+        'impurity': dict(zip(feature_names, map(float, model.feature_importances_))),
+        'permutation_mean': dict(zip(feature_names, map(float, mean))),
+        'permutation_std': dict(zip(feature_names, map(float, std))),
+        'permutation_scoring': 'roc_auc',
+        'permutation_repeats': n_repeats,
+        'n_test_samples': int(len(X_test)),
+    }
+
+
+def aspect_importances(importances, kind='impurity'):
+    """
+    Agrupar las importancias por aspecto del servicio.
+
+    Las columnas One-Hot de cada variable categórica se suman bajo el nombre
+    de la variable original.
+
+    Args:
+        importances: Dict con las importancias calculadas por
+            `compute_feature_importances`.
+        kind: 'impurity' o 'permutation_mean'.
+
+    Returns:
+        dict: Variable -> importancia, ordenado de mayor a menor.
+    """
+    grouped = {}
+    for feature, value in importances.get(kind, {}).items():
+        name = next((c for c in ML_CATEGORICAL_FEATURES if feature.startswith(f"{c}_")), feature)
+        if name in SERVICE_ASPECTS or name in ML_CATEGORICAL_FEATURES:
+            grouped[name] = grouped.get(name, 0.0) + value
+    return dict(sorted(grouped.items(), key=lambda item: item[1], reverse=True))
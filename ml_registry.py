@@ -0,0 +1,254 @@
+"""
+Registro local de versiones del modelo de recomendación.
+
+Estructura de `model_registry/`:
+    <versión>/      Artefacto del modelo (ver ml_artifact.py) con sus métricas.
+                    Inmutable: una versión registrada no se reescribe nunca.
+    PROMOTED        Versión activa. Se reescribe de forma atómica con `promote`.
+
+`ModelHolder` mantiene el modelo activo de la app: en cada ejecución consulta
+el puntero PROMOTED (un `os.stat`) y, si ha cambiado, carga la nueva versión en
+un hilo en segundo plano y la sustituye con una única asignación. Cada sesión
+toma una instantánea del modelo al empezar, así que las peticiones en curso
+terminan con la versión con la que empezaron.
+
+Uso:
+    python ml_registry.py register ryanair_recommendation_model --promote
+    python ml_registry.py list
+    python ml_registry.py promote 20260301120000
+"""
+import argparse
+import os
+import shutil
+import threading
+from collections import namedtuple
+
+from config import MODEL_PATH, MODEL_ARTIFACT_PATH, MODEL_REGISTRY_DIR
+from ml_artifact import METADATA_FILE, read_metadata, load_artifact, load_forest
+from ml_utils import ProbabilityGrid
+
+PROMOTED_FILE = 'PROMOTED'
+TMP_MARKER = '.tmp-'
+
+# Modelo activo: el runtime, su tabla de probabilidades, la ruta que lo identifica y su versión
+ActiveModel = namedtuple('ActiveModel', ['model', 'grid', 'source', 'version'])
+
+
+def list_versions(registry_dir=MODEL_REGISTRY_DIR):
+    """
+    Listar las versiones registradas.
+
+    Args:
+        registry_dir: Directorio del registro.
+
+    Returns:
+        list: Metadatos de cada versión, de la más antigua a la más reciente.
+    """
+    if not os.path.isdir(registry_dir):
+        return []
+    versions = [
+        read_metadata(os.path.join(registry_dir, name))
+        for name in os.listdir(registry_dir)
+        if TMP_MARKER not in name and os.path.isfile(os.path.join(registry_dir, name, METADATA_FILE))
+    ]
+    return sorted(versions, key=lambda metadata: str(metadata['version']))
+
+
+def register(artifact_path, registry_dir=MODEL_REGISTRY_DIR):
+    """
+    Copiar un artefacto al registro bajo su versión.
+
+    La copia se hace en un directorio temporal que se renombra al final. Las
+    versiones son inmutables: si la versión ya existe no se toca, para que
+    ningún lector (ni el puntero PROMOTED) vea nunca un directorio a medias.
+
+    Args:
+        artifact_path: Directorio del artefacto (con metadata.json).
+        registry_dir: Directorio del registro.
+
+    Returns:
+        str: Versión registrada.
+
+    Raises:
+        ValueError: Si la versión ya está en el registro.
+    """
+    version = str(read_metadata(artifact_path)['version'])
+    target = os.path.join(registry_dir, version)
+    if os.path.exists(target):
+        raise ValueError(f"La versión {version} ya está en el registro")
+    tmp_path = f"{target}{TMP_MARKER}{os.getpid()}"
+    os.makedirs(registry_dir, exist_ok=True)
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    shutil.copytree(artifact_path, tmp_path)
+    try:
+        # rename no sustituye un directorio con contenido: si otro proceso ha
+        # registrado la misma versión entretanto, se conserva la suya
+        os.rename(tmp_path, target)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        if os.path.exists(target):
+            raise ValueError(f"La versión {version} ya está en el registro")
+        raise
+    return version
+
+
+def promote(version, registry_dir=MODEL_REGISTRY_DIR):
+    """
+    Marcar una versión como activa.
+
+    Args:
+        version: Versión registrada.
+        registry_dir: Directorio del registro.
+
+    Raises:
+        ValueError: Si la versión no está en el registro.
+    """
+    version = str(version)
+    if not os.path.isfile(os.path.join(registry_dir, version, METADATA_FILE)):
+        raise ValueError(f"La versión {version} no está en el registro")
+    pointer = os.path.join(registry_dir, PROMOTED_FILE)
+    tmp_pointer = f"{pointer}.tmp-{os.getpid()}"
+    with open(tmp_pointer, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(tmp_pointer, pointer)
+
+
+def promoted_version(registry_dir=MODEL_REGISTRY_DIR):
+    """
+    Leer la versión activa.
+
+    Args:
+        registry_dir: Directorio del registro.
+
+    Returns:
+        str o None: Versión promovida, o None si no hay ninguna.
+    """
+    try:
+        with open(os.path.join(registry_dir, PROMOTED_FILE), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_active(registry_dir=MODEL_REGISTRY_DIR, artifact_path=MODEL_ARTIFACT_PATH,
+                pickle_path=MODEL_PATH):
+    """
+    Cargar la versión promovida o, si el registro está vacío, el modelo local.
+
+    Args:
+        registry_dir: Directorio del registro.
+        artifact_path: Artefacto usado si no hay versión promovida.
+        pickle_path: Pickle usado si tampoco existe el artefacto.
+
+    Returns:
+        ActiveModel: Modelo cargado con su tabla de probabilidades.
+    """
+    version = promoted_version(registry_dir)
+    if version is not None:
+        path = os.path.join(registry_dir, version)
+        model, source = load_artifact(path), os.path.join(path, METADATA_FILE)
+    else:
+        model, source = load_forest(artifact_path, pickle_path)
+        version = model.metadata.get('version')
+    return ActiveModel(model, ProbabilityGrid.load_or_build(model, source), source, version)
+
+
+class ModelHolder:
+    """
+    Modelo activo compartido por todas las sesiones, con sustitución en caliente.
+
+    Attributes:
+        current: ActiveModel en uso. Se reemplaza con una única asignación.
+        error: Último error al cargar una versión nueva (o None).
+    """
+
+    def __init__(self, registry_dir=MODEL_REGISTRY_DIR, artifact_path=MODEL_ARTIFACT_PATH,
+                 pickle_path=MODEL_PATH):
+        self.registry_dir = registry_dir
+        self.artifact_path = artifact_path
+        self.pickle_path = pickle_path
+        self.current = load_active(registry_dir, artifact_path, pickle_path)
+        self.error = None
+        self._pointer_stamp = self._stamp()
+        self._lock = threading.Lock()
+        self._loading = None
+
+    def _stamp(self):
+        try:
+            stat = os.stat(os.path.join(self.registry_dir, PROMOTED_FILE))
+            return stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+
+    def refresh(self):
+        """
+        Comprobar el puntero PROMOTED y, si cambió, cargar la versión en segundo plano.
+
+        Returns:
+            bool: True si hay una carga en curso.
+        """
+        stamp = self._stamp()
+        with self._lock:
+            if self._loading is not None and self._loading.is_alive():
+                return True
+            if stamp == self._pointer_stamp:
+                return False
+            self._pointer_stamp = stamp
+            self._loading = threading.Thread(target=self._swap, daemon=True)
+            self._loading.start()
+            return True
+
+    def _swap(self):
+        try:
+            candidate = load_active(self.registry_dir, self.artifact_path, self.pickle_path)
+        except Exception as e:
+            self.error = e
+            return
+        self.error = None
+        if candidate.version != self.current.version:
+            self.current = candidate
+
+    def wait(self, timeout=None):
+        """Esperar a que termine la carga en curso (si la hay)."""
+        loading = self._loading
+        if loading is not None:
+            loading.join(timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Registro de versiones del modelo')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    reg = sub.add_parser('register', help='Añadir un artefacto al registro')
+    reg.add_argument('artifact', nargs='?', default=MODEL_ARTIFACT_PATH)
+    reg.add_argument('--promote', action='store_true', help='Promover la versión registrada')
+
+    sub.add_parser('list', help='Listar las versiones registradas')
+
+    prom = sub.add_parser('promote', help='Activar una versión registrada')
+    prom.add_argument('version')
+
+    for command in sub.choices.values():
+        command.add_argument('--registry', default=MODEL_REGISTRY_DIR, help='Directorio del registro')
+    args = parser.parse_args()
+
+    if args.command == 'register':
+        version = register(args.artifact, args.registry)
+        print(f"✅ Versión {version} registrada en {args.registry}")
+        if args.promote:
+            promote(version, args.registry)
+            print(f"✅ Versión {version} promovida")
+    elif args.command == 'list':
+        active = promoted_version(args.registry)
+        for metadata in list_versions(args.registry):
+            metrics = metadata.get('metrics', {})
+            marker = '*' if str(metadata['version']) == active else ' '
+            print(f"{marker} {metadata['version']}  accuracy={metrics.get('accuracy', float('nan')):.4f}  "
+                  f"roc_auc={metrics.get('roc_auc', float('nan')):.4f}  {metadata.get('created_at', '')}")
+    else:
+        promote(args.version, args.registry)
+        print(f"✅ Versión {args.version} promovida")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+Runtime NumPy para inferencia rápida del Random Forest de recomendación.
+
+Aplana los árboles de un `RandomForestClassifier` entrenado en arrays
+contiguos (feature, threshold, hijos y valores de nodo) y evalúa el ensemble
+completo por lotes en una sola pasada, devolviendo clase y probabilidad sin la
+validación de entrada de sklearn.
+
+Uso (verificación y benchmark):
+    python ml_runtime.py --model ryanair_recommendation_model.pkl
+"""
+import argparse
+import copy
+import time
+
+import numpy as np
+import pandas as pd
+
+
+class FlatForest:
+    """
+    Ensemble de árboles aplanado en arrays NumPy.
+
+    Los nodos de todos los árboles se concatenan en arrays globales; los hijos
+    se guardan intercalados (`children[2*nodo]` derecho, `children[2*nodo + 1]`
+    izquierdo) y las hojas apuntan a sí mismas para que el recorrido sea un
+    bucle de `max_depth` pasos sin ramas. Expone `feature_names_in_`,
+    `classes_`, `predict` y `predict_proba` como el modelo de sklearn.
+
+    `node_weights` (peso de las muestras de entrenamiento en cada nodo) solo
+    es necesario para las explicaciones TreeSHAP (ver `ml_explain.py`).
+
+    `missing_go_to_left` indica por nodo hacia qué hijo van los valores NaN,
+    como `tree_.missing_go_to_left` en sklearn >= 1.3. Si no está disponible
+    (modelos o artefactos antiguos), los NaN van siempre a la derecha.
+    """
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth,
+                 feature_names, classes, node_weights=None, missing_go_to_left=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.node_weights = node_weights
+        self.missing_go_to_left = missing_go_to_left
+        self.max_depth = int(max_depth)
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.classes_ = np.asarray(classes)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """
+        Exportar un `RandomForestClassifier` entrenado.
+
+        Los valores de nodo se normalizan igual que `DecisionTreeClassifier.predict_proba`
+        para que las probabilidades coincidan bit a bit con sklearn.
+
+        Args:
+            model: RandomForestClassifier entrenado con una sola salida.
+
+        Returns:
+            FlatForest: Ensemble aplanado.
+        """
+        if getattr(model, 'n_outputs_', 1) != 1:
+            raise ValueError("Solo se soportan modelos con una única salida")
+
+        features, thresholds, children, values, weights, roots = [], [], [], [], [], []
+        missing = []
+        max_depth = 0
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(offset, offset + n_nodes, dtype=np.int32)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            left = np.where(is_leaf, node_ids, tree.children_left + offset)
+            right = np.where(is_leaf, node_ids, tree.children_right + offset)
+            children.append(np.stack([right, left], axis=1).ravel().astype(np.int32))
+
+            value = tree.value[:, 0, :model.n_classes_].astype(np.float64)
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+            weights.append(tree.weighted_n_node_samples.astype(np.float64))
+            if hasattr(tree, 'missing_go_to_left'):
+                missing.append(np.asarray(tree.missing_go_to_left, dtype=np.uint8))
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            children=np.concatenate(children),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            feature_names=model.feature_names_in_,
+            classes=model.classes_,
+            node_weights=np.concatenate(weights),
+            missing_go_to_left=np.concatenate(missing) if missing else None
+        )
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @property
+    def left(self):
+        return self.children[1::2]
+
+    @property
+    def right(self):
+        return self.children[0::2]
+
+    def _as_array(self, X):
+        """Convertir la entrada a float32 (como sklearn) respetando el orden de columnas."""
+        if isinstance(X, pd.DataFrame):
+            X = X[list(self.feature_names_in_)]
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return X
+
+    def goes_left(self, x, nodes):
+        """
+        Decidir en qué dirección sigue cada valor en los nodos indicados.
+
+        Args:
+            x: Valores de la feature de cada nodo.
+            nodes: Índices globales de nodo (mismo shape que `x`, o escalar).
+
+        Returns:
+            np.ndarray: True donde el valor va al hijo izquierdo.
+        """
+        go_left = x <= np.take(self.threshold, nodes)
+        if self.missing_go_to_left is not None:
+            go_left |= np.isnan(x) & np.take(self.missing_go_to_left, nodes).astype(bool)
+        return go_left
+
+    def apply(self, X, chunk_size=1024):
+        """
+        Obtener la hoja alcanzada en cada árbol.
+
+        Se procesa por bloques de filas para que los índices de nodo quepan en
+        caché; cada nivel del recorrido es un único gather sobre los hijos. Los
+        bloques sin NaN se saltan la comprobación de valores ausentes.
+
+        Args:
+            X: Matriz de features (n_muestras, n_features).
+            chunk_size: Filas por bloque.
+
+        Returns:
+            np.ndarray: Índices globales de hoja (n_muestras, n_árboles).
+        """
+        X = self._as_array(X)
+        n_samples, n_features = X.shape
+        leaves = np.empty((n_samples, self.n_estimators), dtype=np.int32)
+        for start in range(0, n_samples, chunk_size):
+            block = X[start:start + chunk_size]
+            x_flat = block.ravel()
+            row_offsets = (np.arange(len(block), dtype=np.int32) * n_features)[:, np.newaxis]
+            nodes = np.broadcast_to(self.roots, (len(block), self.n_estimators)).copy()
+            has_missing = self.missing_go_to_left is not None and np.isnan(x_flat).any()
+            for _ in range(self.max_depth):
+                x = np.take(x_flat, row_offsets + np.take(self.feature, nodes))
+                if has_missing:
+                    go_left = self.goes_left(x, nodes)
+                else:
+                    go_left = x <= np.take(self.threshold, nodes)
+                nodes = np.take(self.children, 2 * nodes + go_left)
+            leaves[start:start + len(block)] = nodes
+        return leaves
+
+    def proba_upper_bound(self, low, high):
+        """
+        Cota superior de la probabilidad de cada clase en una caja de entradas.
+
+        En cada árbol se recorren todas las ramas compatibles con algún punto
+        de la caja [low, high] y se toma el mayor valor de hoja; la media de
+        esos máximos acota `predict_proba` para cualquier entrada de la caja.
+
+        Args:
+            low: Valor mínimo de cada feature (n_features,).
+            high: Valor máximo de cada feature (n_features,).
+
+        Returns:
+            np.ndarray: Cota por clase (n_clases,).
+        """
+        low = self._as_array(low)[0]
+        high = self._as_array(high)[0]
+        best = np.zeros((self.n_estimators, self.value.shape[1]))
+        nodes, trees = np.asarray(self.roots), np.arange(self.n_estimators)
+        while len(nodes):
+            leaf = self.left[nodes] == nodes
+            np.maximum.at(best, trees[leaf], self.value[nodes[leaf]])
+            nodes, trees = nodes[~leaf], trees[~leaf]
+            feature, threshold = self.feature[nodes], self.threshold[nodes]
+            go_left, go_right = low[feature] <= threshold, high[feature] > threshold
+            nodes = np.concatenate([self.left[nodes][go_left], self.right[nodes][go_right]])
+            trees = np.concatenate([trees[go_left], trees[go_right]])
+        return best.sum(axis=0) / self.n_estimators
+
+    def predict_proba(self, X):
+        """
+        Probabilidad por clase promediada sobre todos los árboles.
+
+        La suma se acumula árbol a árbol en el mismo orden que sklearn.
+
+        Args:
+            X: Matriz de features (n_muestras, n_features).
+
+        Returns:
+            np.ndarray: Probabilidades (n_muestras, n_clases).
+        """
+        leaves = self.apply(X)
+        total = np.stack([
+            np.add.accumulate(np.take(self.value[:, c], leaves), axis=1)[:, -1]
+            for c in range(self.value.shape[1])
+        ], axis=1)
+        return total / self.n_estimators
+
+    def predict_with_proba(self, X):
+        """
+        Clase predicha y probabilidades en una sola pasada por el ensemble.
+
+        Args:
+            X: Matriz de features (n_muestras, n_features).
+
+        Returns:
+            tuple: (clases predichas, probabilidades por clase).
+        """
+        proba = self.predict_proba(X)
+        return self.classes_[proba.argmax(axis=1)], proba
+
+    def predict(self, X):
+        """Clase predicha para cada muestra."""
+        return self.predict_with_proba(X)[0]
+
+
+def verify_against_sklearn(model, forest, X):
+    """
+    Comprobar que el runtime reproduce exactamente a sklearn.
+
+    sklearn reparte los árboles entre hilos cuando `n_jobs != 1` y el orden de
+    la suma de probabilidades deja de ser determinista, así que la referencia
+    se calcula con una copia del modelo con `n_jobs=1`.
+
+    Args:
+        model: RandomForestClassifier original.
+        forest: FlatForest exportado desde `model`.
+        X: DataFrame de prueba con las columnas del modelo.
+
+    Returns:
+        bool: True si probabilidades y clases coinciden bit a bit.
+    """
+    reference = copy.copy(model)
+    reference.n_jobs = 1
+    expected = reference.predict_proba(X)
+    classes, proba = forest.predict_with_proba(X)
+    return np.array_equal(expected, proba) and np.array_equal(reference.predict(X), classes)
+
+
+def _median_seconds(fn, repeats):
+    """Mediana de tiempo de `repeats` ejecuciones de `fn`."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def benchmark(model, forest, X, repeats=50):
+    """
+    Medir latencia de una fila y throughput por lotes de sklearn y del runtime.
+
+    Args:
+        model: RandomForestClassifier original.
+        forest: FlatForest exportado.
+        X: DataFrame de prueba con las columnas del modelo.
+        repeats: Repeticiones por medición.
+
+    Returns:
+        pd.DataFrame: Latencia de una fila (ms) y filas por segundo por motor.
+    """
+    row = X.iloc[:1]
+    results = []
+    for name, single, batch in [
+        ('sklearn', lambda: (model.predict(row), model.predict_proba(row)),
+         lambda: model.predict_proba(X)),
+        ('numpy', lambda: forest.predict_with_proba(row),
+         lambda: forest.predict_with_proba(X)),
+    ]:
+        batch_seconds = _median_seconds(batch, max(1, repeats // 10))
+        results.append({
+            'Motor': name,
+            'Latencia 1 fila (ms)': _median_seconds(single, repeats) * 1000,
+            'Filas/s (lote)': len(X) / batch_seconds if batch_seconds > 0 else float('inf')
+        })
+    return pd.DataFrame(results)
+
+
+def main():
+    from config import MODEL_PATH, SERVICE_ASPECTS, TRAVELLER_TYPES
+    from ml_utils import load_model, align_features, RATING_GRID
+
+    parser = argparse.ArgumentParser(description='Verificación y benchmark del runtime NumPy')
+    parser.add_argument('--model', default=MODEL_PATH, help='Ruta del modelo .pkl')
+    parser.add_argument('--rows', type=int, default=10000, help='Filas del lote de prueba')
+    parser.add_argument('--repeats', type=int, default=50, help='Repeticiones por medición')
+    args = parser.parse_args()
+
+    model = load_model(args.model)
+    forest = FlatForest.from_sklearn(model)
+
+    # Lote de prueba: combinaciones aleatorias de la rejilla de sliders
+    rng = np.random.default_rng(42)
+    inputs = pd.DataFrame(rng.choice(RATING_GRID, size=(args.rows, len(SERVICE_ASPECTS))),
+                          columns=SERVICE_ASPECTS)
+    inputs['Type Of Traveller'] = rng.choice(TRAVELLER_TYPES, size=args.rows)
+    X = align_features(inputs, model.feature_names_in_)
+
+    exact = verify_against_sklearn(model, forest, X)
+    print(f"{'✅' if exact else '❌'} Coincidencia bit a bit con sklearn: {exact}")
+
+    # Mismo lote con un 10% de valores ausentes en los aspectos de servicio
+    X_missing = X.copy()
+    aspects = [col for col in SERVICE_ASPECTS if col in X_missing.columns]
+    X_missing[aspects] = X_missing[aspects].mask(rng.random((len(X_missing), len(aspects))) < 0.1)
+    exact_missing = verify_against_sklearn(model, forest, X_missing)
+    print(f"{'✅' if exact_missing else '❌'} Coincidencia con valores ausentes (NaN): {exact_missing}")
+    print(benchmark(model, forest, X, args.repeats).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
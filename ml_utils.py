@@ -0,0 +1,362 @@
+"""
+Funciones utilitarias para el modelo de recomendación de Ryanair.
+
+Este módulo no depende de Streamlit para poder usarse desde scripts por lotes
+y procesos worker.
+"""
+import os
+import pickle
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    SERVICE_ASPECTS, ML_CATEGORICAL_FEATURES,
+    ML_OTHER_CATEGORY, ML_UNKNOWN_CATEGORY,
+    ML_RATING_MIN, ML_RATING_MAX, ML_RATING_STEP, TRAVELLER_TYPES,
+    ML_RANDOM_STATE, ML_TEST_SIZE, ML_TOP_COUNTRIES
+)
+
+# Valores posibles de cada slider: 1.0, 1.5, ..., 5.0
+RATING_GRID = np.arange(ML_RATING_MIN, ML_RATING_MAX + ML_RATING_STEP / 2, ML_RATING_STEP)
+
+
+def load_model(path):
+    """
+    Cargar el modelo serializado con pickle.
+
+    Args:
+        path: Ruta del archivo .pkl del modelo.
+
+    Returns:
+        Modelo entrenado (por ejemplo, RandomForestClassifier).
+    """
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def model_category_levels(model):
+    """
+    Niveles de entrenamiento de cada variable categórica guardados con el modelo.
+
+    `train_model.py` los guarda en el pickle (`category_levels_`) y en los
+    metadatos del artefacto (`category_levels`).
+
+    Args:
+        model: Modelo sklearn o FlatForest.
+
+    Returns:
+        dict o None: Variable -> lista de niveles, o None en modelos anteriores.
+    """
+    levels = getattr(model, 'category_levels_', None)
+    if levels is None:
+        levels = (getattr(model, 'metadata', None) or {}).get('category_levels')
+    return levels
+
+
+def model_impute_values(model):
+    """
+    Medianas de entrenamiento con las que se imputan los aspectos nulos.
+
+    `train_model.py` las guarda en el pickle (`impute_values_`) y en el
+    informe de entrenamiento de los metadatos del artefacto
+    (`training.impute_values`).
+
+    Args:
+        model: Modelo sklearn o FlatForest.
+
+    Returns:
+        dict o None: Aspecto -> valor, o None en modelos anteriores.
+    """
+    values = getattr(model, 'impute_values_', None)
+    if values is None:
+        values = ((getattr(model, 'metadata', None) or {}).get('training') or {}).get('impute_values')
+    return values
+
+
+def _map_categories(values, column, feature_names, levels=None):
+    """
+    Normalizar una columna categórica a los niveles conocidos por el modelo.
+
+    Los valores nulos pasan a 'Unknown' y los niveles desconocidos se agrupan
+    en 'Other' cuando el modelo tiene esa categoría. Los niveles conocidos son
+    los de entrenamiento (`levels`, que incluyen el nivel de referencia que
+    `drop_first` deja sin columna); sin ellos, se deducen de `feature_names`.
+
+    Args:
+        values: Serie con los valores originales.
+        column: Nombre de la variable categórica.
+        feature_names: Columnas esperadas por el modelo.
+        levels: Niveles de entrenamiento de la variable (opcional).
+
+    Returns:
+        pd.Series: Valores normalizados.
+    """
+    if levels is not None:
+        known = list(levels)
+    else:
+        prefix = f"{column}_"
+        known = [f[len(prefix):] for f in feature_names if f.startswith(prefix)]
+    values = values.fillna(ML_UNKNOWN_CATEGORY).astype(str)
+    if ML_OTHER_CATEGORY in known:
+        values = values.where(values.isin(known), ML_OTHER_CATEGORY)
+    return values
+
+
+def align_features(df, feature_names, impute_values=None, category_levels=None):
+    """
+    Construir la matriz de entrada del modelo de forma vectorizada.
+
+    Replica el preprocesamiento del notebook: aspectos numéricos imputados,
+    variables categóricas con One-Hot Encoding y columnas reordenadas según
+    `feature_names` con un único `reindex` (las ausentes se rellenan con 0).
+
+    Args:
+        df: DataFrame con los aspectos y, opcionalmente, variables categóricas.
+        feature_names: Columnas esperadas por el modelo (`feature_names_in_`).
+        impute_values: Dict aspecto -> valor para rellenar nulos (opcional).
+        category_levels: Dict variable -> niveles de entrenamiento
+            (`model_category_levels`); opcional.
+
+    Returns:
+        pd.DataFrame: Matriz de features alineada con el modelo.
+    """
+    feature_names = list(feature_names)
+    numeric = [col for col in SERVICE_ASPECTS if col in df.columns]
+    X = df[numeric].apply(pd.to_numeric, errors='coerce')
+    if impute_values:
+        X = X.fillna(impute_values)
+
+    categorical = [col for col in ML_CATEGORICAL_FEATURES if col in df.columns]
+    if categorical:
+        cats = pd.DataFrame(
+            {col: _map_categories(df[col], col, feature_names, (category_levels or {}).get(col))
+             for col in categorical},
+            index=df.index
+        )
+        X = pd.concat([X, pd.get_dummies(cats, prefix=categorical)], axis=1)
+
+    return X.reindex(columns=feature_names, fill_value=0).astype(np.float64)
+
+
+def build_training_frame(df, top_countries=ML_TOP_COUNTRIES):
+    """
+    Construir la matriz de entrenamiento igual que el notebook.
+
+    Filtra filas con 'Recommended_bool' válido, imputa los aspectos con la
+    mediana, rellena las categóricas con 'Unknown', agrupa los países fuera del
+    top en 'Other' y aplica One-Hot Encoding con `drop_first=True`.
+
+    Args:
+        df: DataFrame con las derivaciones de `analytics.load_reviews`.
+        top_countries: Número de países que conservan columna propia.
+
+    Returns:
+        tuple: (X, y, impute_values, category_levels) con la matriz de
+        features, el target, las medianas usadas para imputar y los niveles de
+        cada variable categórica (incluido el de referencia sin columna).
+    """
+    df_ml = df[df['Recommended_bool'].notna()]
+    numeric = df_ml[SERVICE_ASPECTS].apply(pd.to_numeric, errors='coerce')
+    impute_values = numeric.median().to_dict()
+    numeric = numeric.fillna(impute_values)
+
+    cats = df_ml[ML_CATEGORICAL_FEATURES].fillna(ML_UNKNOWN_CATEGORY).astype(str)
+    top = cats['Passenger Country'].value_counts().head(top_countries).index
+    cats['Passenger Country'] = cats['Passenger Country'].where(
+        cats['Passenger Country'].isin(top), ML_OTHER_CATEGORY
+    )
+    category_levels = {col: sorted(cats[col].unique()) for col in ML_CATEGORICAL_FEATURES}
+    encoded = pd.get_dummies(cats, prefix=ML_CATEGORICAL_FEATURES, drop_first=True)
+
+    X = pd.concat([numeric, encoded], axis=1).astype(np.float64)
+    y = df_ml['Recommended_bool'].astype(int)
+    return X, y, impute_values, category_levels
+
+
+def split_train_test(X, y):
+    """
+    Partición estratificada 80/20 con la semilla del notebook.
+
+    Args:
+        X: Matriz de features.
+        y: Target.
+
+    Returns:
+        tuple: (X_train, X_test, y_train, y_test).
+    """
+    from sklearn.model_selection import train_test_split
+    return train_test_split(X, y, test_size=ML_TEST_SIZE, random_state=ML_RANDOM_STATE, stratify=y)
+
+
+def grid_path_for(model_path):
+    """
+    Ruta de la tabla de probabilidades precalculada junto al modelo.
+
+    Args:
+        model_path: Ruta del archivo del modelo.
+
+    Returns:
+        str: Ruta del archivo .npz de la tabla.
+    """
+    return os.path.splitext(model_path)[0] + '_grid.npz'
+
+
+def _model_signature(model_path):
+    """Identificar la versión del archivo del modelo (tamaño y fecha de modificación)."""
+    stat = os.stat(model_path)
+    return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
+class ProbabilityGrid:
+    """
+    Tabla de probabilidades del modelo para toda la rejilla de los sliders.
+
+    Para cada tipo de viajero guarda `predict_proba` de las 9^5 combinaciones
+    de aspectos, de modo que una predicción en la rejilla es un acceso O(1).
+    """
+
+    def __init__(self, probabilities, traveller_types):
+        self.probabilities = probabilities
+        self.traveller_types = list(traveller_types)
+
+    @classmethod
+    def build(cls, model, traveller_types=TRAVELLER_TYPES):
+        """
+        Calcular la tabla completa con una única llamada a `predict_proba`.
+
+        Args:
+            model: Modelo entrenado con `feature_names_in_`.
+            traveller_types: Tipos de viajero a precalcular.
+
+        Returns:
+            ProbabilityGrid: Tabla de forma (tipos, 9, 9, 9, 9, 9, clases).
+        """
+        n = len(RATING_GRID)
+        n_aspects = len(SERVICE_ASPECTS)
+        combos = np.stack(np.meshgrid(*[RATING_GRID] * n_aspects, indexing='ij'), axis=-1)
+        combos = combos.reshape(-1, n_aspects)
+
+        inputs = pd.DataFrame(np.tile(combos, (len(traveller_types), 1)), columns=SERVICE_ASPECTS)
+        inputs['Type Of Traveller'] = np.repeat(traveller_types, len(combos))
+        proba = model.predict_proba(align_features(inputs, model.feature_names_in_,
+                                                    category_levels=model_category_levels(model)))
+
+        shape = (len(traveller_types),) + (n,) * n_aspects + (proba.shape[1],)
+        return cls(proba.reshape(shape), traveller_types)
+
+    @classmethod
+    def load_or_build(cls, model, model_path, traveller_types=TRAVELLER_TYPES):
+        """
+        Cargar la tabla persistida junto al modelo o recalcularla si está desactualizada.
+
+        Args:
+            model: Modelo entrenado.
+            model_path: Ruta del archivo del modelo (define dónde se guarda la tabla).
+            traveller_types: Tipos de viajero a precalcular.
+
+        Returns:
+            ProbabilityGrid: Tabla lista para consultas.
+        """
+        path = grid_path_for(model_path)
+        signature = _model_signature(model_path)
+        try:
+            with np.load(path) as data:
+                if (np.array_equal(data['signature'], signature)
+                        and list(data['traveller_types']) == list(traveller_types)):
+                    return cls(data['probabilities'], traveller_types)
+        except (OSError, KeyError, ValueError):
+            pass
+
+        grid = cls.build(model, traveller_types)
+        try:
+            np.savez(path, probabilities=grid.probabilities, signature=signature,
+                     traveller_types=np.array(grid.traveller_types))
+        except OSError:
+            # Sin permisos de escritura: se usa la tabla solo en memoria
+            pass
+        return grid
+
+    def lookup(self, aspect_values, traveller_type):
+        """
+        Obtener las probabilidades de una combinación de la rejilla.
+
+        Args:
+            aspect_values: Valores de los aspectos en el orden de SERVICE_ASPECTS.
+            traveller_type: Tipo de viajero.
+
+        Returns:
+            np.ndarray o None: Probabilidades por clase, o None si la entrada
+            está fuera de la rejilla y debe evaluarse con el modelo.
+        """
+        if traveller_type not in self.traveller_types:
+            return None
+        steps = (np.asarray(aspect_values, dtype=float) - ML_RATING_MIN) / ML_RATING_STEP
+        idx = np.rint(steps)
+        if not np.allclose(steps, idx) or idx.min() < 0 or idx.max() >= len(RATING_GRID):
+            return None
+        t = self.traveller_types.index(traveller_type)
+        return self.probabilities[(t,) + tuple(idx.astype(int))]
+
+    def lookup_indices(self, indices, traveller_type):
+        """
+        Consulta vectorizada por índices de la rejilla.
+
+        Args:
+            indices: Array (n, 5) de enteros con la posición de cada aspecto en RATING_GRID.
+            traveller_type: Tipo de viajero (debe estar en la tabla).
+
+        Returns:
+            np.ndarray: Probabilidades por clase (n, n_clases).
+        """
+        t = self.traveller_types.index(traveller_type)
+        indices = np.asarray(indices, dtype=np.intp)
+        return self.probabilities[(t,) + tuple(indices.T)]
+
+
+def sensitivity_analysis(model, aspect_values, traveller_type, pairwise=False):
+    """
+    Curvas what-if de la probabilidad de recomendar variando cada aspecto.
+
+    Construye en un único lote todas las entradas perturbadas (5 aspectos x 9
+    valores y, opcionalmente, las rejillas 9x9 de cada par de aspectos) y las
+    evalúa con una sola llamada a `predict_proba`.
+
+    Args:
+        model: Modelo con `feature_names_in_` y `predict_proba`.
+        aspect_values: Valores actuales en el orden de SERVICE_ASPECTS.
+        traveller_type: Tipo de viajero.
+        pairwise: Calcular también las rejillas 2-D por pares de aspectos.
+
+    Returns:
+        tuple: (curves, grids) con `curves` de forma (5, 9) y `grids` un dict
+        (i, j) -> array (9, 9) con la probabilidad para aspecto i (filas) y
+        aspecto j (columnas); vacío si `pairwise` es False.
+    """
+    base = np.asarray(aspect_values, dtype=float)
+    n_aspects, n_values = len(base), len(RATING_GRID)
+
+    # Curvas 1-D: bloque de 9 filas por aspecto
+    curve_inputs = np.repeat(base[np.newaxis], n_aspects * n_values, axis=0)
+    for i in range(n_aspects):
+        curve_inputs[i * n_values:(i + 1) * n_values, i] = RATING_GRID
+
+    # Rejillas 2-D: bloque de 81 filas por par
+    pairs = list(combinations(range(n_aspects), 2)) if pairwise else []
+    grid_inputs = np.repeat(base[np.newaxis], len(pairs) * n_values ** 2, axis=0)
+    rows_i, cols_j = np.meshgrid(RATING_GRID, RATING_GRID, indexing='ij')
+    for p, (i, j) in enumerate(pairs):
+        block = slice(p * n_values ** 2, (p + 1) * n_values ** 2)
+        grid_inputs[block, i] = rows_i.ravel()
+        grid_inputs[block, j] = cols_j.ravel()
+
+    inputs = pd.DataFrame(np.vstack([curve_inputs, grid_inputs]), columns=SERVICE_ASPECTS)
+    inputs['Type Of Traveller'] = traveller_type
+    proba = model.predict_proba(align_features(inputs, model.feature_names_in_,
+                                                category_levels=model_category_levels(model)))
+    positive = proba[:, list(model.classes_).index(1)]
+
+    curves = positive[:n_aspects * n_values].reshape(n_aspects, n_values)
+    grids = positive[n_aspects * n_values:].reshape(len(pairs), n_values, n_values)
+    return curves, dict(zip(pairs, grids))
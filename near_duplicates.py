@@ -0,0 +1,307 @@
+"""
+Detección de reseñas casi duplicadas (reposts y reseñas sindicadas).
+
+Cada 'Comment' se reduce a sus shingles (grupos de `NEAR_DUP_SHINGLE` palabras
+consecutivas) y a una firma MinHash de `NEAR_DUP_NUM_PERM` valores. La firma se
+parte en `NEAR_DUP_BANDS` bandas (LSH): dos reseñas son candidatas si coinciden
+en alguna banda completa, y se confirman si la similitud de Jaccard estimada
+por sus firmas llega a `NEAR_DUP_THRESHOLD`. Los pares confirmados se agrupan
+en componentes conexas y cada grupo se representa por su primera reseña.
+
+Las firmas y las claves de banda se guardan junto al tamaño y el hash de los
+bytes procesados del CSV; cuando se añaden reseñas al final solo se calculan
+las firmas nuevas y se comparan contra las claves guardadas, sin releer el
+texto de las anteriores.
+
+Uso:
+    python near_duplicates.py "ryanair_reviews (1).csv"
+"""
+import argparse
+import hashlib
+import json
+import os
+import zlib
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    NEAR_DUP_DIR, NEAR_DUP_NUM_PERM, NEAR_DUP_BANDS, NEAR_DUP_SHINGLE, NEAR_DUP_THRESHOLD,
+    BATCH_CHUNK_SIZE
+)
+from text_index import tokenize
+from ingest_cache import prefix_digest, read_rows
+
+TEXT_COLUMN = 'Comment'
+DUPLICATE_COLUMN = 'Duplicate Of'
+
+_PRIME = np.uint64(4294967311)  # primo mayor que 2**32
+_MASK = np.uint64(0xFFFFFFFF)
+_SEED = 20240203
+
+
+def shingles(text, size=NEAR_DUP_SHINGLE):
+    """
+    Conjunto de shingles de palabras de un texto.
+
+    Args:
+        text: Texto de la reseña.
+        size: Palabras por shingle.
+
+    Returns:
+        set: Shingles; los textos más cortos que `size` dan un único shingle.
+    """
+    tokens = tokenize(text)
+    if len(tokens) < size:
+        return {' '.join(tokens)} if tokens else set()
+    return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def minhash_signatures(texts, num_perm=NEAR_DUP_NUM_PERM, shingle_size=NEAR_DUP_SHINGLE):
+    """
+    Firmas MinHash de un bloque de textos.
+
+    Cada shingle se hashea con CRC32 y se aplica `h(x) = (a·x + b) mod p` por
+    permutación; el mínimo por documento se obtiene con `np.minimum.reduceat`.
+
+    Args:
+        texts: Lista de textos.
+        num_perm: Permutaciones (longitud de la firma).
+        shingle_size: Palabras por shingle.
+
+    Returns:
+        tuple: (firmas uint32 de forma (n, num_perm), máscara de documentos con
+        al menos un shingle).
+    """
+    rng = np.random.default_rng(_SEED)
+    a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+
+    hashes, doc_ids = array('I'), array('i')
+    for doc, text in enumerate(texts):
+        doc_shingles = shingles(text, shingle_size)
+        hashes.extend(zlib.crc32(s.encode('utf-8')) for s in doc_shingles)
+        doc_ids.extend([doc] * len(doc_shingles))
+
+    signatures = np.full((len(texts), num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+    valid = np.zeros(len(texts), dtype=bool)
+    if not len(hashes):
+        return signatures, valid
+
+    x = np.frombuffer(hashes, dtype=np.uint32).astype(np.uint64)
+    docs = np.frombuffer(doc_ids, dtype=np.int32)
+    starts = np.flatnonzero(np.r_[True, docs[1:] != docs[:-1]])
+    present = docs[starts]
+    for k in range(num_perm):
+        permuted = ((a[k] * x + b[k]) % _PRIME) & _MASK
+        signatures[present, k] = np.minimum.reduceat(permuted, starts)
+    valid[present] = True
+    return signatures, valid
+
+
+def band_keys(signatures, bands=NEAR_DUP_BANDS):
+    """
+    Clave de 64 bits de cada banda de la firma.
+
+    Args:
+        signatures: Firmas (n, num_perm).
+        bands: Número de bandas.
+
+    Returns:
+        np.ndarray: Claves uint64 de forma (n, bands).
+    """
+    rows = signatures.shape[1] // bands
+    multipliers = np.random.default_rng(_SEED + 1).integers(1, 1 << 62, rows, dtype=np.uint64) | np.uint64(1)
+    values = signatures[:, :bands * rows].reshape(len(signatures), bands, rows).astype(np.uint64)
+    with np.errstate(over='ignore'):
+        return ((values + np.uint64(1)) * multipliers).sum(axis=2, dtype=np.uint64)
+
+
+class DuplicateIndex:
+    """
+    Firmas, claves LSH y pares de reseñas casi duplicadas.
+
+    Attributes:
+        signatures: Firmas MinHash (n, num_perm).
+        valid: Reseñas con texto suficiente para compararse.
+        keys: Claves de banda (n, bands).
+        pairs: Pares (fila, fila representante) confirmados.
+        duplicate_of: Por fila, la primera reseña de su grupo o -1 si es original.
+    """
+
+    def __init__(self, signatures=None, valid=None, keys=None, pairs=None):
+        self.signatures = (signatures if signatures is not None
+                           else np.zeros((0, NEAR_DUP_NUM_PERM), dtype=np.uint32))
+        self.valid = valid if valid is not None else np.zeros(0, dtype=bool)
+        self.keys = keys if keys is not None else np.zeros((0, NEAR_DUP_BANDS), dtype=np.uint64)
+        self.pairs = pairs if pairs is not None else np.zeros((0, 2), dtype=np.int32)
+        self.duplicate_of = self._groups()
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def add(self, texts, threshold=NEAR_DUP_THRESHOLD):
+        """
+        Añadir reseñas y compararlas contra el índice (y entre sí).
+
+        Args:
+            texts: Textos de las reseñas nuevas, en el orden del CSV.
+            threshold: Similitud de Jaccard estimada mínima.
+
+        Returns:
+            int: Pares casi duplicados nuevos.
+        """
+        n_old = len(self)
+        signatures, valid = minhash_signatures(list(texts))
+        self.signatures = np.concatenate([self.signatures, signatures])
+        self.valid = np.concatenate([self.valid, valid])
+        self.keys = np.concatenate([self.keys, band_keys(signatures)])
+
+        rows, firsts = [], []
+        candidates = np.flatnonzero(self.valid)
+        for band in range(self.keys.shape[1]):
+            order = candidates[np.argsort(self.keys[candidates, band], kind='stable')]
+            sorted_keys = self.keys[order, band]
+            boundary = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+            first = order[np.flatnonzero(boundary)][np.cumsum(boundary) - 1]
+            new = (order >= n_old) & (order != first)
+            rows.append(order[new])
+            firsts.append(first[new])
+
+        pairs = np.unique(np.column_stack([np.concatenate(rows), np.concatenate(firsts)]).astype(np.int32), axis=0)
+        if len(pairs):
+            similarity = (self.signatures[pairs[:, 0]] == self.signatures[pairs[:, 1]]).mean(axis=1)
+            pairs = pairs[similarity >= threshold]
+        self.pairs = np.concatenate([self.pairs, pairs])
+        self.duplicate_of = self._groups()
+        return len(pairs)
+
+    def _groups(self):
+        """Representante (fila más antigua) de cada grupo de duplicados."""
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+
+        n = len(self.signatures)
+        if not len(self.pairs):
+            return np.full(n, -1, dtype=np.int32)
+        graph = coo_matrix((np.ones(len(self.pairs)), (self.pairs[:, 0], self.pairs[:, 1])), shape=(n, n))
+        n_groups, labels = connected_components(graph, directed=False)
+        first = np.full(n_groups, n, dtype=np.int64)
+        np.minimum.at(first, labels, np.arange(n))
+        canonical = first[labels]
+        return np.where(canonical == np.arange(n), -1, canonical).astype(np.int32)
+
+    def save(self, path, **metadata):
+        """Guardar el índice como `.npz` (escritura atómica) con metadatos JSON."""
+        tmp_path = f"{path}.tmp-{os.getpid()}.npz"
+        np.savez(tmp_path, signatures=self.signatures, valid=self.valid, keys=self.keys,
+                 pairs=self.pairs, metadata=json.dumps(metadata))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Cargar un índice guardado con `save`.
+
+        Returns:
+            tuple: (DuplicateIndex, dict de metadatos).
+        """
+        with np.load(path) as data:
+            index = cls(data['signatures'], data['valid'], data['keys'], data['pairs'])
+            return index, json.loads(str(data['metadata']))
+
+
+def _cache_path(data_path, cache_dir):
+    key = hashlib.sha1(os.path.abspath(data_path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{key}.npz")
+
+
+def load_or_update(data_path, cache_dir=NEAR_DUP_DIR, chunksize=BATCH_CHUNK_SIZE):
+    """
+    Obtener el índice de duplicados del CSV, procesando solo las reseñas nuevas.
+
+    - Si el archivo no ha cambiado (tamaño y fecha), se carga el guardado.
+    - Si ha crecido y los bytes ya procesados son idénticos, solo se calculan
+      las firmas de las filas nuevas y se comparan contra el índice.
+    - En otro caso se reconstruye desde cero.
+
+    Args:
+        data_path: CSV de reseñas.
+        cache_dir: Directorio donde se guardan los índices.
+        chunksize: Filas por bloque.
+
+    Returns:
+        tuple: (DuplicateIndex, dict con 'rows_processed' y 'mode':
+        'cached', 'incremental' o 'full').
+    """
+    stat = os.stat(data_path)
+    cache_path = _cache_path(data_path, cache_dir)
+    index, cached = None, None
+    if os.path.exists(cache_path):
+        index, cached = DuplicateIndex.load(cache_path)
+
+    if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+        return index, {'rows_processed': 0, 'mode': 'cached'}
+
+    offset, mode = 0, 'full'
+    if (cached and stat.st_size > cached['size']
+            and prefix_digest(data_path, cached['size']) == cached['prefix_sha']):
+        offset, mode = cached['size'], 'incremental'
+    else:
+        index = DuplicateIndex()
+
+    rows = 0
+    for chunk in read_rows(data_path, offset, chunksize):
+        index.add(chunk[TEXT_COLUMN].fillna('').astype(str))
+        rows += len(chunk)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    index.save(cache_path, data_path=os.path.abspath(data_path), size=stat.st_size,
+               mtime_ns=stat.st_mtime_ns, prefix_sha=prefix_digest(data_path, stat.st_size))
+    return index, {'rows_processed': rows, 'mode': mode}
+
+
+def find_duplicates(df, chunksize=BATCH_CHUNK_SIZE):
+    """
+    Marcar duplicados de un DataFrame en memoria (p. ej. un CSV subido).
+
+    Args:
+        df: Reseñas con la columna 'Comment'.
+        chunksize: Filas por bloque.
+
+    Returns:
+        np.ndarray: Por fila, la posición de la primera reseña del grupo o -1.
+    """
+    index = DuplicateIndex()
+    texts = df[TEXT_COLUMN].fillna('').astype(str) if TEXT_COLUMN in df.columns else pd.Series([''] * len(df))
+    for start in range(0, len(texts), chunksize):
+        index.add(texts.iloc[start:start + chunksize])
+    return index.duplicate_of
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Detección de reseñas casi duplicadas')
+    parser.add_argument('data', nargs='?', default=None, help='CSV de reseñas (por defecto, DATA_PATHS)')
+    parser.add_argument('--cache', default=NEAR_DUP_DIR, help='Directorio de caché')
+    parser.add_argument('--show', type=int, default=5, help='Grupos de ejemplo a mostrar')
+    args = parser.parse_args()
+
+    from analytics import resolve_data_path
+
+    data_path = resolve_data_path(args.data)
+    if data_path is None:
+        raise SystemExit("❌ No se encontró el CSV de reseñas")
+    index, info = load_or_update(data_path, args.cache)
+    duplicates = np.flatnonzero(index.duplicate_of >= 0)
+    print(f"✅ {info['rows_processed']:,} filas procesadas ({info['mode']}); "
+          f"{len(duplicates):,} duplicados de {len(np.unique(index.duplicate_of[duplicates])):,} reseñas originales")
+    if args.show and len(duplicates):
+        comments = pd.read_csv(data_path, usecols=[TEXT_COLUMN])[TEXT_COLUMN].fillna('')
+        for row in duplicates[:args.show]:
+            original = index.duplicate_of[row]
+            print(f"   [{row}] duplica [{original}]: {comments.iloc[row][:100]!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Servicio HTTP/JSON local de predicción de recomendación.
+
+Expone el modelo activo del registro (el mismo que usa `ml_app`) sin pasar por
+Streamlit. Las peticiones concurrentes se agrupan en micro-lotes: un hilo
+evaluador espera la primera petición, recoge las que llegan durante
+`MICROBATCH_WINDOW` segundos (hasta `MICROBATCH_MAX_ROWS` filas) y las evalúa
+con una única llamada vectorizada a `predict_proba`.
+
+Endpoints:
+    POST /predict   Una reseña (objeto) o varias ({"instances": [...]}) con los
+                    aspectos y, opcionalmente, 'Type Of Traveller' y
+                    'Passenger Country'.
+    GET  /health    Versión y métricas del modelo activo.
+    GET  /metrics   Histogramas de latencia en formato de texto de Prometheus.
+
+Uso:
+    python prediction_server.py --port 8765
+    curl -X POST localhost:8765/predict -d '{"Seat Comfort": 3, "Cabin Staff Service": 4, ...}'
+"""
+import argparse
+import json
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    SERVICE_ASPECTS, ML_CATEGORICAL_FEATURES, ML_RATING_MIN, ML_RATING_MAX,
+    MODEL_PATH, MODEL_ARTIFACT_PATH, MODEL_REGISTRY_DIR, PREDICTION_SERVER_HOST, PREDICTION_SERVER_PORT, MICROBATCH_WINDOW, MICROBATCH_MAX_ROWS
+)
+from ml_utils import align_features, model_category_levels, model_impute_values
+from ml_registry import ModelHolder
+from instrumentation import LatencyRecorder
+
+# Columnas de la matriz de entrada de cada lote: fijas, para que la codificación
+# de una reseña no dependa de las otras peticiones agrupadas con ella
+INSTANCE_COLUMNS = SERVICE_ASPECTS + ML_CATEGORICAL_FEATURES
+
+
+def _valid_rating(value):
+    """Número finito (no booleano) dentro del rango de los sliders."""
+    return (isinstance(value, (int, float)) and not isinstance(value, bool)
+            and math.isfinite(value) and ML_RATING_MIN <= value <= ML_RATING_MAX)
+
+
+def parse_instances(payload):
+    """
+    Normalizar el cuerpo de una petición a una lista de reseñas.
+
+    Args:
+        payload: Objeto JSON decodificado.
+
+    Returns:
+        list: Reseñas como dicts.
+
+    Raises:
+        ValueError: Si el formato no es válido, falta algún aspecto, un aspecto
+            no es un número entre `ML_RATING_MIN` y `ML_RATING_MAX` o una
+            variable categórica no es un texto.
+    """
+    instances = payload.get('instances', [payload]) if isinstance(payload, dict) else None
+    if not isinstance(instances, list) or not instances:
+        raise ValueError("Se esperaba un objeto o {'instances': [...]} no vacío")
+    for i, instance in enumerate(instances):
+        if not isinstance(instance, dict):
+            raise ValueError(f"La instancia {i} no es un objeto")
+        missing = [aspect for aspect in SERVICE_ASPECTS if aspect not in instance]
+        if missing:
+            raise ValueError(f"A la instancia {i} le faltan aspectos: {', '.join(missing)}")
+        invalid = [aspect for aspect in SERVICE_ASPECTS if not _valid_rating(instance[aspect])]
+        if invalid:
+            raise ValueError(f"En la instancia {i}, {', '.join(invalid)} debe ser un número "
+                             f"entre {ML_RATING_MIN:g} y {ML_RATING_MAX:g}")
+        invalid = [col for col in ML_CATEGORICAL_FEATURES
+                   if instance.get(col) is not None and not isinstance(instance[col], str)]
+        if invalid:
+            raise ValueError(f"En la instancia {i}, {', '.join(invalid)} debe ser un texto")
+    return instances
+
+
+class MicroBatcher:
+    """
+    Agrupar peticiones concurrentes en lotes para una sola llamada al modelo.
+
+    Cada petición se encola con un Future; el hilo evaluador resuelve todos los
+    Futures del lote con sus filas de resultado.
+
+    Attributes:
+        batches: Lotes evaluados.
+        rows: Filas evaluadas (rows / batches es el tamaño medio de lote).
+    """
+
+    def __init__(self, holder, recorder, window=MICROBATCH_WINDOW, max_rows=MICROBATCH_MAX_ROWS):
+        self.holder = holder
+        self.recorder = recorder
+        self.window = window
+        self.max_rows = max_rows
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, instances):
+        """
+        Encolar reseñas para evaluarlas en el próximo lote.
+
+        Args:
+            instances: Lista de reseñas (dicts).
+
+        Returns:
+            Future: Se resuelve con (predicciones, versión del modelo).
+        """
+        future = Future()
+        self._queue.put((instances, future))
+        return future
+
+    def _collect(self):
+        """Esperar la primera petición y recoger las que llegan dentro de la ventana."""
+        batch = [self._queue.get()]
+        n_rows = len(batch[0][0])
+        deadline = time.perf_counter() + self.window
+        while n_rows < self.max_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            n_rows += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                results = self._score(batch)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def _score(self, batch):
+        """Evaluar todas las reseñas del lote con una sola llamada a `predict_proba`."""
+        self.holder.refresh()
+        active = self.holder.current
+        model = active.model
+        impute_values = model_impute_values(model)
+
+        rows = [instance for instances, _ in batch for instance in instances]
+        self.batches += 1
+        self.rows += len(rows)
+        with self.recorder.time('align_features'):
+            frame = pd.DataFrame(rows, columns=INSTANCE_COLUMNS)
+            X = align_features(frame, model.feature_names_in_, impute_values, model_category_levels(model))
+        with self.recorder.time('predict_proba'):
+            proba = model.predict_proba(X)
+
+        classes = np.asarray(model.classes_)
+        predictions = classes[proba.argmax(axis=1)]
+        positive = proba[:, list(classes).index(1)]
+        results, offset = [], 0
+        for instances, _ in batch:
+            end = offset + len(instances)
+            results.append(([
+                {'prediction': int(p), 'probability': float(q)}
+                for p, q in zip(predictions[offset:end], positive[offset:end])
+            ], active.version))
+            offset = end
+        return results
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """Manejador HTTP; `server.batcher`, `server.holder` y `server.recorder` se fijan al arrancar."""
+
+    def _send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/health':
+            active = self.server.holder.current
+            batcher = self.server.batcher
+            self._send_json(200, {'status': 'ok', 'model_version': active.version,
+                                  'metrics': active.model.metadata.get('metrics', {}),
+                                  'batches': batcher.batches, 'rows': batcher.rows})
+        elif self.path == '/metrics':
+            data = self.server.recorder.to_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._send_json(404, {'error': f"Ruta no encontrada: {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self._send_json(404, {'error': f"Ruta no encontrada: {self.path}"})
+            return
+        start = time.perf_counter()
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            instances = parse_instances(json.loads(self.rfile.read(length) or b'null'))
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        try:
+            predictions, version = self.server.batcher.submit(instances).result()
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+            return
+        self.server.recorder.observe('request', time.perf_counter() - start)
+        self._send_json(200, {'predictions': predictions, 'model_version': version})
+
+    def log_message(self, format, *args):
+        # Sin log por petición: con carga concurrente domina el tiempo de respuesta
+        pass
+
+
+class PredictionServer(ThreadingHTTPServer):
+    """Servidor con cola de conexiones amplia: con la de 5 por defecto los picos
+    de clientes concurrentes provocan reintentos de TCP de 1 s."""
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def create_server(host=PREDICTION_SERVER_HOST, port=PREDICTION_SERVER_PORT,
+                  window=MICROBATCH_WINDOW, max_rows=MICROBATCH_MAX_ROWS):
+    """
+    Crear el servidor HTTP con el modelo activo cargado.
+
+    Args:
+        host: Interfaz de escucha.
+        port: Puerto.
+        window: Ventana de agrupación en segundos.
+        max_rows: Filas máximas por micro-lote.
+
+    Returns:
+        PredictionServer: Servidor listo para `serve_forever()`.
+    """
+    server = PredictionServer((host, port), PredictionHandler)
+    server.recorder = LatencyRecorder('prediction_server')
+    server.holder = ModelHolder(MODEL_REGISTRY_DIR, MODEL_ARTIFACT_PATH, MODEL_PATH)
+    server.batcher = MicroBatcher(server.holder, server.recorder, window, max_rows)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servicio HTTP de predicción con micro-lotes')
+    parser.add_argument('--host', default=PREDICTION_SERVER_HOST)
+    parser.add_argument('--port', type=int, default=PREDICTION_SERVER_PORT)
+    parser.add_argument('--window', type=float, default=MICROBATCH_WINDOW,
+                        help='Ventana de agrupación en segundos')
+    parser.add_argument('--max-rows', type=int, default=MICROBATCH_MAX_ROWS,
+                        help='Filas máximas por micro-lote')
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.window, args.max_rows)
+    print(f"✅ Modelo {server.holder.current.version} servido en http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Benchmarks por segmento de viajero calculados sobre el dataset de reseñas.
+
+Para cada 'Type Of Traveller' se calculan la media de cada aspecto, la
+calificación media (promedio de los aspectos de cada reseña, igual que en
+`ml_app`), la tasa real de recomendación, la tasa predicha por el modelo y
+bandas de percentiles de la calificación media.
+
+El estado es aditivo: sumas, conteos y un histograma de la calificación media
+(cubetas de 0.1 puntos) por segmento, obtenidos con un único `groupby().sum()`
+por bloque. Así, cuando se añaden reseñas al final del CSV solo se procesan
+las filas nuevas y se suman al estado guardado; los percentiles se derivan
+del histograma.
+
+Uso:
+    python segment_benchmarks.py "ryanair_reviews (1).csv"
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import SERVICE_ASPECTS, BATCH_CHUNK_SIZE, SEGMENT_BENCHMARK_DIR, ML_UNKNOWN_CATEGORY
+from ingest_cache import prefix_digest, read_rows
+from ml_utils import align_features, model_category_levels
+
+SCORE_STEP = 0.1
+SCORE_BINS = np.round(np.arange(1.0, 5.0 + SCORE_STEP / 2, SCORE_STEP), 1)
+PERCENTILES = [10, 25, 50, 75, 90]
+
+
+def _hist_column(i):
+    return f"hist_{i}"
+
+
+def _row_scores(df):
+    """Aspectos numéricos y calificación media de cada reseña."""
+    aspects = df[SERVICE_ASPECTS].apply(pd.to_numeric, errors='coerce')
+    return aspects, aspects.mean(axis=1)
+
+
+def accumulate(df, model, impute_values=None):
+    """
+    Calcular el estado aditivo de un bloque de reseñas en una sola pasada agrupada.
+
+    Args:
+        df: Reseñas con los aspectos, 'Type Of Traveller' y 'Recommended'.
+        model: Modelo con `feature_names_in_`, `classes_` y `predict_proba`.
+        impute_values: Dict aspecto -> valor para imputar antes de predecir.
+
+    Returns:
+        pd.DataFrame: Sumas por segmento (una fila por tipo de viajero).
+    """
+    aspects, score = _row_scores(df)
+    recommended = df['Recommended'].fillna('').astype(str).str.strip().str.lower().map({'yes': 1, 'no': 0})
+
+    proba = model.predict_proba(align_features(df, model.feature_names_in_, impute_values,
+                                               model_category_levels(model)))
+    classes = np.asarray(model.classes_)
+    positive = proba[:, list(classes).index(1)]
+
+    parts = {'reviews': np.ones(len(df), dtype=np.int64)}
+    for aspect in SERVICE_ASPECTS:
+        parts[f"sum_{aspect}"] = aspects[aspect].fillna(0).to_numpy()
+        parts[f"n_{aspect}"] = aspects[aspect].notna().to_numpy(np.int64)
+    parts['score_sum'] = score.fillna(0).to_numpy()
+    parts['score_n'] = score.notna().to_numpy(np.int64)
+    parts['labeled'] = recommended.notna().to_numpy(np.int64)
+    parts['recommended'] = recommended.fillna(0).to_numpy(np.int64)
+    parts['predicted'] = (classes[proba.argmax(axis=1)] == 1).astype(np.int64)
+    parts['probability_sum'] = positive
+
+    hist = np.zeros((len(df), len(SCORE_BINS)), dtype=np.int64)
+    has_score = score.notna().to_numpy()
+    bins = np.clip(np.rint((score.to_numpy()[has_score] - SCORE_BINS[0]) / SCORE_STEP), 0, len(SCORE_BINS) - 1)
+    hist[np.flatnonzero(has_score), bins.astype(int)] = 1
+    for i in range(len(SCORE_BINS)):
+        parts[_hist_column(i)] = hist[:, i]
+
+    segment = df['Type Of Traveller'].fillna(ML_UNKNOWN_CATEGORY).astype(str).to_numpy()
+    return pd.DataFrame(parts, index=df.index).groupby(segment).sum()
+
+
+def merge(state, other):
+    """Sumar dos estados por segmento."""
+    if state is None:
+        return other
+    return state.add(other, fill_value=0)
+
+
+def _band(hist, q):
+    """Valor de la calificación media en el percentil `q` a partir del histograma."""
+    total = hist.sum()
+    if total == 0:
+        return np.nan
+    return float(SCORE_BINS[np.searchsorted(np.cumsum(hist), q / 100 * total)])
+
+
+def summarize(state):
+    """
+    Benchmarks por segmento a partir del estado acumulado.
+
+    Args:
+        state: Sumas por segmento devueltas por `accumulate`/`merge`.
+
+    Returns:
+        pd.DataFrame: Por segmento, 'reviews', media de cada aspecto,
+        'avg_satisfaction', 'actual_rate', 'predicted_rate',
+        'mean_probability' y los percentiles 'p10'...'p90' de la calificación media.
+    """
+    summary = pd.DataFrame(index=state.index)
+    summary['reviews'] = state['reviews'].astype(int)
+    for aspect in SERVICE_ASPECTS:
+        summary[aspect] = state[f"sum_{aspect}"] / state[f"n_{aspect}"].replace(0, np.nan)
+    summary['avg_satisfaction'] = state['score_sum'] / state['score_n'].replace(0, np.nan)
+    summary['actual_rate'] = state['recommended'] / state['labeled'].replace(0, np.nan)
+    summary['predicted_rate'] = state['predicted'] / state['reviews']
+    summary['mean_probability'] = state['probability_sum'] / state['reviews']
+
+    hist = state[[_hist_column(i) for i in range(len(SCORE_BINS))]].to_numpy()
+    for q in PERCENTILES:
+        summary[f"p{q}"] = [_band(row, q) for row in hist]
+    return summary
+
+
+def score_percentile(state, segment, score):
+    """
+    Porcentaje de reseñas del segmento con calificación media menor o igual.
+
+    Args:
+        state: Estado acumulado.
+        segment: Tipo de viajero.
+        score: Calificación media del cliente.
+
+    Returns:
+        float: Percentil entre 0 y 100 (NaN si el segmento no tiene datos).
+    """
+    if segment not in state.index:
+        return np.nan
+    hist = state.loc[segment, [_hist_column(i) for i in range(len(SCORE_BINS))]].to_numpy()
+    total = hist.sum()
+    if total == 0:
+        return np.nan
+    return float(hist[SCORE_BINS <= score + 1e-9].sum() / total * 100)
+
+
+def _cache_path(data_path, model_version, cache_dir):
+    key = hashlib.sha1(f"{os.path.abspath(data_path)}|{model_version}".encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{key}.json")
+
+
+def load_or_update(data_path, model, model_version=None, cache_dir=SEGMENT_BENCHMARK_DIR,
+                   chunksize=BATCH_CHUNK_SIZE):
+    """
+    Obtener el estado de benchmarks del CSV, procesando solo lo que falte.
+
+    - Si el archivo no ha cambiado (tamaño y fecha), se usa el estado guardado.
+    - Si ha crecido y los bytes ya procesados son idénticos (reseñas añadidas
+      al final), solo se leen las filas nuevas y se suman al estado.
+    - En otro caso se recalcula desde cero.
+
+    Args:
+        data_path: CSV de reseñas.
+        model: Modelo con el que se calcula la tasa predicha.
+        model_version: Versión del modelo (forma parte de la clave de caché).
+        cache_dir: Directorio donde se guardan los estados.
+        chunksize: Filas por bloque.
+
+    Returns:
+        tuple: (estado, dict con 'rows_processed' en esta llamada y 'mode':
+        'cached', 'incremental' o 'full').
+    """
+    stat = os.stat(data_path)
+    cache_path = _cache_path(data_path, model_version, cache_dir)
+    cached = None
+    if os.path.exists(cache_path):
+        with open(cache_path, encoding='utf-8') as f:
+            cached = json.load(f)
+
+    if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+        return pd.DataFrame.from_dict(cached['state'], orient='index'), {'rows_processed': 0, 'mode': 'cached'}
+
+    state, offset, mode = None, 0, 'full'
+    if (cached and stat.st_size > cached['size']
+            and prefix_digest(data_path, cached['size']) == cached['prefix_sha']):
+        state = pd.DataFrame.from_dict(cached['state'], orient='index')
+        offset, mode = cached['size'], 'incremental'
+
+    impute_values = (cached or {}).get('impute_values') or model.metadata.get('training', {}).get('impute_values')
+    if impute_values is None:
+        impute_values = pd.read_csv(data_path, usecols=SERVICE_ASPECTS).median().dropna().to_dict()
+
+    rows = 0
+    for chunk in read_rows(data_path, offset, chunksize):
+        state = merge(state, accumulate(chunk, model, impute_values))
+        rows += len(chunk)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{cache_path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'data_path': os.path.abspath(data_path),
+            'model_version': model_version,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'prefix_sha': prefix_digest(data_path, stat.st_size),
+            'impute_values': impute_values,
+            'state': state.to_dict(orient='index'),
+        }, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+    return state, {'rows_processed': rows, 'mode': mode}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks por segmento de viajero')
+    parser.add_argument('data', nargs='?', default=None, help='CSV de reseñas (por defecto, DATA_PATHS)')
+    parser.add_argument('--cache', default=SEGMENT_BENCHMARK_DIR, help='Directorio de caché')
+    args = parser.parse_args()
+
+    from analytics import resolve_data_path
+    from ml_registry import load_active
+
+    data_path = resolve_data_path(args.data)
+    if data_path is None:
+        raise SystemExit("❌ No se encontró el CSV de reseñas")
+    active = load_active()
+    state, info = load_or_update(data_path, active.model, active.version, args.cache)
+    print(f"✅ {info['rows_processed']:,} filas procesadas ({info['mode']})")
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(summarize(state).round(3))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+"""
+Dataset de reseñas compartido entre los procesos worker de Streamlit.
+
+Con varios servidores detrás de un balanceador, cada proceso leía el CSV,
+derivaba las columnas y guardaba su propia copia en memoria. Aquí el dataset
+derivado se publica una sola vez como archivos columnares y todos los procesos
+los mapean en memoria en solo lectura, compartiendo las mismas páginas físicas:
+
+    shared_dataset/<slot>/
+        version         Contador de versiones del CSV (solo crece).
+        lock            Bloqueo entre procesos para publicar.
+        v<N>/
+            metadata.json   Versión, CSV de origen (tamaño y mtime), filas y columnas.
+            c<i>.npy        Columnas numéricas y de fechas.
+            c<i>.offsets.npy, c<i>.data.npy, c<i>.valid.npy
+                            Columnas de texto en el layout de Arrow (offsets y
+                            bytes UTF-8 y, si hay nulos, máscara de validez).
+            objects.pkl     Columnas de otros tipos (p. ej. object con valores
+                            mixtos), que cada proceso carga en su memoria.
+
+En pandas 2.x `read_csv` devuelve los textos con dtype object: antes de
+publicarlos se convierten al dtype de texto de pyarrow con semántica NaN (el
+`str` de pandas 3) para que también se compartan.
+
+Hay un slot por ruta del CSV. Una versión es válida si es la del contador y
+coincide con el tamaño y la fecha de modificación actuales del CSV; si no, el
+primer proceso que lo detecta vuelve a leer el CSV y publica la versión
+siguiente mientras los demás esperan el bloqueo y después se adjuntan a ella.
+`invalidate` incrementa el contador para forzar esa recarga en todos los
+procesos (botón "Recargar datos").
+
+Al adjuntarse se construye un DataFrame sin consolidar cuyas columnas son
+vistas de los archivos mapeados (los textos, `ArrowStringArray` sobre los
+buffers mapeados), sin copiar datos. Las columnas son de solo lectura: con
+Copy-on-Write, reemplazar o añadir columnas en una copia superficial no toca
+los archivos.
+
+Uso:
+    python shared_dataset.py publish "ryanair_reviews (1).csv"
+    python shared_dataset.py info "ryanair_reviews (1).csv"
+    python shared_dataset.py invalidate
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import time
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from config import SHARED_DATASET_DIR, SHARED_DATASET_KEEP_VERSIONS
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos (puede publicarse dos veces)
+    fcntl = None
+
+SHARED_FORMAT_VERSION = 2
+METADATA_FILE = 'metadata.json'
+OBJECTS_FILE = 'objects.pkl'
+
+
+def _load_array(path):
+    """Array .npy mapeado en solo lectura (los vacíos no se pueden mapear)."""
+    try:
+        # Vista ndarray del np.memmap: pandas no propaga la subclase a los resultados
+        return np.load(path, mmap_mode='r').view(np.ndarray)
+    except ValueError:
+        return np.load(path)
+
+
+def _arrow_strings(column):
+    """Columna de texto como un único `pa.LargeStringArray`."""
+    import pyarrow as pa
+
+    values = pa.array(column.array)
+    if isinstance(values, pa.ChunkedArray):
+        values = values.combine_chunks()
+    return values.cast(pa.large_string())
+
+
+def _is_string_column(column):
+    return isinstance(column.dtype, pd.StringDtype) and column.dtype.storage in ('pyarrow', 'pyarrow_numpy')
+
+
+def _string_dtype(storage, na_value):
+    """
+    `StringDtype` con el almacenamiento y el valor nulo indicados.
+
+    Args:
+        storage: 'python', 'pyarrow' o 'pyarrow_numpy' (pandas 2.1-2.2).
+        na_value: 'nan' (semántica NaN, el `str` de pandas 3) o 'NA' (`pd.NA`).
+
+    Returns:
+        pd.StringDtype: Dtype de la versión de pandas instalada.
+    """
+    if na_value == 'NA':
+        return pd.StringDtype(storage)
+    if storage == 'pyarrow_numpy':
+        storage = 'pyarrow'
+    try:
+        return pd.StringDtype(storage, na_value=np.nan)
+    except TypeError:  # pandas < 2.3: la semántica NaN es un almacenamiento propio
+        return pd.StringDtype('pyarrow_numpy')
+
+
+def _as_shared_strings(column):
+    """Columna object de solo textos (o nulos) convertida a texto de pyarrow; si no, None."""
+    if column.dtype != object or pd.api.types.infer_dtype(column, skipna=True) != 'string':
+        return None
+    return column.astype(_string_dtype('pyarrow', 'nan'))
+
+
+def _is_numpy_column(column):
+    return isinstance(column.dtype, np.dtype) and column.dtype.kind in 'biufcmM'
+
+
+class SharedDatasetStore:
+    """
+    Almacén de datasets derivados publicados en disco y mapeados en memoria.
+
+    Attributes:
+        directory: Directorio raíz de los slots.
+        loader: Función ruta -> DataFrame (o None) que lee y deriva el CSV.
+        keep_versions: Versiones publicadas que se conservan por slot (los
+            procesos adjuntos a una versión anterior la siguen leyendo).
+    """
+
+    def __init__(self, directory=SHARED_DATASET_DIR, loader=None, keep_versions=SHARED_DATASET_KEEP_VERSIONS):
+        self.directory = directory
+        self.loader = loader
+        self.keep_versions = keep_versions
+
+    def slot_dir(self, path):
+        """Directorio del slot de un CSV (uno por ruta absoluta)."""
+        digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, digest)
+
+    @staticmethod
+    def _read_version(slot):
+        try:
+            with open(os.path.join(slot, 'version'), encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    @staticmethod
+    def _write_version(slot, version):
+        path = os.path.join(slot, 'version')
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(str(version))
+        os.replace(tmp_path, path)
+
+    def version(self, path):
+        """Versión actual del slot de `path` (0 si nunca se publicó)."""
+        return self._read_version(self.slot_dir(path))
+
+    @contextlib.contextmanager
+    def _locked(self, slot):
+        """Bloqueo exclusivo del slot entre procesos (y entre hilos)."""
+        os.makedirs(slot, exist_ok=True)
+        with open(os.path.join(slot, 'lock'), 'a+') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def info(self, path):
+        """
+        Metadatos de la versión publicada válida de `path`.
+
+        Args:
+            path: Ruta del CSV.
+
+        Returns:
+            dict o None: Metadatos, o None si no hay versión válida (nunca
+            publicada, invalidada o el CSV cambió).
+        """
+        slot = self.slot_dir(path)
+        version = self._read_version(slot)
+        if not version:
+            return None
+        try:
+            with open(os.path.join(slot, f"v{version}", METADATA_FILE), encoding='utf-8') as f:
+                metadata = json.load(f)
+            stat = os.stat(path)
+        except (OSError, ValueError):
+            return None
+        source = metadata.get('source', {})
+        if (metadata.get('format_version') != SHARED_FORMAT_VERSION
+                or source.get('size') != stat.st_size or source.get('mtime_ns') != stat.st_mtime_ns):
+            return None
+        return metadata
+
+    def publish(self, path, df):
+        """
+        Publicar `df` como la versión siguiente del slot de `path`.
+
+        Args:
+            path: Ruta del CSV del que procede `df`.
+            df: Dataset derivado.
+
+        Returns:
+            dict: Metadatos de la versión publicada.
+        """
+        slot = self.slot_dir(path)
+        with self._locked(slot):
+            return self._publish(slot, path, df)
+
+    def _publish(self, slot, path, df, stat=None):
+        """Escribir la versión siguiente (con el bloqueo del slot ya tomado)."""
+        stat = stat or os.stat(path)
+        version = self._read_version(slot) + 1
+        columns, objects = [], {}
+        tmp_path = os.path.join(slot, f"v{version}.tmp-{os.getpid()}")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        for i, name in enumerate(df.columns):
+            column = df[name]
+            strings = _as_shared_strings(column)
+            if strings is not None:
+                column = strings
+            entry = {'name': name, 'dtype': str(column.dtype), 'file': f"c{i}"}
+            if _is_numpy_column(column):
+                entry['kind'] = 'numpy'
+                np.save(os.path.join(tmp_path, f"c{i}.npy"), np.ascontiguousarray(column.to_numpy()))
+            elif _is_string_column(column):
+                values = _arrow_strings(column)
+                offsets = np.frombuffer(values.buffers()[1], dtype=np.int64)[values.offset:values.offset + len(values) + 1]
+                data = np.frombuffer(values.buffers()[2], dtype=np.uint8)[offsets[0]:offsets[-1]]
+                np.save(os.path.join(tmp_path, f"c{i}.offsets.npy"), offsets - offsets[0])
+                np.save(os.path.join(tmp_path, f"c{i}.data.npy"), data)
+                if values.null_count:
+                    valid = values.is_valid().to_numpy(zero_copy_only=False)
+                    np.save(os.path.join(tmp_path, f"c{i}.valid.npy"), np.packbits(valid, bitorder='little'))
+                entry.update(kind='string', null_count=values.null_count, storage=column.dtype.storage,
+                             na_value='NA' if column.dtype.na_value is pd.NA else 'nan')
+            else:
+                entry['kind'] = 'object'
+                objects[name] = column
+            columns.append(entry)
+
+        index = df.index
+        if isinstance(index, pd.RangeIndex):
+            index_spec = {'kind': 'range', 'start': index.start, 'stop': index.stop, 'step': index.step}
+        else:
+            index_spec = {'kind': 'object'}
+            objects['__index__'] = index
+        if objects:
+            pd.to_pickle(objects, os.path.join(tmp_path, OBJECTS_FILE))
+
+        metadata = {
+            'format_version': SHARED_FORMAT_VERSION,
+            'version': version,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'pid': os.getpid(),
+            'source': {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns},
+            'rows': len(df),
+            'index': index_spec,
+            'columns': columns,
+        }
+        with open(os.path.join(tmp_path, METADATA_FILE), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, indent=2, ensure_ascii=False)
+
+        version_dir = os.path.join(slot, f"v{version}")
+        shutil.rmtree(version_dir, ignore_errors=True)
+        os.replace(tmp_path, version_dir)
+        self._write_version(slot, version)
+
+        # Los archivos de versiones antiguas ya mapeados siguen siendo legibles
+        # tras borrarlos (POSIX); en Windows el borrado falla y se ignora
+        for entry in os.listdir(slot):
+            if entry.startswith('v') and entry[1:].isdigit() and int(entry[1:]) <= version - self.keep_versions:
+                shutil.rmtree(os.path.join(slot, entry), ignore_errors=True)
+        return metadata
+
+    def attach(self, path, metadata):
+        """
+        DataFrame cuyas columnas son vistas de una versión publicada.
+
+        Args:
+            path: Ruta del CSV.
+            metadata: Metadatos de la versión (de `info` o `publish`).
+
+        Returns:
+            DataFrame: Columnas mapeadas en solo lectura, sin consolidar.
+        """
+        import pyarrow as pa
+
+        version_dir = os.path.join(self.slot_dir(path), f"v{metadata['version']}")
+        objects = {}
+        if any(c['kind'] == 'object' for c in metadata['columns']) or metadata['index']['kind'] == 'object':
+            objects = pd.read_pickle(os.path.join(version_dir, OBJECTS_FILE))
+
+        spec = metadata['index']
+        if spec['kind'] == 'range':
+            index = pd.RangeIndex(spec['start'], spec['stop'], spec['step'])
+        else:
+            index = objects['__index__']
+
+        data = {}
+        for entry in metadata['columns']:
+            name, prefix = entry['name'], os.path.join(version_dir, entry['file'])
+            if entry['kind'] == 'numpy':
+                data[name] = _load_array(f"{prefix}.npy")
+            elif entry['kind'] == 'string':
+                offsets = _load_array(f"{prefix}.offsets.npy")
+                valid = _load_array(f"{prefix}.valid.npy") if entry['null_count'] else None
+                values = pa.Array.from_buffers(
+                    pa.large_string(), len(offsets) - 1,
+                    [pa.py_buffer(valid) if valid is not None else None,
+                     pa.py_buffer(offsets), pa.py_buffer(_load_array(f"{prefix}.data.npy"))],
+                    null_count=entry['null_count'])
+                # __from_arrow__ envuelve el array sin copiar los buffers mapeados
+                data[name] = _string_dtype(entry['storage'], entry['na_value']).__from_arrow__(values)
+            else:
+                data[name] = objects[name].array
+        # copy=False evita consolidar las columnas en bloques 2D (que las copiaría)
+        return pd.DataFrame(data, index=index, columns=[c['name'] for c in metadata['columns']], copy=False)
+
+    def load(self, path):
+        """
+        Dataset de `path` desde la versión publicada, publicándola si hace falta.
+
+        Args:
+            path: Ruta existente del CSV.
+
+        Returns:
+            DataFrame o None si el cargador no encuentra el archivo.
+
+        Raises:
+            DataLoadError: Propagado desde el cargador.
+        """
+        for _ in range(2):
+            metadata = self.info(path)
+            if metadata is None:
+                slot = self.slot_dir(path)
+                try:
+                    with self._locked(slot):
+                        # Otro proceso pudo publicarla mientras se esperaba el bloqueo
+                        metadata = self.info(path)
+                        if metadata is None:
+                            # El tamaño y mtime se toman antes de leer: si el CSV
+                            # cambia durante la lectura, la versión ya nace caducada
+                            stat = os.stat(path)
+                            df = self.loader(path)
+                            if df is None:
+                                return None
+                            metadata = self._publish(slot, path, df, stat)
+                except OSError as e:
+                    warnings.warn(f"No se pudo publicar el dataset compartido en {slot}: {e}")
+                    return self.loader(path)
+            try:
+                return self.attach(path, metadata)
+            except FileNotFoundError:
+                continue  # versión borrada tras publicarse otras dos; se relee la actual
+        return self.loader(path)
+
+    def invalidate(self, path=None):
+        """
+        Invalidar la versión publicada de `path` (o de todos los slots).
+
+        Los procesos la recargan desde el CSV en su siguiente acceso.
+
+        Args:
+            path: Ruta del CSV; si es None, todos los slots del directorio.
+        """
+        if path is not None:
+            slots = [self.slot_dir(path)]
+        elif os.path.isdir(self.directory):
+            slots = [os.path.join(self.directory, d) for d in os.listdir(self.directory)]
+        else:
+            slots = []
+        for slot in slots:
+            if os.path.isfile(os.path.join(slot, 'version')):
+                with self._locked(slot):
+                    self._write_version(slot, self._read_version(slot) + 1)
+
+
+def _directory_mb(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dataset de reseñas compartido entre procesos')
+    sub = parser.add_subparsers(dest='command', required=True)
+    for command, description in [('publish', 'Leer el CSV y publicar una versión nueva'),
+                                 ('info', 'Mostrar la versión publicada de un CSV'),
+                                 ('invalidate', 'Forzar la recarga en todos los procesos')]:
+        command_parser = sub.add_parser(command, help=description)
+        command_parser.add_argument('data', nargs='?', default=None, help='CSV de reseñas (por defecto, DATA_PATHS)')
+    parser.add_argument('--dir', default=SHARED_DATASET_DIR, help='Directorio de los datasets compartidos')
+    args = parser.parse_args()
+
+    from analytics import DataLoadError, load_reviews, resolve_data_path
+
+    store = SharedDatasetStore(args.dir, load_reviews)
+    path = resolve_data_path(args.data)
+    if args.command == 'invalidate' and args.data is None:
+        store.invalidate()
+        print(f"✅ Datasets de {args.dir} invalidados")
+        return
+    if path is None:
+        raise SystemExit("❌ No se encontró el CSV de reseñas")
+
+    if args.command == 'publish':
+        start = time.perf_counter()
+        try:
+            df = load_reviews(path)
+        except DataLoadError as e:
+            raise SystemExit(f"❌ {e}")
+        metadata = store.publish(path, df)
+        version_dir = os.path.join(store.slot_dir(path), f"v{metadata['version']}")
+        print(f"✅ Versión {metadata['version']} publicada en {version_dir} "
+              f"({metadata['rows']:,} filas, {_directory_mb(version_dir):,.1f} MB, "
+              f"{time.perf_counter() - start:.2f}s)")
+    elif args.command == 'info':
+        metadata = store.info(path)
+        if metadata is None:
+            print(f"ℹ️ Sin versión válida para {path} (contador: {store.version(path)})")
+            return
+        kinds = {}
+        for c in metadata['columns']:
+            kinds[c['kind']] = kinds.get(c['kind'], 0) + 1
+        print(f"📦 {path}: versión {metadata['version']} ({metadata['created_at']}, pid {metadata['pid']})")
+        print(f"   {metadata['rows']:,} filas; columnas: "
+              + ', '.join(f"{n} {kind}" for kind, n in sorted(kinds.items())))
+        start = time.perf_counter()
+        store.attach(path, metadata)
+        print(f"   adjuntar: {(time.perf_counter() - start) * 1000:.1f} ms")
+    else:
+        store.invalidate(path)
+        print(f"✅ Versión de {path} invalidada (contador: {store.version(path)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Generador de reseñas sintéticas con el esquema y las distribuciones del CSV real.
+
+Cada reseña sintética parte de una reseña real elegida al azar (bootstrap), de
+la que hereda conjuntamente las columnas estructuradas: calificación global y
+por aspecto, recomendación, país, tipo de viajero, asiento, ruta, verificación,
+etc. Así se conservan las distribuciones marginales y sus correlaciones. Sobre
+esa base:
+
+- 'Date Published' se desplaza hasta ±`DATE_JITTER_DAYS` días (dentro del rango
+  real) y 'Date Flown' mantiene el desfase en meses de la reseña de origen.
+- 'Comment' se compone con tantas frases como tenía el original, tomadas al
+  azar de reseñas del mismo rango de calificación; 'Comment title' sale de
+  otra reseña de ese rango. Los textos resultantes son distintos entre sí pero
+  con el vocabulario y la longitud del corpus real.
+
+Se escribe por bloques, de modo que 10M de filas no necesitan 10M en memoria.
+
+Uso:
+    python synthetic_reviews.py 1000000 --out synthetic_data/reviews_1000000.csv
+"""
+import argparse
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import SYNTHETIC_DATA_DIR, BATCH_CHUNK_SIZE
+
+DATE_JITTER_DAYS = 15
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+GENERATED_COLUMNS = ['Date Published', 'Date Flown', 'Comment title', 'Comment']
+
+
+def _rating_band(ratings):
+    """Rango de calificación: 0 negativo (<=4), 1 neutral (5-6), 2 positivo, 3 sin calificación."""
+    ratings = pd.to_numeric(ratings, errors='coerce').to_numpy()
+    return np.select([np.isnan(ratings), ratings <= 4, ratings <= 6], [3, 0, 1], default=2)
+
+
+class ReviewProfile:
+    """
+    Distribuciones del CSV real necesarias para generar reseñas.
+
+    Attributes:
+        source: Reseñas reales (columnas estructuradas).
+        columns: Orden de columnas del CSV real.
+        bands: Rango de calificación de cada reseña real.
+        sentences: Por rango, array de frases de sus comentarios.
+        titles: Por rango, array de títulos.
+        n_sentences: Frases del comentario de cada reseña real.
+        month_lag: Meses entre vuelo y publicación (NaN si no hay fecha de vuelo).
+    """
+
+    def __init__(self, source):
+        self.columns = list(source.columns)
+        self.source = source.reset_index(drop=True)
+        self.bands = _rating_band(self.source['Overall Rating'])
+
+        comments = self.source['Comment'].fillna('').astype(str).str.strip()
+        split = comments.map(lambda text: [s for s in SENTENCE_SPLIT.split(text) if s])
+        self.n_sentences = split.map(len).clip(lower=1).to_numpy()
+        self.sentences, self.titles = {}, {}
+        for band in range(4):
+            in_band = self.bands == band
+            pool = [s for sentences in split[in_band] for s in sentences]
+            self.sentences[band] = np.array(pool or [''], dtype=object)
+            self.titles[band] = self.source.loc[in_band, 'Comment title'].fillna('').to_numpy(dtype=object)
+
+        published = pd.to_datetime(self.source['Date Published'], errors='coerce')
+        flown = pd.to_datetime(self.source['Date Flown'], format='%B %Y', errors='coerce')
+        self.published = published
+        self.month_lag = ((published.dt.year - flown.dt.year) * 12 + (published.dt.month - flown.dt.month)).to_numpy()
+        self.date_range = (published.min(), published.max())
+
+    @classmethod
+    def from_csv(cls, path):
+        """Perfil a partir de un CSV de reseñas reales."""
+        return cls(pd.read_csv(path))
+
+    def sample(self, n_rows, rng, start_id=0):
+        """
+        Generar `n_rows` reseñas sintéticas.
+
+        Args:
+            n_rows: Filas a generar.
+            rng: np.random.Generator.
+            start_id: Valor inicial de la columna de índice del CSV.
+
+        Returns:
+            pd.DataFrame: Reseñas con las columnas del CSV real.
+        """
+        rows = rng.integers(0, len(self.source), n_rows)
+        df = self.source.iloc[rows].reset_index(drop=True)
+        bands = self.bands[rows]
+
+        jitter = pd.to_timedelta(rng.integers(-DATE_JITTER_DAYS, DATE_JITTER_DAYS + 1, n_rows), unit='D')
+        published = (self.published.iloc[rows].reset_index(drop=True) + jitter).clip(*self.date_range)
+        df['Date Published'] = published.dt.strftime('%Y-%m-%d')
+
+        lag = self.month_lag[rows]
+        flown_period = published.dt.to_period('M') - pd.Series(np.nan_to_num(lag).astype(int))
+        flown = flown_period.dt.to_timestamp().dt.strftime('%B %Y')
+        df['Date Flown'] = flown.where(~np.isnan(lag) & published.notna().to_numpy())
+
+        comments = np.empty(n_rows, dtype=object)
+        titles = np.empty(n_rows, dtype=object)
+        counts = self.n_sentences[rows]
+        for band in range(4):
+            in_band = np.flatnonzero(bands == band)
+            if not len(in_band):
+                continue
+            pool = self.sentences[band]
+            picks = pool[rng.integers(0, len(pool), counts[in_band].sum())]
+            bounds = np.concatenate([[0], np.cumsum(counts[in_band])])
+            comments[in_band] = [' '.join(picks[bounds[i]:bounds[i + 1]]) for i in range(len(in_band))]
+            titles[in_band] = self.titles[band][rng.integers(0, len(self.titles[band]), len(in_band))]
+        df['Comment'] = comments
+        df['Comment title'] = titles
+
+        df[self.columns[0]] = np.arange(start_id, start_id + n_rows)
+        return df[self.columns]
+
+
+def write_csv(profile, n_rows, path, seed=0, chunksize=BATCH_CHUNK_SIZE):
+    """
+    Escribir `n_rows` reseñas sintéticas en un CSV, por bloques.
+
+    Args:
+        profile: ReviewProfile del CSV real.
+        n_rows: Filas a generar.
+        path: CSV de salida.
+        seed: Semilla (misma semilla = mismo archivo).
+        chunksize: Filas por bloque.
+
+    Returns:
+        str: Ruta del CSV escrito.
+    """
+    rng = np.random.default_rng(seed)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    for start in range(0, n_rows, chunksize):
+        chunk = profile.sample(min(chunksize, n_rows - start), rng, start_id=start)
+        chunk = chunk.rename(columns={profile.columns[0]: ''}) if profile.columns[0].startswith('Unnamed') else chunk
+        chunk.to_csv(tmp_path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def synthetic_path(n_rows, seed=0, data_dir=SYNTHETIC_DATA_DIR):
+    """Ruta del CSV sintético de `n_rows` filas y semilla `seed`."""
+    return os.path.join(data_dir, f"reviews_{n_rows}_{seed}.csv")
+
+
+def ensure_synthetic(source_path, n_rows, seed=0, data_dir=SYNTHETIC_DATA_DIR):
+    """
+    Devolver el CSV sintético de `n_rows` filas, generándolo si no existe.
+
+    Args:
+        source_path: CSV real del que se toman las distribuciones.
+        n_rows: Filas del CSV sintético.
+        seed: Semilla.
+        data_dir: Directorio de los CSV sintéticos.
+
+    Returns:
+        str: Ruta del CSV.
+    """
+    path = synthetic_path(n_rows, seed, data_dir)
+    if not os.path.exists(path):
+        write_csv(ReviewProfile.from_csv(source_path), n_rows, path, seed)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generador de reseñas sintéticas')
+    parser.add_argument('rows', type=int, help='Filas a generar')
+    parser.add_argument('--source', default=None, help='CSV real (por defecto, DATA_PATHS)')
+    parser.add_argument('--out', default=None, help='CSV de salida (por defecto, en SYNTHETIC_DATA_DIR)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from analytics import resolve_data_path
+
+    source_path = resolve_data_path(args.source)
+    if source_path is None:
+        raise SystemExit("❌ No se encontró el CSV de reseñas")
+    out = args.out or synthetic_path(args.rows, args.seed)
+    start = time.perf_counter()
+    write_csv(ReviewProfile.from_csv(source_path), args.rows, out, args.seed)
+    print(f"✅ {args.rows:,} reseñas sintéticas en {out} ({time.perf_counter() - start:.1f}s, "
+          f"{os.path.getsize(out) / 1e6:,.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
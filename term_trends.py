@@ -0,0 +1,292 @@
+"""
+Frecuencia mensual de términos en los comentarios de las reseñas.
+
+Mantiene una matriz dispersa términos × 'Month_Published' con el número de
+reseñas del mes que mencionan cada término (más el total de reseñas por mes),
+de modo que la tendencia de cualquier palabra o los términos que más crecen
+en una ventana salen de cortes de filas y columnas de la matriz, sin volver a
+leer el texto.
+
+La matriz se construye al ingerir el CSV y se guarda junto al tamaño y el hash
+de los bytes procesados; cuando se añaden reseñas al final del archivo solo se
+tokenizan las filas nuevas y se suman a la matriz (igual que en
+`segment_benchmarks`).
+
+Uso:
+    python term_trends.py "ryanair_reviews (1).csv" --terms delay refund boarding
+"""
+import argparse
+import hashlib
+import json
+import os
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from config import TERM_TRENDS_DIR, TERM_TRENDS_STOPWORDS, BATCH_CHUNK_SIZE
+from text_index import tokenize, documents_from
+from ingest_cache import prefix_digest, read_rows
+
+
+def months_from(df):
+    """Mes de publicación ('YYYY-MM', o 'NaT') de cada reseña, igual que `analytics.derive_columns`."""
+    if 'Month_Published' in df.columns:
+        return df['Month_Published'].astype(str)
+    return pd.to_datetime(df['Date Published'], errors='coerce').dt.to_period('M').astype(str)
+
+
+class TermMonthMatrix:
+    """
+    Matriz dispersa de reseñas que mencionan cada término, por mes.
+
+    Attributes:
+        vocabulary: Términos (la fila i corresponde a `vocabulary[i]`).
+        months: Meses ordenados (columnas).
+        counts: scipy.sparse.csr_matrix términos × meses.
+        totals: Reseñas por mes (np.ndarray alineado con `months`).
+    """
+
+    def __init__(self, vocabulary=None, months=None, counts=None, totals=None):
+        from scipy import sparse
+
+        self.vocabulary = list(vocabulary or [])
+        self.months = list(months or [])
+        self.counts = counts if counts is not None else sparse.csr_matrix((0, 0), dtype=np.int64)
+        self.totals = np.asarray(totals if totals is not None else [], dtype=np.int64)
+        self._ids = {term: i for i, term in enumerate(self.vocabulary)}
+
+    def __contains__(self, term):
+        return term in self._ids
+
+    def add(self, documents, months):
+        """
+        Sumar un bloque de reseñas a la matriz.
+
+        Args:
+            documents: Textos de las reseñas.
+            months: Mes de cada reseña ('NaT' se ignora).
+        """
+        from scipy import sparse
+
+        months = np.asarray(months, dtype=str)
+        dated = months != 'NaT'
+        new_months = sorted(set(self.months).union(months[dated]))
+        month_ids = {month: j for j, month in enumerate(new_months)}
+
+        term_ids, month_cols = array('i'), array('i')
+        for doc, month in zip(np.asarray(documents, dtype=object)[dated], months[dated]):
+            unique = set(tokenize(doc))
+            term_ids.extend(self._ids.setdefault(term, len(self._ids)) for term in unique)
+            month_cols.extend([month_ids[month]] * len(unique))
+        self.vocabulary = list(self._ids)
+
+        shape = (len(self.vocabulary), len(new_months))
+        remap = np.array([month_ids[month] for month in self.months], dtype=np.int64)
+        old = self.counts.tocoo()
+        rows = np.concatenate([old.row, np.frombuffer(term_ids, dtype=np.int32)])
+        cols = np.concatenate([remap[old.col] if len(old.col) else old.col, np.frombuffer(month_cols, dtype=np.int32)])
+        data = np.concatenate([old.data, np.ones(len(term_ids), dtype=np.int64)])
+        self.counts = sparse.coo_matrix((data, (rows, cols)), shape=shape).tocsr()
+
+        totals = np.zeros(len(new_months), dtype=np.int64)
+        totals[remap] = self.totals
+        np.add.at(totals, [month_ids[month] for month in months[dated]], 1)
+        self.totals, self.months = totals, new_months
+
+    def _columns(self, months=None):
+        """Índices de columna de `months` (todas si es None)."""
+        if months is None:
+            return np.arange(len(self.months))
+        wanted = set(map(str, months))
+        return np.array([j for j, month in enumerate(self.months) if month in wanted], dtype=np.int64)
+
+    def trend(self, terms, months=None):
+        """
+        Porcentaje mensual de reseñas que mencionan cada término.
+
+        Args:
+            terms: Palabras a consultar (se normalizan como en el índice).
+            months: Meses a incluir (por defecto, todos).
+
+        Returns:
+            pd.DataFrame: Meses × términos; los términos desconocidos valen 0.
+        """
+        cols = self._columns(months)
+        keys = [' '.join(tokenize(term)) for term in terms]
+        rows = [self._ids.get(key, -1) for key in keys]
+        known = [r for r in rows if r >= 0]
+        sliced = self.counts[known][:, cols].toarray() if known else np.zeros((0, len(cols)))
+        values = np.zeros((len(keys), len(cols)))
+        values[[i for i, r in enumerate(rows) if r >= 0]] = sliced
+        totals = np.maximum(self.totals[cols], 1)
+        return pd.DataFrame((values / totals * 100).T, index=[self.months[j] for j in cols], columns=keys)
+
+    def rising_terms(self, window=6, months=None, top_n=10, min_reviews=5):
+        """
+        Términos cuya cuota de reseñas más crece en los últimos `window` meses.
+
+        Se excluyen las stopwords en inglés, `TERM_TRENDS_STOPWORDS` y los números.
+
+        Args:
+            window: Meses de cada ventana (reciente y anterior).
+            months: Meses a considerar (por defecto, todos); la ventana reciente
+                son los últimos `window` de ellos.
+            top_n: Términos a devolver.
+            min_reviews: Reseñas mínimas que mencionan el término en la ventana reciente.
+
+        Returns:
+            pd.DataFrame: 'Término', '% reciente', '% anterior' y 'Cambio (pp)',
+            ordenado por cambio descendente.
+        """
+        from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+        cols = self._columns(months)
+        recent, previous = cols[-window:], cols[-2 * window:-window]
+        empty = pd.DataFrame(columns=['Término', '% reciente', '% anterior', 'Cambio (pp)'])
+        if not len(recent) or not len(previous):
+            return empty
+        recent_counts = np.asarray(self.counts[:, recent].sum(axis=1)).ravel()
+        previous_counts = np.asarray(self.counts[:, previous].sum(axis=1)).ravel()
+        recent_share = recent_counts / max(self.totals[recent].sum(), 1) * 100
+        previous_share = previous_counts / max(self.totals[previous].sum(), 1) * 100
+        change = recent_share - previous_share
+
+        excluded = ENGLISH_STOP_WORDS.union(TERM_TRENDS_STOPWORDS)
+        candidates = np.array([i for i in np.flatnonzero(recent_counts >= min_reviews)
+                               if self.vocabulary[i] not in excluded and not self.vocabulary[i].isdigit()],
+                              dtype=np.int64)
+        if not len(candidates):
+            return empty
+        order = candidates[np.argsort(-change[candidates], kind='stable')[:top_n]]
+        return pd.DataFrame({
+            'Término': [self.vocabulary[i] for i in order],
+            '% reciente': recent_share[order],
+            '% anterior': previous_share[order],
+            'Cambio (pp)': change[order],
+        })
+
+    def save(self, path, **metadata):
+        """
+        Guardar la matriz como `.npz` (escritura atómica).
+
+        Args:
+            path: Ruta del archivo.
+            **metadata: Datos extra serializables a JSON (p. ej. offsets del CSV).
+        """
+        counts = self.counts.tocsr()
+        tmp_path = f"{path}.tmp-{os.getpid()}.npz"
+        np.savez(tmp_path, vocabulary=np.asarray(self.vocabulary, dtype=str),
+                 months=np.asarray(self.months, dtype=str), totals=self.totals,
+                 data=counts.data, indices=counts.indices, indptr=counts.indptr,
+                 shape=np.asarray(counts.shape), metadata=json.dumps(metadata))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Cargar una matriz guardada con `save`.
+
+        Returns:
+            tuple: (TermMonthMatrix, dict de metadatos).
+        """
+        from scipy import sparse
+
+        with np.load(path) as data:
+            counts = sparse.csr_matrix((data['data'], data['indices'], data['indptr']), shape=tuple(data['shape']))
+            matrix = cls(data['vocabulary'].tolist(), data['months'].tolist(), counts, data['totals'])
+            return matrix, json.loads(str(data['metadata']))
+
+
+def build(df, chunksize=BATCH_CHUNK_SIZE):
+    """
+    Construir la matriz a partir de un DataFrame de reseñas en memoria.
+
+    Args:
+        df: Reseñas con columnas de texto y 'Month_Published' o 'Date Published'.
+        chunksize: Filas por bloque.
+
+    Returns:
+        TermMonthMatrix: Matriz de las reseñas.
+    """
+    matrix = TermMonthMatrix()
+    for start in range(0, len(df), chunksize):
+        chunk = df.iloc[start:start + chunksize]
+        matrix.add(documents_from(chunk), months_from(chunk))
+    return matrix
+
+
+def _cache_path(data_path, cache_dir):
+    key = hashlib.sha1(os.path.abspath(data_path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{key}.npz")
+
+
+def load_or_update(data_path, cache_dir=TERM_TRENDS_DIR, chunksize=BATCH_CHUNK_SIZE):
+    """
+    Obtener la matriz del CSV, tokenizando solo las reseñas que falten.
+
+    - Si el archivo no ha cambiado (tamaño y fecha), se carga la guardada.
+    - Si ha crecido y los bytes ya procesados son idénticos, solo se leen las
+      filas nuevas y se suman.
+    - En otro caso se reconstruye desde cero.
+
+    Args:
+        data_path: CSV de reseñas.
+        cache_dir: Directorio donde se guardan las matrices.
+        chunksize: Filas por bloque.
+
+    Returns:
+        tuple: (TermMonthMatrix, dict con 'rows_processed' y 'mode':
+        'cached', 'incremental' o 'full').
+    """
+    stat = os.stat(data_path)
+    cache_path = _cache_path(data_path, cache_dir)
+    matrix, cached = None, None
+    if os.path.exists(cache_path):
+        matrix, cached = TermMonthMatrix.load(cache_path)
+
+    if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+        return matrix, {'rows_processed': 0, 'mode': 'cached'}
+
+    offset, mode = 0, 'full'
+    if (cached and stat.st_size > cached['size']
+            and prefix_digest(data_path, cached['size']) == cached['prefix_sha']):
+        offset, mode = cached['size'], 'incremental'
+    else:
+        matrix = TermMonthMatrix()
+
+    rows = 0
+    for chunk in read_rows(data_path, offset, chunksize):
+        matrix.add(documents_from(chunk), months_from(chunk))
+        rows += len(chunk)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    matrix.save(cache_path, data_path=os.path.abspath(data_path), size=stat.st_size,
+                mtime_ns=stat.st_mtime_ns, prefix_sha=prefix_digest(data_path, stat.st_size))
+    return matrix, {'rows_processed': rows, 'mode': mode}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Frecuencia mensual de términos en los comentarios')
+    parser.add_argument('data', nargs='?', default=None, help='CSV de reseñas (por defecto, DATA_PATHS)')
+    parser.add_argument('--terms', nargs='*', default=['delay', 'refund', 'boarding'], help='Términos a mostrar')
+    parser.add_argument('--window', type=int, default=6, help='Meses de la ventana de términos en alza')
+    parser.add_argument('--cache', default=TERM_TRENDS_DIR, help='Directorio de caché')
+    args = parser.parse_args()
+
+    from analytics import resolve_data_path
+
+    data_path = resolve_data_path(args.data)
+    if data_path is None:
+        raise SystemExit("❌ No se encontró el CSV de reseñas")
+    matrix, info = load_or_update(data_path, args.cache)
+    print(f"✅ {info['rows_processed']:,} filas procesadas ({info['mode']}); "
+          f"{len(matrix.vocabulary):,} términos × {len(matrix.months)} meses, {matrix.counts.nnz:,} celdas")
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(matrix.trend(args.terms).tail(12).round(1))
+        print(f"\nTérminos en alza (últimos {args.window} meses):")
+        print(matrix.rising_terms(args.window).round(2).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
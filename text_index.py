@@ -0,0 +1,314 @@
+"""
+Índice invertido de texto completo sobre los comentarios de las reseñas.
+
+Tokeniza 'Comment title' y 'Comment' (minúsculas, sin acentos, solo letras y
+dígitos) y guarda, para cada término y para cada par de términos consecutivos
+del mismo campo (un par no une el final del título con el comentario),
+la lista ordenada de posiciones de fila que lo contienen en formato CSR: un
+vocabulario ordenado, un array de offsets y un array de postings. Se construye una vez por versión del corpus (hash del
+contenido de las columnas de texto) y se persiste como `.npz`.
+
+Sintaxis de consulta:
+    baggage fees        Todas las palabras (AND).
+    "priority boarding" Frase exacta (índice de bigramas).
+    bag*                Prefijo: cualquier término que empiece por 'bag'.
+
+Uso:
+    python text_index.py "ryanair_reviews (1).csv" 'baggage "priority boarding"'
+"""
+import argparse
+import hashlib
+import os
+import re
+import shlex
+import time
+import unicodedata
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from config import TEXT_INDEX_DIR, TEXT_COLUMNS
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# Separa los campos de un documento: los pares de términos no lo cruzan
+FIELD_SEPARATOR = '\x1f'
+
+
+def normalize(text):
+    """Pasar a minúsculas y eliminar acentos."""
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    return text.encode('ascii', 'ignore').decode('ascii')
+
+
+def tokenize(text):
+    """
+    Dividir un texto en términos normalizados.
+
+    Args:
+        text: Texto de entrada.
+
+    Returns:
+        list: Términos en orden de aparición.
+    """
+    return TOKEN_PATTERN.findall(normalize(text))
+
+
+def documents_from(df, columns=TEXT_COLUMNS):
+    """
+    Concatenar las columnas de texto de cada reseña, separadas por `FIELD_SEPARATOR`.
+
+    Args:
+        df: DataFrame de reseñas.
+        columns: Columnas de texto a indexar.
+
+    Returns:
+        pd.Series: Un documento por fila (en el orden posicional de `df`).
+    """
+    present = [col for col in columns if col in df.columns]
+    if not present:
+        return pd.Series([''] * len(df), index=df.index)
+    return df[present].fillna('').astype(str).agg(f" {FIELD_SEPARATOR} ".join, axis=1)
+
+
+def corpus_version(documents):
+    """
+    Identificar la versión del corpus por el hash de su contenido.
+
+    Args:
+        documents: Serie de documentos.
+
+    Returns:
+        str: Primeros 16 caracteres del SHA-1 de los hashes por fila.
+    """
+    row_hashes = pd.util.hash_pandas_object(documents.reset_index(drop=True), index=True).to_numpy()
+    return hashlib.sha1(row_hashes.tobytes()).hexdigest()[:16]
+
+
+def _bigrams(terms):
+    """Pares de términos consecutivos ('priority boarding')."""
+    return [f"{a} {b}" for a, b in zip(terms, terms[1:])]
+
+
+def term_pairs(document):
+    """
+    Pares de términos consecutivos dentro de cada campo de un documento.
+
+    El último término del título y el primero del comentario no forman par.
+
+    Args:
+        document: Texto de `documents_from`.
+
+    Returns:
+        list: Pares en orden de aparición.
+    """
+    return [pair for field in str(document).split(FIELD_SEPARATOR) for pair in _bigrams(tokenize(field))]
+
+
+def _csr(term_lists):
+    """
+    Postings en formato CSR a partir de los términos de cada documento.
+
+    Los términos se convierten a ids enteros sobre la marcha y los pares
+    (término, documento) se acumulan en arrays compactos, de modo que la
+    memoria crece con el número de postings y no con el de strings.
+
+    Args:
+        term_lists: Iterable (una entrada por documento) de listas de términos.
+
+    Returns:
+        tuple: (vocabulario ordenado, offsets, postings int32).
+    """
+    ids, term_ids, doc_ids = {}, array('i'), array('i')
+    for doc, terms in enumerate(term_lists):
+        unique = set(terms)
+        term_ids.extend(ids.setdefault(term, len(ids)) for term in unique)
+        doc_ids.extend([doc] * len(unique))
+    if not ids:
+        return np.array([], dtype=str), np.zeros(1, dtype=np.int64), np.array([], dtype=np.int32)
+
+    vocabulary = np.array(list(ids), dtype=str)
+    order = np.argsort(vocabulary)
+    rank = np.empty(len(order), dtype=np.int32)
+    rank[order] = np.arange(len(order), dtype=np.int32)
+    terms = rank[np.frombuffer(term_ids, dtype=np.int32)]
+    docs = np.frombuffer(doc_ids, dtype=np.int32)
+    by_term = np.lexsort((docs, terms))
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(terms, minlength=len(order)))]).astype(np.int64)
+    return vocabulary[order], offsets, docs[by_term]
+
+
+def _lookup(vocabulary, offsets, postings, term):
+    """Filas de `term` en una tabla CSR (vacío si no está)."""
+    t = np.searchsorted(vocabulary, term)
+    if t < len(vocabulary) and vocabulary[t] == term:
+        return postings[offsets[t]:offsets[t + 1]]
+    return np.array([], dtype=np.int32)
+
+
+class TextIndex:
+    """
+    Índice invertido en formato CSR.
+
+    Hay dos tablas con la misma estructura: términos sueltos y pares de
+    términos consecutivos. Una frase de dos palabras se resuelve con una sola
+    lista de bigramas; las más largas, intersecando sus bigramas (y, si se
+    pasan los documentos, verificando el orden exacto en los candidatos).
+
+    Attributes:
+        vocabulary: Términos ordenados (array de str).
+        offsets: `postings[offsets[t]:offsets[t + 1]]` son las filas del término t.
+        postings: Posiciones de fila (int32), ordenadas dentro de cada término.
+        bigram_vocabulary, bigram_offsets, bigram_postings: Lo mismo para bigramas.
+        n_docs: Número de documentos indexados.
+        version: Versión del corpus.
+    """
+
+    ARRAYS = ('vocabulary', 'offsets', 'postings', 'bigram_vocabulary', 'bigram_offsets', 'bigram_postings')
+
+    def __init__(self, vocabulary, offsets, postings, bigram_vocabulary, bigram_offsets, bigram_postings,
+                 n_docs, version=None):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.postings = postings
+        self.bigram_vocabulary = bigram_vocabulary
+        self.bigram_offsets = bigram_offsets
+        self.bigram_postings = bigram_postings
+        self.n_docs = int(n_docs)
+        self.version = version
+
+    @classmethod
+    def build(cls, documents, version=None):
+        """
+        Construir el índice a partir de los documentos.
+
+        Args:
+            documents: Serie de documentos (uno por fila).
+            version: Versión del corpus.
+
+        Returns:
+            TextIndex: Índice construido.
+        """
+        unigrams = _csr(tokenize(doc) for doc in documents)
+        bigrams = _csr(term_pairs(doc) for doc in documents)
+        return cls(*unigrams, *bigrams, len(documents), version)
+
+    def save(self, path):
+        """Guardar el índice como `.npz` (escritura atómica)."""
+        tmp_path = f"{path}.tmp-{os.getpid()}.npz"
+        np.savez(tmp_path, n_docs=self.n_docs, version=str(self.version),
+                 **{name: getattr(self, name) for name in self.ARRAYS})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Cargar un índice guardado con `save`."""
+        with np.load(path) as data:
+            return cls(*(data[name] for name in cls.ARRAYS), int(data['n_docs']), str(data['version']))
+
+    def _term_rows(self, term):
+        """Filas que contienen exactamente `term`."""
+        return _lookup(self.vocabulary, self.offsets, self.postings, term)
+
+    def _prefix_rows(self, prefix):
+        """Filas que contienen algún término que empiece por `prefix`."""
+        start = np.searchsorted(self.vocabulary, prefix)
+        end = np.searchsorted(self.vocabulary, prefix + '\uffff')
+        if start == end:
+            return np.array([], dtype=np.int32)
+        return np.unique(self.postings[self.offsets[start]:self.offsets[end]])
+
+    def search(self, query, documents=None):
+        """
+        Resolver una consulta a posiciones de fila.
+
+        Args:
+            query: Palabras, frases entre comillas y prefijos con '*'.
+            documents: Documentos originales; si se pasan, las frases de tres
+                o más palabras se verifican en los candidatos.
+
+        Returns:
+            np.ndarray: Posiciones de fila ordenadas (int32). Una consulta vacía
+            devuelve todas las filas.
+        """
+        try:
+            clauses = shlex.split(query)
+        except ValueError:
+            clauses = query.replace('"', ' ').split()
+
+        row_sets, phrases = [], []
+        for clause in clauses:
+            if clause.endswith('*') and ' ' not in clause:
+                prefix = ''.join(tokenize(clause[:-1]))
+                if prefix:
+                    row_sets.append(self._prefix_rows(prefix))
+                continue
+            terms = tokenize(clause)
+            if len(terms) == 1:
+                row_sets.append(self._term_rows(terms[0]))
+            elif terms:
+                row_sets.extend(_lookup(self.bigram_vocabulary, self.bigram_offsets, self.bigram_postings, bigram)
+                                for bigram in _bigrams(terms))
+                if len(terms) > 2:
+                    phrases.append(terms)
+
+        if not row_sets:
+            return np.arange(self.n_docs, dtype=np.int32)
+        row_sets.sort(key=len)
+        rows = row_sets[0]
+        for other in row_sets[1:]:
+            if not len(rows):
+                break
+            rows = np.intersect1d(rows, other, assume_unique=True)
+
+        if phrases and documents is not None and len(rows):
+            gap = f"[^a-z0-9{FIELD_SEPARATOR}]+"
+            patterns = [re.compile(r"\b" + gap.join(terms) + r"\b") for terms in phrases]
+            keep = [all(p.search(normalize(text)) for p in patterns) for text in documents.iloc[rows]]
+            rows = rows[np.asarray(keep, dtype=bool)]
+        return rows
+
+
+def load_or_build(documents, index_dir=TEXT_INDEX_DIR):
+    """
+    Cargar el índice de esta versión del corpus o construirlo y persistirlo.
+
+    Args:
+        documents: Serie de documentos (ver `documents_from`).
+        index_dir: Directorio donde se guardan los índices.
+
+    Returns:
+        TextIndex: Índice de la versión actual.
+    """
+    version = corpus_version(documents)
+    path = os.path.join(index_dir, f"{version}.npz")
+    if os.path.exists(path):
+        return TextIndex.load(path)
+    index = TextIndex.build(documents, version)
+    os.makedirs(index_dir, exist_ok=True)
+    index.save(path)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Índice invertido de los comentarios')
+    parser.add_argument('data', help='CSV de reseñas')
+    parser.add_argument('query', nargs='?', default='', help='Consulta a resolver')
+    parser.add_argument('--index-dir', default=TEXT_INDEX_DIR, help='Directorio de índices')
+    args = parser.parse_args()
+
+    documents = documents_from(pd.read_csv(args.data, usecols=lambda c: c in TEXT_COLUMNS))
+    start = time.perf_counter()
+    index = load_or_build(documents, args.index_dir)
+    print(f"✅ Índice {index.version}: {len(index.vocabulary):,} términos, "
+          f"{len(index.postings):,} postings ({time.perf_counter() - start:.2f}s)")
+    if args.query:
+        start = time.perf_counter()
+        rows = index.search(args.query, documents)
+        print(f"🔎 '{args.query}': {len(rows):,} reseñas en {(time.perf_counter() - start) * 1000:.2f} ms")
+        for row in rows[:5]:
+            print(f"   [{row}] {documents.iloc[row][:120].replace(FIELD_SEPARATOR, '|')!r}")
+
+
+if __name__ == "__main__":
+    main()
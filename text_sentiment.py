@@ -0,0 +1,198 @@
+"""
+Sentimiento del texto de los comentarios con un léxico local.
+
+`Sentiment` en `load_data` se deriva solo de 'Overall Rating', así que las
+reseñas sin calificación quedan como "Desconocido". Este módulo puntúa el
+propio 'Comment' en [-1, 1] con `SENTIMENT_LEXICON` (palabras y pares de
+palabras), invirtiendo el peso tras una negación cercana y reforzándolo tras
+un intensificador, y lo clasifica en Positivo / Neutral / Negativo.
+
+Las puntuaciones se guardan por hash del texto de cada fila: al recargar solo
+se puntúan las reseñas nuevas o modificadas, por lotes en un pool de procesos.
+
+Uso:
+    python text_sentiment.py "ryanair_reviews (1).csv" --workers 4
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    SENTIMENT_LEXICON, SENTIMENT_NEGATIONS, SENTIMENT_INTENSIFIERS, SENTIMENT_TEXT_THRESHOLD,
+    SENTIMENT_CACHE_DIR, SENTIMENT_BATCH_SIZE, SENTIMENT_CATEGORIES
+)
+from text_index import tokenize
+
+TEXT_COLUMN = 'Comment'
+SCORE_COLUMN = 'Text Sentiment Score'
+LABEL_COLUMN = 'Text Sentiment'
+
+NEGATION_WINDOW = 3
+NEGATION_FACTOR = -0.74
+INTENSIFIER_FACTOR = 1.3
+NORMALIZATION_ALPHA = 15
+
+_NEGATIONS = frozenset(SENTIMENT_NEGATIONS)
+_INTENSIFIERS = frozenset(SENTIMENT_INTENSIFIERS)
+
+
+def score_text(text):
+    """
+    Puntuar el sentimiento de un texto.
+
+    Args:
+        text: Texto del comentario.
+
+    Returns:
+        float: Puntuación en [-1, 1] (0 si no hay términos del léxico).
+    """
+    tokens = tokenize(text)
+    total, i = 0.0, 0
+    while i < len(tokens):
+        bigram = f"{tokens[i]} {tokens[i + 1]}" if i + 1 < len(tokens) else None
+        if bigram in SENTIMENT_LEXICON:
+            weight, width = SENTIMENT_LEXICON[bigram], 2
+        else:
+            weight, width = SENTIMENT_LEXICON.get(tokens[i]), 1
+        if weight is not None:
+            if i > 0 and tokens[i - 1] in _INTENSIFIERS:
+                weight *= INTENSIFIER_FACTOR
+            if not _NEGATIONS.isdisjoint(tokens[max(0, i - NEGATION_WINDOW):i]):
+                weight *= NEGATION_FACTOR
+            total += weight
+        i += width
+    return total / math.sqrt(total * total + NORMALIZATION_ALPHA)
+
+
+def score_batch(texts):
+    """Puntuar una lista de textos (unidad de trabajo del pool)."""
+    return np.array([score_text(text) for text in texts], dtype=np.float32)
+
+
+def label(scores, threshold=SENTIMENT_TEXT_THRESHOLD):
+    """
+    Clasificar puntuaciones en Positivo / Neutral / Negativo.
+
+    Args:
+        scores: Puntuaciones en [-1, 1] (NaN = sin texto).
+        threshold: Umbral absoluto para considerar el texto polarizado.
+
+    Returns:
+        np.ndarray: Etiquetas de `SENTIMENT_CATEGORIES`.
+    """
+    scores = np.asarray(scores, dtype=float)
+    return np.select(
+        [np.isnan(scores), scores >= threshold, scores <= -threshold],
+        [SENTIMENT_CATEGORIES['unknown'], SENTIMENT_CATEGORIES['positive'], SENTIMENT_CATEGORIES['negative']],
+        default=SENTIMENT_CATEGORIES['neutral'],
+    )
+
+
+def score_texts(texts, workers=None, batch_size=SENTIMENT_BATCH_SIZE):
+    """
+    Puntuar textos por lotes, en un pool de procesos si hay más de un lote.
+
+    Args:
+        texts: Lista de textos.
+        workers: Número de procesos (por defecto, todos los cores).
+        batch_size: Textos por lote.
+
+    Returns:
+        np.ndarray: Puntuaciones float32 en el orden de `texts`.
+    """
+    workers = workers or os.cpu_count() or 1
+    batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+    if not batches:
+        return np.zeros(0, dtype=np.float32)
+    if workers == 1 or len(batches) == 1:
+        return np.concatenate([score_batch(batch) for batch in batches])
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+        return np.concatenate(list(executor.map(score_batch, batches)))
+
+
+def row_hashes(texts):
+    """Hash de 64 bits del texto de cada fila (estable entre ejecuciones)."""
+    return pd.util.hash_pandas_object(pd.Series(texts, dtype=object).fillna(''), index=False).to_numpy()
+
+
+def lexicon_digest():
+    """Hash corto del léxico y los parámetros (cambiarlos invalida la caché)."""
+    payload = json.dumps([SENTIMENT_LEXICON, SENTIMENT_NEGATIONS, SENTIMENT_INTENSIFIERS, NEGATION_WINDOW,
+                          NEGATION_FACTOR, INTENSIFIER_FACTOR, NORMALIZATION_ALPHA], sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:8]
+
+
+def load_or_score(texts, cache_dir=SENTIMENT_CACHE_DIR, workers=None, batch_size=SENTIMENT_BATCH_SIZE):
+    """
+    Puntuaciones de todas las filas, puntuando solo los textos que no estén en caché.
+
+    Args:
+        texts: Textos de los comentarios (Serie o lista; los vacíos dan NaN).
+        cache_dir: Directorio de la caché (hash del texto -> puntuación).
+        workers: Procesos del pool.
+        batch_size: Textos por lote.
+
+    Returns:
+        tuple: (puntuaciones float32 por fila, dict con 'scored' y 'cached').
+    """
+    texts = pd.Series(texts, dtype=object).fillna('').astype(str).reset_index(drop=True)
+    hashes = row_hashes(texts)
+    path = os.path.join(cache_dir, f"{lexicon_digest()}.npz")
+
+    cached_hashes, cached_scores = np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.float32)
+    if os.path.exists(path):
+        with np.load(path) as data:
+            cached_hashes, cached_scores = data['hashes'], data['scores']
+
+    pos = np.minimum(np.searchsorted(cached_hashes, hashes), max(len(cached_hashes) - 1, 0))
+    found = (cached_hashes[pos] == hashes) if len(cached_hashes) else np.zeros(len(hashes), dtype=bool)
+    missing_hashes, first = np.unique(hashes[~found], return_index=True)
+    missing_rows = np.flatnonzero(~found)[first]
+
+    if len(missing_rows):
+        new_scores = score_texts(texts.iloc[missing_rows].tolist(), workers, batch_size)
+        merged_hashes = np.concatenate([cached_hashes, missing_hashes])
+        merged_scores = np.concatenate([cached_scores, new_scores])
+        order = np.argsort(merged_hashes, kind='stable')
+        cached_hashes, cached_scores = merged_hashes[order], merged_scores[order]
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}.npz"
+        np.savez(tmp_path, hashes=cached_hashes, scores=cached_scores)
+        os.replace(tmp_path, path)
+
+    scores = cached_scores[np.searchsorted(cached_hashes, hashes)].astype(np.float32)
+    scores[(texts.str.strip() == '').to_numpy()] = np.nan
+    return scores, {'scored': int(len(missing_rows)), 'cached': int(found.sum())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sentimiento del texto de los comentarios')
+    parser.add_argument('data', help='CSV de reseñas')
+    parser.add_argument('--workers', type=int, default=None, help='Procesos (por defecto, todos los cores)')
+    parser.add_argument('--batch-size', type=int, default=SENTIMENT_BATCH_SIZE, help='Textos por lote')
+    parser.add_argument('--cache', default=SENTIMENT_CACHE_DIR, help='Directorio de caché')
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    start = time.perf_counter()
+    scores, info = load_or_score(df[TEXT_COLUMN], args.cache, args.workers, args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {info['scored']:,} textos puntuados, {info['cached']:,} desde caché ({elapsed:.2f}s)")
+
+    labels = pd.Series(label(scores), name=LABEL_COLUMN)
+    print(labels.value_counts().to_string())
+    if 'Overall Rating' in df.columns:
+        rated = df['Overall Rating'].notna().to_numpy() & ~np.isnan(scores)
+        corr = np.corrcoef(scores[rated], df['Overall Rating'].to_numpy()[rated])[0, 1]
+        print(f"Correlación con 'Overall Rating': {corr:.3f}")
+
+
+if __name__ == "__main__":
+    main()
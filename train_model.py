@@ -0,0 +1,218 @@
+"""
+Entrenamiento reproducible del modelo de recomendación de Ryanair.
+
+Extrae del notebook `ml_recommendation_prediction.ipynb` el pipeline del
+Random Forest para poder ejecutarlo sin interfaz:
+
+1. Lee la matriz de features del almacén (`ml_features`), que se materializa
+   con las derivaciones de `analytics.load_reviews` la primera vez que se usa cada
+   versión del dataset.
+2. Aplica la partición 80/20 del notebook.
+3. Busca hiperparámetros con successive halving (`HalvingGridSearchCV`): todos
+   los candidatos empiezan con una muestra reducida (al menos
+   `ML_HALVING_MIN_RESOURCES` filas) y solo el mejor tercio de cada ronda pasa
+   a la siguiente con más datos. Los folds se evalúan en paralelo
+   en todos los cores.
+4. Evalúa el mejor modelo en test y escribe el pickle, el artefacto versionado
+   (con métricas e importancias) y un JSON de métricas.
+
+Uso:
+    python train_model.py --data "ryanair_reviews (1).csv"
+    python train_model.py --no-search   # hiperparámetros fijos del notebook
+    python train_model.py --register --promote   # publicar en el registro de la app
+"""
+import argparse
+import json
+import pickle
+import time
+from datetime import datetime
+
+import numpy as np
+
+from config import (
+    MODEL_PATH, MODEL_ARTIFACT_PATH, METRICS_PATH, ML_RANDOM_STATE, ML_RF_PARAMS,
+    ML_PARAM_GRID, ML_CV_FOLDS, ML_HALVING_FACTOR, ML_HALVING_MIN_RESOURCES
+)
+from ml_utils import split_train_test
+from ml_features import load_or_materialize
+
+
+def search_hyperparameters(X_train, y_train, param_grid=ML_PARAM_GRID, cv=ML_CV_FOLDS,
+                           factor=ML_HALVING_FACTOR, min_resources=ML_HALVING_MIN_RESOURCES,
+                           n_jobs=-1):
+    """
+    Buscar hiperparámetros con successive halving sobre validación cruzada.
+
+    Args:
+        X_train: Matriz de features de entrenamiento.
+        y_train: Target de entrenamiento.
+        param_grid: Rejilla de hiperparámetros del Random Forest.
+        cv: Número de folds estratificados.
+        factor: Proporción de candidatos descartados en cada ronda.
+        min_resources: Filas de la primera ronda (se limita al tamaño de `X_train`).
+        n_jobs: Procesos en paralelo (-1 = todos los cores).
+
+    Returns:
+        tuple: (mejor modelo reentrenado con todo `X_train`, resumen con los
+        mejores parámetros, la puntuación de validación y los candidatos por ronda).
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+    from sklearn.model_selection import HalvingGridSearchCV, StratifiedKFold
+
+    base = RandomForestClassifier(class_weight=ML_RF_PARAMS['class_weight'],
+                                  random_state=ML_RANDOM_STATE)
+    search = HalvingGridSearchCV(
+        base, param_grid,
+        factor=factor,
+        min_resources=min(min_resources, len(X_train)),
+        cv=StratifiedKFold(n_splits=cv, shuffle=True, random_state=ML_RANDOM_STATE),
+        scoring='roc_auc',
+        n_jobs=n_jobs,
+        random_state=ML_RANDOM_STATE,
+    )
+    search.fit(X_train, y_train)
+    summary = {
+        'strategy': 'successive_halving',
+        'best_params': search.best_params_,
+        'cv_roc_auc': float(search.best_score_),
+        'n_candidates': [int(n) for n in search.n_candidates_],
+        'n_resources': [int(n) for n in search.n_resources_],
+        'cv_folds': cv,
+        'factor': factor,
+        'min_resources': int(search.min_resources_),
+    }
+    return search.best_estimator_, summary
+
+
+def evaluate(model, X_test, y_test):
+    """
+    Métricas de test del notebook.
+
+    Args:
+        model: Modelo entrenado.
+        X_test: Matriz de features de test.
+        y_test: Target de test.
+
+    Returns:
+        dict: accuracy, precision, recall, f1 y roc_auc.
+    """
+    from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+
+    y_pred = model.predict(X_test)
+    y_proba = model.predict_proba(X_test)[:, list(model.classes_).index(1)]
+    return {
+        'accuracy': float(accuracy_score(y_test, y_pred)),
+        'precision': float(precision_score(y_test, y_pred)),
+        'recall': float(recall_score(y_test, y_pred)),
+        'f1': float(f1_score(y_test, y_pred)),
+        'roc_auc': float(roc_auc_score(y_test, y_proba)),
+    }
+
+
+def train(data_path=None, model_path=MODEL_PATH, artifact_path=MODEL_ARTIFACT_PATH,
+          metrics_path=METRICS_PATH, search=True, n_jobs=-1, version=None):
+    """
+    Ejecutar el pipeline completo de entrenamiento.
+
+    Args:
+        data_path: CSV de reseñas (por defecto, las rutas de `DATA_PATHS`).
+        model_path: Ruta del pickle de salida.
+        artifact_path: Directorio del artefacto de salida.
+        metrics_path: Ruta del JSON de métricas.
+        search: Buscar hiperparámetros; si es False se usan los del notebook.
+        n_jobs: Procesos en paralelo.
+        version: Identificador de versión (por defecto, fecha y hora actuales).
+
+    Returns:
+        dict: Métricas y metadatos del entrenamiento (contenido del JSON).
+
+    Raises:
+        FileNotFoundError: Si no se encuentra el CSV de reseñas.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from ml_runtime import FlatForest
+    from ml_artifact import save_artifact
+    from ml_importance import compute_feature_importances
+
+    features = load_or_materialize(data_path)
+    version = version or datetime.now().strftime('%Y%m%d%H%M%S')
+    X, y = features.frame(), features.target()
+    X_train, X_test, y_train, y_test = split_train_test(X, y)
+
+    start = time.perf_counter()
+    if search:
+        model, search_summary = search_hyperparameters(X_train, y_train, n_jobs=n_jobs)
+    else:
+        model = RandomForestClassifier(**ML_RF_PARAMS, random_state=ML_RANDOM_STATE, n_jobs=n_jobs)
+        model.fit(X_train, y_train)
+        search_summary = {'strategy': 'fixed', 'best_params': ML_RF_PARAMS}
+    train_seconds = time.perf_counter() - start
+
+    metrics = evaluate(model, X_test, y_test)
+    importances = compute_feature_importances(model, X_test, y_test, n_jobs=n_jobs)
+
+    report = {
+        'version': version,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'metrics': metrics,
+        'search': search_summary,
+        'train_seconds': train_seconds,
+        'n_train': int(len(X_train)),
+        'n_test': int(len(X_test)),
+        'positive_rate': float(np.mean(y)),
+        'dataset_version': features.version,
+        'impute_values': features.impute_values,
+        'category_levels': features.category_levels,
+    }
+
+    # Niveles de entrenamiento de las categóricas (con el de referencia), para que
+    # la inferencia agrupe en 'Other' solo los valores que no se vieron al entrenar
+    model.category_levels_ = features.category_levels
+    # Medianas de entrenamiento: el scoring por lotes imputa con ellas, no con las del CSV evaluado
+    model.impute_values_ = features.impute_values
+    with open(model_path, 'wb') as f:
+        pickle.dump(model, f)
+    save_artifact(FlatForest.from_sklearn(model), artifact_path, version=version, metrics=metrics,
+                  extra={'feature_importances': importances, 'training': report,
+                         'category_levels': features.category_levels})
+    with open(metrics_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Entrenar el modelo de recomendación')
+    parser.add_argument('--data', default=None, help='CSV de reseñas (por defecto, DATA_PATHS)')
+    parser.add_argument('--model', default=MODEL_PATH, help='Ruta del modelo .pkl de salida')
+    parser.add_argument('--artifact', default=MODEL_ARTIFACT_PATH, help='Directorio del artefacto de salida')
+    parser.add_argument('--metrics', default=METRICS_PATH, help='JSON de métricas de salida')
+    parser.add_argument('--version', default=None, help='Versión del modelo')
+    parser.add_argument('--no-search', action='store_true',
+                        help='Usar los hiperparámetros fijos del notebook sin búsqueda')
+    parser.add_argument('--register', action='store_true',
+                        help='Añadir el artefacto al registro de modelos (ml_registry.py)')
+    parser.add_argument('--promote', action='store_true',
+                        help='Promover la versión registrada para que la app la cargue en caliente')
+    parser.add_argument('--jobs', type=int, default=-1, help='Procesos en paralelo (-1 = todos los cores)')
+    args = parser.parse_args()
+
+    report = train(args.data, args.model, args.artifact, args.metrics,
+                   search=not args.no_search, n_jobs=args.jobs, version=args.version)
+    metrics = report['metrics']
+    print(f"✅ Modelo {report['version']} entrenado en {report['train_seconds']:.1f}s "
+          f"({report['search']['strategy']})")
+    print(f"   Accuracy: {metrics['accuracy']:.4f} | ROC-AUC: {metrics['roc_auc']:.4f}")
+    print(f"   Mejores parámetros: {report['search']['best_params']}")
+    print(f"   Guardado en {args.model}, {args.artifact}/ y {args.metrics}")
+
+    if args.register or args.promote:
+        from ml_registry import register, promote
+        version = register(args.artifact)
+        if args.promote:
+            promote(version)
+        print(f"   Registrada como {version}{' (promovida)' if args.promote else ''}")
+
+
+if __name__ == "__main__":
+    main()